@@ -0,0 +1,141 @@
+"""
+Measure what the prompt injection cascade gives up for its speed, on a
+labelled JSONL or CSV set of prompts.
+
+Every prompt is scored once by the heuristic first stage and once by the
+model. The cascade is then replayed for each pair of thresholds, reporting
+how many prompts the heuristic settles (the model calls saved) and the
+recall and precision of the cascade against the labels and against the model
+alone. "recall_lost" counts the injections the model catches that the
+cascade lets through.
+
+Usage (from the repository root):
+    python benchmarks/cascade_recall.py --tiny
+    python benchmarks/cascade_recall.py --data labelled.jsonl --label-field is_attack --out cascade.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "guardrails_sdk"))
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "prompt_injection_sample.jsonl")
+POSITIVE = ("1", "true", "yes", "injection", "jailbreak", "attack", "malicious")
+
+
+def load(path, text_field, label_field, fmt):
+    from guardrails_sdk.scan import read_records
+
+    # read_records returns the "id" field, used here for the label
+    return [
+        (text, str(label).strip().lower() in POSITIVE)
+        for _, label, text in read_records(path, text_field, label_field, fmt)]
+
+
+async def score(texts):
+    from guardrails_sdk.prompt_secure.heuristics import heuristic_score
+    from guardrails_sdk.prompt_secure.prompt_break import classify_prompt_injection
+
+    start = time.perf_counter()
+    heuristic = [heuristic_score(text)[0] for text in texts]
+    heuristic_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        classify_prompt_injection(text, cascade=False) for text in texts))
+    model_seconds = time.perf_counter() - start
+    return heuristic, [r["is_prompt_injection"] for r in results], heuristic_seconds, model_seconds
+
+
+def _rates(predicted, actual):
+    tp = sum(p and a for p, a in zip(predicted, actual))
+    fp = sum(p and not a for p, a in zip(predicted, actual))
+    positives = sum(actual)
+    return {
+        "recall": round(tp / positives, 4) if positives else None,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else None,
+    }
+
+
+def replay(heuristic, model, labels, safe_below, attack_above):
+    """The cascade's decisions for one pair of thresholds, and how they compare."""
+    settled = [s < safe_below or s > attack_above for s in heuristic]
+    cascade = [s > attack_above if done else m for s, done, m in zip(heuristic, settled, model)]
+    versus_model = _rates(cascade, model)
+    return {
+        "safe_below": safe_below,
+        "attack_above": attack_above,
+        "heuristic_share": round(sum(settled) / len(settled), 4),
+        "cascade": _rates(cascade, labels),
+        "model": _rates(model, labels),
+        "recall_lost": sum(m and not c for m, c in zip(model, cascade)),
+        "agreement_with_model": round(
+            sum(m == c for m, c in zip(model, cascade)) / len(model), 4),
+        "model_recall_kept": versus_model["recall"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Labelled JSONL or CSV prompts")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label",
+                        help=f"Truthy values: {', '.join(POSITIVE)}")
+    parser.add_argument("--safe-below", type=float, nargs="+", default=[0.01, 0.02, 0.05, 0.1])
+    parser.add_argument("--attack-above", type=float, nargs="+", default=[0.9, 0.95, 0.99, 1.0])
+    parser.add_argument("--tiny", action="store_true",
+                        help="Use tiny locally generated models (no network)")
+    parser.add_argument("--model-dir", default=None, help="Where the tiny models are kept")
+    parser.add_argument("--out", default=None, help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.tiny:
+        from tiny_models import DEFAULT_DIR, use_tiny_models
+        use_tiny_models(args.model_dir or DEFAULT_DIR)
+
+    examples = load(args.data, args.text_field, args.label_field, args.format)
+    texts = [text for text, _ in examples]
+    labels = [label for _, label in examples]
+    heuristic, model, heuristic_seconds, model_seconds = asyncio.run(score(texts))
+
+    results = [
+        replay(heuristic, model, labels, safe_below, attack_above)
+        for safe_below, attack_above in itertools.product(args.safe_below, args.attack_above)
+        if safe_below <= attack_above]
+
+    print(f"{len(texts)} prompts, {sum(labels)} injections; heuristic "
+          f"{heuristic_seconds / len(texts) * 1000:.3f}ms/prompt, model "
+          f"{model_seconds / len(texts) * 1000:.3f}ms/prompt")
+    print(f"{'safe<':>6} {'attack>':>7} {'skipped':>8} {'recall':>7} {'precision':>9} "
+          f"{'lost':>5} {'agree':>6}")
+    for r in results:
+        print(f"{r['safe_below']:>6} {r['attack_above']:>7} {r['heuristic_share']:>8.1%} "
+              f"{_fmt(r['cascade']['recall']):>7} {_fmt(r['cascade']['precision']):>9} "
+              f"{r['recall_lost']:>5} {r['agreement_with_model']:>6.1%}")
+    print(f"model alone: recall {_fmt(results[0]['model']['recall'])}, "
+          f"precision {_fmt(results[0]['model']['precision'])}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "data": os.path.abspath(args.data),
+                "prompts": len(texts),
+                "injections": sum(labels),
+                "heuristic_ms_per_prompt": round(heuristic_seconds / len(texts) * 1000, 4),
+                "model_ms_per_prompt": round(model_seconds / len(texts) * 1000, 4),
+                "results": results,
+            }, f, indent=2)
+    return 0
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
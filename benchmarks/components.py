@@ -0,0 +1,327 @@
+"""
+Latency (p50/p95/p99), throughput and peak RSS of each guardrail and of
+run_all_guardrails, swept over input length, micro-batch size, concurrency
+and word list size.
+
+Every case sends `--requests` distinct texts from `--concurrency` concurrent
+callers with the result cache disabled. `--tiny` swaps in tiny locally
+generated models (see tiny_models.py) so the suite runs without network;
+those numbers measure the framework around the models, not the models.
+
+Every case runs in a fresh Python process, so its memory figures cover
+only that component: "peak_rss_mb" is the peak of the process (interpreter
+and the models the component loads included), "rss_before_mb" its size
+once warmed up and "rss_growth_mb" how much the timed requests added.
+
+Results are written as JSON. `--compare` checks a run against an earlier one
+and exits with status 1 when a case got slower than `--tolerance` allows.
+
+Usage (from the repository root):
+    python benchmarks/components.py --tiny --out bench.json
+    python benchmarks/components.py --tiny --components toxicity --lengths 100 2000 --concurrency 1 32
+    python benchmarks/components.py --tiny --out new.json --compare bench.json --tolerance 0.2
+"""
+import os
+import sys
+import json
+import time
+import random
+import string
+import asyncio
+import argparse
+import platform
+import resource
+import subprocess
+import threading
+import itertools
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "guardrails_sdk"))
+
+COMPONENTS = ("toxicity", "prompt_injection", "pii", "banned_words", "run_all_guardrails")
+# Components whose model calls go through a MicroBatcher, and those that
+# take word lists; other dimensions are not swept for the rest
+BATCHED = ("toxicity", "prompt_injection", "run_all_guardrails")
+WORD_LISTS = ("banned_words", "run_all_guardrails")
+PII_ENTITIES = ["EMAIL_ADDRESS", "PHONE_NUMBER", "CREDIT_CARD", "PERSON"]
+# Compared by --compare; a higher value is a regression for all of them
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+
+class PeakRSS:
+    """Samples the resident set size in the background while a case runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # No procfs: fall back to the peak of the whole process
+            # (kilobytes on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def _random_words(n, rng):
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def make_texts(n, chars, listed_words, rng):
+    """`n` distinct texts of about `chars` characters with some PII and listed words."""
+    filler = _random_words(500, rng)
+    texts = []
+    for i in range(n):
+        words = [f"request{i}"]
+        size = len(words[0])
+        while size < chars:
+            roll = rng.random()
+            if roll < 0.01:
+                word = f"user{rng.randint(0, 9999)}@example.com"
+            elif roll < 0.02:
+                word = f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+            elif roll < 0.03 and listed_words:
+                word = rng.choice(listed_words)
+            else:
+                word = rng.choice(filler)
+            words.append(word)
+            size += len(word) + 1
+        texts.append(" ".join(words)[:max(chars, 1)])
+    return texts
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _call(component, text, banned, competitors, client):
+    from guardrails_sdk.pii.pii import analyze_and_mask_text
+    from guardrails_sdk.toxicity.toxic_bert import detect_toxicity
+    from guardrails_sdk.prompt_secure.prompt_break import classify_prompt_injection
+    from guardrails_sdk.compitator_banned_words.block_words import moderate_text
+    from guardrails_sdk.guardrails import TransformRequest
+
+    if component == "toxicity":
+        return detect_toxicity(text, 0.5)
+    if component == "prompt_injection":
+        return classify_prompt_injection(text)
+    if component == "pii":
+        return analyze_and_mask_text(text, PII_ENTITIES, None, 0.5)
+    if component == "banned_words":
+        return moderate_text(text, banned, competitors, "mask")
+    return client.run_all_guardrails(TransformRequest(
+        content=text, guardrails=PII_ENTITIES, action="mask",
+        block_words=banned, compitator_words=competitors))
+
+
+async def run_case(component, input_chars, batch_size, concurrency, word_list_size,
+                   requests, seed=0):
+    from guardrails_sdk import GuardrailsClient
+    from guardrails_sdk.toxicity import toxic_bert
+    from guardrails_sdk.prompt_secure import prompt_break
+
+    for batcher in (toxic_bert.batcher, prompt_break.batcher, prompt_break.window_batcher):
+        batcher.configure(max_batch_size=batch_size or None)
+
+    rng = random.Random(seed)
+    words = _random_words(word_list_size, rng) if word_list_size else []
+    banned, competitors = words[: len(words) // 2], words[len(words) // 2:]
+    texts = make_texts(requests + concurrency, input_chars, words[:50], rng)
+    client = GuardrailsClient(cache_size=0)
+
+    # Warm up: first batches, matcher builds for this word list
+    await asyncio.gather(*(
+        _call(component, text, banned, competitors, client) for text in texts[:concurrency]))
+
+    pending = iter(texts[concurrency:])
+    latencies = []
+
+    async def caller():
+        for text in pending:
+            start = time.perf_counter()
+            await _call(component, text, banned, competitors, client)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    with PeakRSS() as rss:
+        before = rss.peak
+        start = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "component": component,
+        "input_chars": input_chars,
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "word_list_size": word_list_size,
+        "requests": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+        "rss_before_mb": round(before / 2 ** 20, 1),
+        "rss_growth_mb": round((rss.peak - before) / 2 ** 20, 1),
+    }
+
+
+def run_isolated(case, requests, tiny, model_dir):
+    """Run one case in a fresh interpreter, so no other case's models or
+    allocations count towards its memory."""
+    command = [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case),
+               "--requests", str(requests)]
+    if tiny:
+        command.append("--tiny")
+    if model_dir:
+        command += ["--model-dir", model_dir]
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cases(components, lengths, batch_sizes, concurrency, word_list_sizes):
+    for component in components:
+        yield from itertools.product(
+            [component],
+            lengths,
+            batch_sizes if component in BATCHED else [None],
+            concurrency,
+            word_list_sizes if component in WORD_LISTS else [None])
+
+
+def case_key(result):
+    return tuple(result[k] for k in (
+        "component", "input_chars", "batch_size", "concurrency", "word_list_size"))
+
+
+def compare(results, baseline, tolerance):
+    """Cases where a compared metric grew by more than `tolerance` (a fraction)."""
+    before = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = before.get(case_key(result))
+        if old is None:
+            continue
+        for metric in COMPARED:
+            if old[metric] and result[metric] > old[metric] * (1 + tolerance):
+                regressions.append({
+                    "case": dict(zip(
+                        ("component", "input_chars", "batch_size", "concurrency",
+                         "word_list_size"), case_key(result))),
+                    "metric": metric,
+                    "baseline": old[metric],
+                    "current": result[metric],
+                    "change": round(result[metric] / old[metric] - 1, 3),
+                })
+    return regressions
+
+
+def _environment(tiny):
+    import torch
+    import transformers
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "transformers": transformers.__version__,
+        "tiny_models": tiny,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--components", nargs="+", choices=COMPONENTS, default=list(COMPONENTS))
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 2000],
+                        help="Input lengths in characters")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16],
+                        help="Micro-batch max sizes (model guardrails only)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--word-list-sizes", type=int, nargs="+", default=[100, 10000],
+                        help="Banned + competitor words (word list guardrails only)")
+    parser.add_argument("--requests", type=int, default=100, help="Timed calls per case")
+    parser.add_argument("--tiny", action="store_true",
+                        help="Use tiny locally generated models (no network)")
+    parser.add_argument("--model-dir", default=None, help="Where the tiny models are kept")
+    parser.add_argument("--out", default=None, help="Write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    # Used by run_isolated: run a single case here and print its result
+    parser.add_argument("--run-case", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        if args.tiny:
+            from tiny_models import DEFAULT_DIR, use_tiny_models
+            use_tiny_models(args.model_dir or DEFAULT_DIR)
+        print(json.dumps(asyncio.run(run_case(*json.loads(args.run_case), requests=args.requests))))
+        return 0
+    if args.tiny:
+        from tiny_models import DEFAULT_DIR, ensure_tiny_models
+        # Once here rather than racing in every case's process
+        ensure_tiny_models(args.model_dir or DEFAULT_DIR)
+
+    results = []
+    print(f"{'component':<19} {'chars':>6} {'batch':>5} {'conc':>4} {'words':>6} "
+          f"{'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} {'peak rss':>9} {'growth':>8}")
+    for case in cases(args.components, args.lengths, args.batch_sizes,
+                      args.concurrency, args.word_list_sizes):
+        result = run_isolated(case, args.requests, args.tiny, args.model_dir)
+        results.append(result)
+        print(f"{result['component']:<19} {result['input_chars']:>6} "
+              f"{result['batch_size'] or '-':>5} {result['concurrency']:>4} "
+              f"{result['word_list_size'] or '-':>6} "
+              f"{result['p50_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms "
+              f"{result['throughput_rps']:>8.1f} {result['peak_rss_mb']:>7.0f}MB "
+              f"{result['rss_growth_mb']:>6.1f}MB")
+
+    report = {"environment": _environment(args.tiny), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['metric']}: "
+                  f"{r['baseline']} -> {r['current']} ({r['change']:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
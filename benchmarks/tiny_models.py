@@ -0,0 +1,110 @@
+"""
+Generate tiny, randomly initialised stand-ins for the guardrail models so the
+benchmarks run offline: a 2-layer BERT with the toxicity labels, one with the
+prompt injection labels and a blank spaCy English pipeline for Presidio.
+
+They measure framework overhead (tokenization, batching, threading, masking),
+not model quality; their scores are meaningless.
+
+Usage (from the repository root):
+    python benchmarks/tiny_models.py --out benchmarks/.tiny_models
+"""
+import os
+import sys
+import string
+import argparse
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tiny_models")
+
+_WORDS = (
+    "the a i you me my your is are am be to of and or in on at for with this that it "
+    "ignore all previous instructions tell system prompt act as now from unrestricted "
+    "hello please email call number name address card stupid idiot kill hate love"
+).split()
+
+
+def _vocab() -> list:
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    characters = list(string.ascii_lowercase + string.digits + string.punctuation)
+    return special + sorted(set(_WORDS)) + characters + ["##" + c for c in characters]
+
+
+def _classifier(path: str, num_labels: int, vocab_file: str):
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    tokenizer = BertTokenizerFast(vocab_file, model_max_length=512)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=512,
+        num_labels=num_labels,
+    )
+    BertForSequenceClassification(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+
+def ensure_tiny_models(model_dir: str = DEFAULT_DIR) -> dict:
+    """
+    Create the tiny models under `model_dir` unless they already exist.
+
+    Returns:
+        dict: Paths of the "toxicity", "prompt_injection" and "spacy" models.
+    """
+    paths = {
+        "toxicity": os.path.join(model_dir, "toxicity"),
+        "prompt_injection": os.path.join(model_dir, "prompt_injection"),
+        "spacy": os.path.join(model_dir, "spacy_en"),
+    }
+    os.makedirs(model_dir, exist_ok=True)
+    vocab_file = os.path.join(model_dir, "vocab.txt")
+    if not os.path.exists(vocab_file):
+        with open(vocab_file, "w") as f:
+            f.write("\n".join(_vocab()))
+
+    if not os.path.exists(os.path.join(paths["toxicity"], "config.json")):
+        _classifier(paths["toxicity"], 6, vocab_file)
+    if not os.path.exists(os.path.join(paths["prompt_injection"], "config.json")):
+        _classifier(paths["prompt_injection"], 2, vocab_file)
+    if not os.path.exists(os.path.join(paths["spacy"], "meta.json")):
+        import spacy
+        spacy.blank("en").to_disk(paths["spacy"])
+    return paths
+
+
+def use_tiny_models(model_dir: str = DEFAULT_DIR) -> dict:
+    """Point the guardrail modules at the tiny models; call before their first use."""
+    paths = ensure_tiny_models(model_dir)
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "guardrails_sdk"))
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_analyzer.nlp_engine import SpacyNlpEngine
+    from guardrails_sdk.pii import pii
+    from guardrails_sdk.toxicity import toxic_bert
+    from guardrails_sdk.prompt_secure import prompt_break
+    from guardrails_sdk.runtime.registry import registry
+
+    # The loaders read the module level model_name when they run
+    toxic_bert.model_name = paths["toxicity"]
+    prompt_break.model_name = paths["prompt_injection"]
+    # A blank pipeline has no NER, so only the pattern recognizers fire
+    registry.register(
+        "pii",
+        lambda: AnalyzerEngine(nlp_engine=SpacyNlpEngine(
+            models=[{"lang_code": "en", "model_name": paths["spacy"]}])),
+        pii._warmup)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default=DEFAULT_DIR)
+    args = parser.parse_args(argv)
+    for name, path in ensure_tiny_models(args.out).items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Find the split of CPU threads between the model guardrails that serves
+run_all_guardrails best on this host.
+
+Each candidate gives toxicity, prompt injection and PII a thread budget (and,
+with --pin, disjoint cores) through the resource governor, then replays the
+same concurrent run_all_guardrails load as benchmarks/components.py. The
+candidates are ranked by throughput or p95 latency, next to a run without
+budgets, and the winner is printed as the GUARDRAILS_* settings to deploy.
+
+Usage (from the repository root):
+    python benchmarks/tune_threads.py --tiny
+    python benchmarks/tune_threads.py --cores 8 --pin --max-concurrent 1 2 --objective p95 --out tuning.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "guardrails_sdk"))
+
+from components import PII_ENTITIES, PeakRSS, _environment, _percentile, _random_words, make_texts
+
+MODELS = ("toxicity", "prompt_injection", "pii")
+
+
+def _available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def candidates(cores, thread_options, max_concurrent_options, pin):
+    """Budgets to try: every thread split that fits on `cores` cores."""
+    n = len(cores)
+    splits = [
+        split for split in itertools.product(thread_options, repeat=len(MODELS))
+        if sum(split) <= n]
+    if not splits:
+        # Fewer cores than models: they have to share
+        splits = [(1,) * len(MODELS)]
+    for split, max_concurrent in itertools.product(splits, max_concurrent_options):
+        budgets, start = {}, 0
+        for guardrail, threads in zip(MODELS, split):
+            budget = {"threads": threads, "max_concurrent": max_concurrent}
+            if pin and sum(split) <= n:
+                budget["cores"] = cores[start:start + threads]
+                start += threads
+            budgets[guardrail] = budget
+        yield budgets
+
+
+async def run_load(texts, concurrency, banned, competitors):
+    from guardrails_sdk import GuardrailsClient, TransformRequest
+
+    client = GuardrailsClient(cache_size=0)
+
+    def request(text):
+        return client.run_all_guardrails(TransformRequest(
+            content=text, guardrails=PII_ENTITIES, action="mask",
+            block_words=banned, compitator_words=competitors))
+
+    # Warm up: starts the governed pools and the first batches
+    await asyncio.gather(*(request(text) for text in texts[:concurrency]))
+
+    pending = iter(texts[concurrency:])
+    latencies = []
+
+    async def caller():
+        for text in pending:
+            start = time.perf_counter()
+            await request(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cores", type=int, default=None,
+                        help="Cores to split (default: all this process may use)")
+    parser.add_argument("--threads", type=int, nargs="+", default=None,
+                        help="Thread counts to try per guardrail (default: powers of two)")
+    parser.add_argument("--max-concurrent", type=int, nargs="+", default=[1],
+                        help="Concurrent model calls per guardrail to try")
+    parser.add_argument("--pin", action="store_true",
+                        help="Also pin each guardrail to its own cores")
+    parser.add_argument("--objective", choices=["throughput", "p95"], default="throughput")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=64, help="Timed calls per candidate")
+    parser.add_argument("--chars", type=int, default=1000, help="Input length in characters")
+    parser.add_argument("--tiny", action="store_true",
+                        help="Use tiny locally generated models (no network)")
+    parser.add_argument("--model-dir", default=None, help="Where the tiny models are kept")
+    parser.add_argument("--out", default=None, help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.tiny:
+        from tiny_models import DEFAULT_DIR, use_tiny_models
+        use_tiny_models(args.model_dir or DEFAULT_DIR)
+    from guardrails_sdk.runtime.executor import configure_executor
+    from guardrails_sdk.runtime.governor import Budget, format_env, governor
+
+    configure_executor("thread")
+    cores = _available_cores()
+    if args.cores:
+        cores = cores[:args.cores]
+    thread_options = args.threads or [
+        t for t in (1, 2, 4, 8, 16, 32, 64) if t <= len(cores)]
+
+    rng = random.Random(0)
+    words = _random_words(200, rng)
+    banned, competitors = words[:100], words[100:]
+    texts = make_texts(args.requests + args.concurrency, args.chars, words[:50], rng)
+
+    results = []
+    print(f"{'toxicity':>14} {'prompt_inj':>14} {'pii':>14} "
+          f"{'p50':>9} {'p95':>9} {'req/s':>8}")
+    for budgets in [{}, *candidates(cores, thread_options, args.max_concurrent, args.pin)]:
+        governor.configure(budgets)
+        result = {"budgets": budgets, **asyncio.run(
+            run_load(texts, args.concurrency, banned, competitors))}
+        results.append(result)
+        shown = [_describe(budgets.get(guardrail)) for guardrail in MODELS]
+        print(f"{shown[0]:>14} {shown[1]:>14} {shown[2]:>14} "
+              f"{result['p50_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms "
+              f"{result['throughput_rps']:>8.1f}")
+    governor.configure({})
+
+    if args.objective == "throughput":
+        results.sort(key=lambda r: -r["throughput_rps"])
+    else:
+        results.sort(key=lambda r: r["p95_ms"])
+    best = results[0]
+    env = format_env({g: Budget(**b) for g, b in best["budgets"].items()})
+    report = {
+        "environment": {**_environment(args.tiny), "cores": cores},
+        "objective": args.objective,
+        "concurrency": args.concurrency,
+        "input_chars": args.chars,
+        "best": {"budgets": best["budgets"], "env": env},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"\nBest by {args.objective}: {best['throughput_rps']} req/s, p95 {best['p95_ms']}ms")
+    if not env:
+        print("No budgets (the shared executor) did best on this host")
+    for name, value in env.items():
+        print(f"{name}={value}")
+    return 0
+
+
+def _describe(budget):
+    if budget is None:
+        return "-"
+    text = f"{budget['threads']}t"
+    if budget.get("cores"):
+        text += f"@{budget['cores'][0]}-{budget['cores'][-1]}"
+    if budget["max_concurrent"] > 1:
+        text += f"x{budget['max_concurrent']}"
+    return text
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark of banned/competitor word matching: the regex alternation used by
+`moderate_text` (findall + sub per list) against the Aho-Corasick automaton
+(one scan for both lists plus masking).
+
+Usage (from the repository root):
+    python benchmarks/word_matcher.py --terms 1000 10000 100000 --text-chars 10000
+"""
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "guardrails_sdk"))
+
+from guardrails_sdk.compitator_banned_words.matcher import (  # noqa: E402
+    AhoCorasickMatcher, RegexMatcher, mask_spans)
+
+
+def _random_words(n, rng):
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return list(words)
+
+
+def _text(chars, vocabulary, rng):
+    words = []
+    size = 0
+    while size < chars:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def _time(fn, repeat):
+    fn()  # warm caches
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(n_terms, text_chars, repeat, seed=0):
+    rng = random.Random(seed)
+    words = _random_words(n_terms, rng)
+    banned, competitors = words[: n_terms // 2], words[n_terms // 2:]
+    # Mostly ordinary words with roughly 1% list hits
+    filler = _random_words(2000, rng)
+    text = _text(text_chars, filler * 99 + banned[:10] + competitors[:10], rng)
+    categories = {"banned": banned, "competitor": competitors}
+
+    start = time.perf_counter()
+    regex = RegexMatcher(categories)
+    regex_build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    automaton = AhoCorasickMatcher(categories)
+    automaton_build_ms = (time.perf_counter() - start) * 1000
+
+    def legacy_scan():
+        # What moderate_text did before: two findall and two sub calls
+        banned_pattern = regex.patterns["banned"]
+        competitor_pattern = regex.patterns["competitor"]
+        banned_pattern.findall(text)
+        competitor_pattern.findall(text)
+        def mask_word(match): return "*" * len(match.group(0))
+        competitor_pattern.sub(mask_word, banned_pattern.sub(mask_word, text))
+
+    def automaton_scan():
+        mask_spans(text, automaton.find(text))
+
+    assert sorted(regex.find(text)) == sorted(automaton.find(text))
+    return {
+        "terms": n_terms,
+        "text_chars": len(text),
+        "matches": len(automaton.find(text)),
+        "regex_build_ms": regex_build_ms,
+        "automaton_build_ms": automaton_build_ms,
+        "regex_scan_ms": _time(legacy_scan, repeat),
+        "automaton_scan_ms": _time(automaton_scan, repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--terms", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--text-chars", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", default=None, help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'terms':>8} {'regex build':>12} {'ac build':>10} {'regex scan':>11} {'ac scan':>9} {'speedup':>8}")
+    for n_terms in args.terms:
+        result = run(n_terms, args.text_chars, args.repeat)
+        results.append(result)
+        print(f"{n_terms:>8} {result['regex_build_ms']:>10.1f}ms {result['automaton_build_ms']:>8.1f}ms "
+              f"{result['regex_scan_ms']:>9.2f}ms {result['automaton_scan_ms']:>7.2f}ms "
+              f"{result['regex_scan_ms'] / result['automaton_scan_ms']:>7.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,59 @@
 
-from fastapi import FastAPI
+import os
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional,Literal
+from log_guardrails.log_anomaly import AnomalyStorage
 from pii.pii import analyze_and_mask_text
 from toxicity.toxic_bert import detect_toxicity
 from prompt_secure.prompt_break import classify_prompt_injection
+from prompt_secure import attack_index
+from pipeline import PipelinePolicy, run_pipeline
+from streaming import StreamRequest, guard_stream
+from batch import BatchRequest, MAX_BATCH_ITEMS, iter_batch, run_batch
+from runtime.cache import result_cache
+from runtime.executor import run_in_thread
+from runtime.metrics import metrics
+from runtime.registry import registry
 import asyncio
 
+# Models to preload at startup, comma separated; "none" serves immediately
+# and loads every model on its first request
+WARMUP_MODELS = [
+    name.strip()
+    for name in os.getenv("GUARDRAILS_WARMUP", ",".join(registry.names())).split(",")
+    if name.strip() and name.strip() != "none"
+]
+
+# Longest NDJSON line accepted by the streaming endpoints, so a line that
+# never ends cannot grow the read buffer without limit
+MAX_LINE_BYTES = int(os.getenv("GUARDRAILS_MAX_LINE_BYTES", str(8 * 1024 * 1024)))
+
+# Anomaly read APIs are served when ANOMALY_DB_DSN points at the log database
+anomaly_storage = AnomalyStorage() if os.getenv("ANOMALY_DB_DSN") else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if anomaly_storage:
+        # Creates the rollup table and any missing indexes
+        await run_in_thread(anomaly_storage.init)
+    # Warm up in the background so /health can report progress
+    warmup = asyncio.create_task(run_in_thread(registry.warmup, WARMUP_MODELS))
+    yield
+    warmup.cancel()
+
 
 app = FastAPI(
     title="LLM Guardrails Server",
     description="Request/Response Guard rails",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 class ToxiRequest(BaseModel):
@@ -23,20 +65,30 @@ class Prompt(BaseModel):
     content: str
 
 
+class KnownAttacks(BaseModel):
+    texts: List[str]
+    source: Optional[str] = None
+
+
 class TransformRequest(BaseModel):
     content: str
     guardrails: List[str]
     treshold: float = 0.5
     custom_entities: Optional[List[Dict]] = None
     action: Optional[Literal["mask", "block"]] = None
-    compitator_loc: Optional[str] = None
-    block_loc: Optional[str] = None
+
+class PipelineRequest(TransformRequest):
+    # Word lists come with the request; the server never opens files named by a client
+    compitator_words: Optional[List[str]] = None
+    block_words: Optional[List[str]] = None
+    # Defaults to PipelinePolicy(): word lists, then PII, then the models
+    policy: Optional[PipelinePolicy] = None
 
 class Compitator(BaseModel):
     content: str
     action: Literal["mask", "block"]
-    compitator_loc: Optional[str] = None
-    block_loc: Optional[str] = None
+    compitator_words: Optional[List[str]] = None
+    block_words: Optional[List[str]] = None
 
 
 @app.get("/api/v1/guardrails")
@@ -67,6 +119,15 @@ async def prompt_injection(request: Prompt):
     return result
 
 
+@app.post("/api/v1/prompt_injection/attacks")
+async def add_known_attacks(request: KnownAttacks):
+    """Append confirmed attacks to the index of known attacks."""
+    if not attack_index.enabled():
+        raise HTTPException(
+            status_code=503, detail="Known attack index is not configured (GUARDRAILS_ATTACK_INDEX)")
+    return await attack_index.add_attacks(request.texts, request.source)
+
+
 @app.post("/api/v1/run_all_guardrails")
 async def run_all_guardrails(request: TransformRequest):
     """Run all guardrails on the content."""
@@ -83,9 +144,240 @@ async def run_all_guardrails(request: TransformRequest):
     }
 
 
-@app.get("/health")
-async def health_check():
-    """Health check."""
-    # Check if all registered guardrails are properly initialized
+def _anomaly_storage() -> AnomalyStorage:
+    if anomaly_storage is None:
+        raise HTTPException(
+            status_code=503, detail="Anomaly storage is not configured (ANOMALY_DB_DSN)")
+    return anomaly_storage
+
+
+@app.get("/api/v1/anomalies")
+async def query_anomalies(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    anomaly_type: Optional[str] = None,
+    request_id: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Page through logged anomalies, newest first. Pass `next_cursor` back as `cursor`."""
+    storage = _anomaly_storage()
+    try:
+        return await run_in_thread(
+            storage.query_anomalies, start, end, anomaly_type, request_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/v1/anomalies/aggregate")
+async def aggregate_anomalies(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    anomaly_type: Optional[str] = None,
+    interval: Literal["minute", "hour", "day"] = "hour"
+):
+    """Anomaly counts per time bucket and type, read from the per-minute rollups."""
+    storage = _anomaly_storage()
+    return await run_in_thread(
+        storage.aggregate_anomalies, start, end, anomaly_type, interval)
+
+
+@app.post("/api/v1/run_pipeline")
+async def run_guardrails_pipeline(request: PipelineRequest):
+    """Run the guardrails cheapest first, skipping or cancelling the rest once one blocks."""
+    try:
+        return await run_pipeline(
+            request.content,
+            request.guardrails,
+            treshold=request.treshold,
+            custom_entities=request.custom_entities,
+            action=request.action,
+            banned_words=request.block_words,
+            competitor_words=request.compitator_words,
+            policy=request.policy
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for endpoints that keep reading the request body while
+    they stream the response. Under ASGI < 2.4 (e.g. uvicorn) the stock class
+    listens for a disconnect on `receive`, which would swallow the body chunks
+    the endpoint is still reading; a disconnect surfaces through
+    `request.stream()` instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _ndjson_lines(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > MAX_LINE_BYTES:
+                raise ValueError(f"NDJSON line longer than {MAX_LINE_BYTES} bytes")
+            if line.strip():
+                yield json.loads(line)
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"NDJSON line longer than {MAX_LINE_BYTES} bytes")
+    if buffer.strip():
+        yield json.loads(buffer)
+
 
-    return "success"
+@app.post("/api/v1/stream")
+async def stream_guardrails(request: Request):
+    """
+    Guard streamed text. The request body is NDJSON: a StreamRequest object on
+    the first line, then one {"delta": "..."} per line as the text is
+    generated. Events are sent back as server-sent events while the body is
+    still arriving.
+    """
+    lines = _ndjson_lines(request)
+    try:
+        config = StreamRequest(**await lines.__anext__())
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="Missing stream config line")
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid stream config line: {e}")
+
+    async def deltas():
+        async for line in lines:
+            if not isinstance(line, dict):
+                raise TypeError("expected a JSON object")
+            yield line["delta"]
+
+    async def events():
+        try:
+            async for event in guard_stream(deltas(), config):
+                yield f"data: {json.dumps(event)}\n\n"
+        except (KeyError, TypeError, ValueError) as e:
+            # Same error event as the WebSocket endpoint, then a clean end
+            error = f'Invalid line, expected {{"delta": ...}}: {e!r}'
+            yield f"data: {json.dumps({'error': error})}\n\n"
+
+    return DuplexStreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/api/v1/batch")
+async def batch_guardrails(request: BatchRequest):
+    """
+    Run many items in one request, each with its own checks and guardrail
+    config. Model calls of all items are batched together. Results come back
+    in input order.
+    """
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_ITEMS} items per batch, use /api/v1/batch/ndjson for more")
+    return {"results": await run_batch(request.items)}
+
+
+@app.post("/api/v1/batch/ndjson")
+async def batch_guardrails_ndjson(request: Request):
+    """
+    Upload any number of items as NDJSON (one BatchItem per line) and receive
+    one NDJSON result line per item as soon as it completes. Lines are read
+    only as fast as items finish, so memory stays bounded.
+    """
+    async def results():
+        try:
+            # Lines that are not valid items get an error result of their own
+            async for result in iter_batch(_ndjson_lines(request)):
+                yield json.dumps(result) + "\n"
+        except ValueError as e:
+            # A line that is not JSON at all ends the stream with an error line
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.websocket("/api/v1/stream/ws")
+async def stream_guardrails_ws(websocket: WebSocket):
+    """
+    Guard streamed text over a WebSocket: send a StreamRequest object, then
+    {"delta": "..."} messages and finally {"done": true}. Every event is sent
+    back as it is produced.
+    """
+    await websocket.accept()
+    try:
+        config = StreamRequest(**await websocket.receive_json())
+    except (TypeError, ValueError) as e:
+        await _reject(websocket, f"Invalid stream config: {e}")
+        return
+    except WebSocketDisconnect:
+        return
+
+    async def deltas():
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                raise TypeError("expected a JSON object")
+            if message.get("done"):
+                return
+            yield message["delta"]
+
+    try:
+        async for event in guard_stream(deltas(), config):
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except (KeyError, TypeError, ValueError) as e:
+        await _reject(websocket, f'Invalid message, expected {{"delta": ...}} or {{"done": true}}: {e!r}')
+
+
+async def _reject(websocket: WebSocket, error: str):
+    # 1003: the client sent data the endpoint does not accept
+    try:
+        await websocket.send_json({"error": error})
+        await websocket.close(code=1003)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Streaming responses are timed until their headers are sent
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.observe(
+        "guardrails_http_request_seconds", time.perf_counter() - start,
+        method=request.method, route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code))
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-guardrail and per-stage latency histograms, batch sizes, cache and log counters."""
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the guardrail result cache."""
+    return result_cache.stats()
+
+
+@app.get("/health")
+async def health_check(response: Response):
+    """Readiness check: per-model load state and warmup latency."""
+    models = registry.status()
+    if any(model["state"] == "failed" for model in models.values()):
+        status = "failed"
+    elif registry.is_ready(WARMUP_MODELS):
+        status = "ready"
+    else:
+        status = "loading"
+    if status != "ready":
+        response.status_code = 503
+    return {"status": status, "models": models}
@@ -0,0 +1,4 @@
+from .log_anomaly import AnomalyStorage
+from .writer import AnomalyWriter
+
+__all__ = ["AnomalyStorage", "AnomalyWriter"]
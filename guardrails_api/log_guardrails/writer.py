@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from runtime.executor import run_in_thread
+from runtime.metrics import metrics
+from .log_anomaly import AnomalyStorage, logger
+
+Backpressure = Literal["drop", "block", "spill"]
+
+_STOP = object()
+
+
+class AnomalyWriter:
+    """
+    Bounded in-process queue in front of an AnomalyStorage, drained by a
+    background thread that inserts rows in bulk, so callers never wait on
+    the database.
+
+    Rows are flushed once `batch_size` of them are queued or `flush_interval`
+    seconds after the first one arrived, whichever comes first.
+
+    When the queue is full (the database is slower than the traffic) the
+    `backpressure` policy applies:
+        - "drop": discard the new row and count it.
+        - "block": wait for room in the queue, slowing the caller down
+          (`submit_async` waits in a worker thread, not on the event loop).
+        - "spill": append the row to `spill_path` (JSON lines). Spilled rows
+          are written to the database once the queue has drained, and only
+          removed from disk once committed.
+
+    Args:
+        storage (AnomalyStorage): Where rows end up.
+        max_queue (int): Queue capacity. Defaults to GUARDRAILS_LOG_QUEUE_SIZE, then 10000.
+        batch_size (int): Rows per insert. Defaults to GUARDRAILS_LOG_BATCH_SIZE, then 100.
+        flush_interval (float): Seconds. Defaults to GUARDRAILS_LOG_FLUSH_INTERVAL, then 1.0.
+        backpressure (str): Defaults to GUARDRAILS_LOG_BACKPRESSURE, then "drop".
+        spill_path (str): Defaults to GUARDRAILS_LOG_SPILL_PATH, then "anomalies.spill.jsonl".
+        close_timeout (float): Seconds `close` waits at interpreter exit before
+            giving up on the database. Defaults to GUARDRAILS_LOG_CLOSE_TIMEOUT, then 10.
+    """
+
+    def __init__(
+        self,
+        storage: AnomalyStorage,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        backpressure: Optional[Backpressure] = None,
+        spill_path: Optional[str] = None,
+        close_timeout: Optional[float] = None
+    ):
+        self.storage = storage
+        self.max_queue = max_queue or int(os.getenv("GUARDRAILS_LOG_QUEUE_SIZE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("GUARDRAILS_LOG_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval or float(
+            os.getenv("GUARDRAILS_LOG_FLUSH_INTERVAL", "1.0"))
+        self.backpressure = backpressure or os.getenv("GUARDRAILS_LOG_BACKPRESSURE", "drop")
+        if self.backpressure not in ("drop", "block", "spill"):
+            raise ValueError(
+                f"Unknown backpressure '{self.backpressure}', expected drop, block or spill")
+        self.spill_path = spill_path or os.getenv(
+            "GUARDRAILS_LOG_SPILL_PATH", "anomalies.spill.jsonl")
+        self.close_timeout = close_timeout if close_timeout is not None else float(
+            os.getenv("GUARDRAILS_LOG_CLOSE_TIMEOUT", "10"))
+
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        self._spill_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="anomaly-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self._close_at_exit)
+        metrics.add_collector(self._collect)
+
+    def submit(self, request_id: str, anomaly_type: str, details: Dict[str, Any]) -> None:
+        """Queue one anomaly for writing; returns without touching the database.
+
+        With "block" backpressure this waits for room in the queue; from a
+        coroutine use `submit_async` so the wait does not stall the event loop.
+        """
+        row = self._row(request_id, anomaly_type, details)
+        if self.backpressure == "block":
+            self._queue.put(row)
+            return
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._overflow(row)
+
+    async def submit_async(self, request_id: str, anomaly_type: str, details: Dict[str, Any]) -> None:
+        """Like `submit`, but a full queue is waited on (or spilled) off the event loop."""
+        row = self._row(request_id, anomaly_type, details)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            if self.backpressure == "block":
+                await run_in_thread(self._queue.put, row)
+            elif self.backpressure == "spill":
+                await run_in_thread(self._spill, [row])
+            else:
+                self._overflow(row)
+
+    def _row(self, request_id: str, anomaly_type: str, details: Dict[str, Any]) -> dict:
+        if self._closed:
+            raise RuntimeError("AnomalyWriter is closed")
+        return {
+            "timestamp": datetime.utcnow(),
+            "request_id": request_id,
+            "anomaly_type": anomaly_type,
+            # Serialized now so later changes to `details` are not logged
+            "details": json.dumps(details, default=str),
+        }
+
+    def _overflow(self, row: dict) -> None:
+        # The queue is full and the caller does not wait
+        if self.backpressure == "spill":
+            self._spill([row])
+        else:
+            self._drop(1)
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(
+                    f"[AnomalyLogger] Queue full, dropped {self.dropped} anomalies so far")
+
+    def _drop(self, count: int) -> None:
+        self.dropped += count
+        metrics.increment("guardrails_log_rows_total", count, outcome="dropped")
+
+    def flush(self) -> None:
+        """Block until every row queued so far has been handled."""
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush everything still queued and stop the writer thread.
+
+        With a `timeout`, rows the database did not take in time are spilled
+        ("spill" backpressure) or dropped, so a hung database cannot hold up
+        the caller.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self._abandon_queue()
+        else:
+            self._thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if self._thread.is_alive():
+                self._abandon_queue()
+        atexit.unregister(self._close_at_exit)
+        metrics.remove_collector(self._collect)
+
+    def _close_at_exit(self):
+        self.close(self.close_timeout)
+
+    def _abandon_queue(self):
+        # Take the rows the writer thread did not get to; the batch it is
+        # stuck on stays with it
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                rows.append(item)
+        if rows:
+            if self.backpressure == "spill":
+                self._spill(rows)
+            else:
+                self._drop(len(rows))
+        logger.warning(
+            f"[AnomalyLogger] Database did not keep up while closing; "
+            f"{'spilled' if self.backpressure == 'spill' else 'dropped'} {len(rows)} queued anomalies")
+        try:
+            # Lets the writer thread exit if the database recovers
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "failed": self.failed,
+            "backpressure": self.backpressure
+        }
+
+    def _collect(self) -> list:
+        return [("guardrails_log_queue_depth", "gauge", self._queue.qsize(), {})]
+
+    def _run(self):
+        stopping = False
+        while not stopping or not self._queue.empty():
+            batch, stopping = self._next_batch(stopping)
+            if batch and self._write(batch) and self._queue.empty():
+                self._replay_spill()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _next_batch(self, stopping: bool) -> tuple:
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                if stopping:
+                    # Shutting down: drain what is left without waiting
+                    item = self._queue.get_nowait()
+                elif deadline is None:
+                    item = self._queue.get()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.task_done()
+                stopping = True
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch, stopping
+
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        if self._store(rows):
+            return True
+        if self.backpressure == "spill":
+            self._spill(rows)
+        else:
+            self.failed += len(rows)
+            metrics.increment("guardrails_log_rows_total", len(rows), outcome="failed")
+        return False
+
+    def _store(self, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            with metrics.time("guardrails_log_write_seconds"):
+                self.storage.store_anomalies(rows)
+        except Exception as e:
+            logger.error(
+                f"[AnomalyLogger] Failed to store {len(rows)} anomalies: {e}", exc_info=True)
+            return False
+        self.written += len(rows)
+        metrics.increment("guardrails_log_rows_total", len(rows), outcome="written")
+        return True
+
+    def _spill(self, rows: List[Dict[str, Any]]):
+        with self._spill_lock:
+            with open(self.spill_path, "a") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+            self.spilled += len(rows)
+        metrics.increment("guardrails_log_rows_total", len(rows), outcome="spilled")
+
+    def _replay_spill(self):
+        # Move the file aside first, so rows spilled while replaying go to a
+        # fresh file instead of being read back half-written. A replay file
+        # left over from a crash or a failed replay is finished first.
+        replaying = self.spill_path + ".replay"
+        with self._spill_lock:
+            if not os.path.exists(replaying):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replaying)
+
+        # Rows leave the file only once committed; a crash in between writes
+        # at most one batch twice
+        with open(replaying) as f:
+            while True:
+                committed = f.tell()
+                rows = _read_rows(f, self.batch_size)
+                if not rows:
+                    break
+                if not self._store(rows):
+                    _drop_prefix(f, replaying, committed)
+                    return
+        os.remove(replaying)
+
+
+def _read_rows(f, count: int) -> List[Dict[str, Any]]:
+    rows = []
+    while len(rows) < count:
+        line = f.readline()
+        if not line:
+            break
+        if line.strip():
+            row = json.loads(line)
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            rows.append(row)
+    return rows
+
+
+def _drop_prefix(f, path: str, offset: int):
+    # Keep only the rows from `offset` on, replacing the file atomically
+    f.seek(offset)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as out:
+        for line in f:
+            out.write(line)
+    os.replace(tmp, path)
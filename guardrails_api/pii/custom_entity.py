@@ -1,14 +1,25 @@
 
 from presidio_analyzer import PatternRecognizer, Pattern
+import os
 import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 
+# Recognizers built from user definitions, keyed by a hash of each
+# definition, so a pattern is compiled once however many requests send it
+MAX_CACHED_RECOGNIZERS = int(os.getenv("GUARDRAILS_PII_RECOGNIZER_CACHE", "1024"))
 
-async def add_custom_recognizers(analyzer, recognizer_definitions: list):
+_recognizers = OrderedDict()
+_recognizers_lock = threading.Lock()
+
+
+def build_custom_recognizers(recognizer_definitions: list) -> list:
     """
-    Adds multiple custom recognizers dynamically based on user input.
+    Builds PatternRecognizers from user supplied definitions.
 
     Args:
-        analyzer: The Presidio AnalyzerEngine instance.
         recognizer_definitions (list): A list of dictionaries where each contains:
             - entity_name (str): The supported entity (e.g., "CREDIT_CARD").
             - regex (str): The regex pattern.
@@ -16,9 +27,9 @@ async def add_custom_recognizers(analyzer, recognizer_definitions: list):
             - pattern_name (str): (Optional) Custom pattern name.
 
     Returns:
-        list: List of successfully added entity names.
+        list: PatternRecognizer instances, invalid entries are skipped.
     """
-    added_entities = []
+    recognizers = []
 
     for rec in recognizer_definitions:
         entity_name = rec.get("entity_name")
@@ -30,9 +41,64 @@ async def add_custom_recognizers(analyzer, recognizer_definitions: list):
             continue  # skip invalid entries
 
         pattern = Pattern(name=pattern_name, regex=regex, score=score)
-        recognizer = PatternRecognizer(
-            supported_entity=entity_name, patterns=[pattern])
+        recognizers.append(PatternRecognizer(
+            supported_entity=entity_name, patterns=[pattern]))
+
+    return recognizers
+
+
+def get_custom_recognizers(recognizer_definitions: list) -> list:
+    """
+    Like `build_custom_recognizers`, but each distinct definition is built
+    once and reused from a bounded LRU cache.
+
+    The recognizers are meant to be passed to `analyzer.analyze` as
+    `ad_hoc_recognizers`, so they only apply to the request that supplied
+    them and the analyzer's registry is never modified.
+    """
+    recognizers = []
+
+    for rec in recognizer_definitions:
+        key = _definition_key(rec)
+        with _recognizers_lock:
+            cached = _recognizers.get(key)
+            if cached is not None:
+                _recognizers.move_to_end(key)
+        if cached is None:
+            # Invalid entries are cached too, as an empty list
+            cached = build_custom_recognizers([rec])
+            with _recognizers_lock:
+                _recognizers[key] = cached
+                while len(_recognizers) > MAX_CACHED_RECOGNIZERS:
+                    _recognizers.popitem(last=False)
+        recognizers.extend(cached)
+
+    return recognizers
+
+
+def _definition_key(rec: dict) -> str:
+    content = json.dumps(rec, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+async def add_custom_recognizers(analyzer, recognizer_definitions: list):
+    """
+    Adds multiple custom recognizers dynamically based on user input.
+
+    This permanently registers them on `analyzer`, so every later call runs
+    them. For per-request recognizers use `get_custom_recognizers` instead.
+
+    Args:
+        analyzer: The Presidio AnalyzerEngine instance.
+        recognizer_definitions (list): See `build_custom_recognizers`.
+
+    Returns:
+        list: List of successfully added entity names.
+    """
+    added_entities = []
+
+    for recognizer in build_custom_recognizers(recognizer_definitions):
         analyzer.registry.add_recognizer(recognizer)
-        added_entities.append(entity_name)
+        added_entities.append(recognizer.supported_entities[0])
 
     return added_entities
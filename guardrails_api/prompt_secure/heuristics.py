@@ -0,0 +1,64 @@
+"""
+First stage of the prompt injection cascade: a linear model over lexical
+features, cheap enough to run on every prompt before DeBERTa.
+
+Each feature is a regular expression with a weight. The injection score is
+sigmoid(BIAS + sum of the weights of the features found). Common attack
+phrasings ("ignore all previous instructions", chat template markers, DAN
+style role overrides) push the score close to 1. Words that only hint at an
+attack ("system prompt", "rules", "pretend") move it into the uncertain band
+where the model decides. A prompt with none of them scores sigmoid(BIAS).
+"""
+import re
+import math
+from typing import List, Tuple
+
+_FLAGS = re.IGNORECASE
+
+# (name, pattern, weight)
+FEATURES = [
+    # Attack phrasings
+    ("ignore_instructions", r"\b(ignore|disregard|forget|skip|override|bypass)\b[\w\s,'-]{0,40}?"
+                            r"\b(previous|prior|above|earlier|preceding|all|any|your|the|these|those)\b"
+                            r"[\w\s,'-]{0,20}?\b(instructions?|rules|directions|prompts?|guidelines|context)\b", 8.0),
+    ("reveal_prompt", r"\b(reveal|show|print|repeat|output|display|leak|tell me|what (is|are|was|were))\b"
+                      r"[\w\s,'-]{0,30}?\b(system|initial|hidden|original|secret)\s+(prompt|instructions?|message)", 8.0),
+    ("role_override", r"\byou are (now|no longer)\b|\bfrom now on,? you\b|\bpretend (to be|you are)\b"
+                      r"|\bact as (an? )?(unrestricted|unfiltered|uncensored|evil|jailbroken)\b", 6.0),
+    ("jailbreak_persona", r"\b(DAN|do anything now|developer mode|jailbreak|jailbroken|god mode)\b", 7.0),
+    ("new_instructions", r"\bnew (instructions?|rules|task|objective)\s*:", 6.0),
+    ("template_markers", r"<\|?(im_start|im_end|system|endoftext)\|?>|\[/?INST\]|###\s*(system|instruction)", 7.0),
+    ("no_restrictions", r"\b(without|no|ignore|free of|remove|disable)\s+(all\s+|any\s+|your\s+)?"
+                        r"(restrictions|limitations|filters|safety|guardrails|censorship|ethical guidelines)\b", 6.0),
+    # Hints; on their own they only make the prompt uncertain
+    ("mentions_instructions", r"\b(instructions?|system prompt|guidelines|rules)\b", 2.0),
+    ("mentions_override", r"\b(override|bypass|pretend|roleplay|role-play|hypothetically|unfiltered)\b", 2.0),
+    ("mentions_secrets", r"\b(password|secret|confidential|api key|credentials?)\b", 1.5),
+    ("output_control", r"\b(respond only with|do not (tell|mention|reveal)|say nothing (but|except))\b", 1.5),
+    ("encoded_payload", r"[A-Za-z0-9+/]{60,}={0,2}", 2.0),
+]
+BIAS = -4.5
+# Longer prompts have more room to hide an injection
+LONG_PROMPT_CHARS = 2000
+LONG_PROMPT_WEIGHT = 2.0
+
+_COMPILED = [(name, re.compile(pattern, _FLAGS), weight) for name, pattern, weight in FEATURES]
+
+
+def heuristic_score(text: str) -> Tuple[float, List[str]]:
+    """
+    Score a prompt with the lexical model.
+
+    Returns:
+        tuple: (injection score between 0 and 1, names of the features found).
+    """
+    logit = BIAS
+    matched = []
+    for name, pattern, weight in _COMPILED:
+        if pattern.search(text):
+            logit += weight
+            matched.append(name)
+    if len(text) > LONG_PROMPT_CHARS:
+        logit += LONG_PROMPT_WEIGHT
+        matched.append("long_prompt")
+    return 1 / (1 + math.exp(-logit)), matched
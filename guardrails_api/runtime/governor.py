@@ -0,0 +1,225 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("guardrails.governor")
+
+GUARDRAILS = ("toxicity", "prompt_injection", "pii", "banned_words")
+
+
+class Budget:
+    """
+    CPU share of one guardrail.
+
+    Args:
+        threads (int): Intra-op threads of each of its model calls (torch and
+            ONNX Runtime). None keeps the process default.
+        cores (list): CPU ids its calls are pinned to. None leaves them free.
+        max_concurrent (int): Calls of this guardrail running at once.
+    """
+
+    def __init__(self, threads: Optional[int] = None, cores: Optional[List[int]] = None,
+                 max_concurrent: Optional[int] = None):
+        if threads is not None and threads < 1:
+            raise ValueError("threads must be at least 1")
+        if max_concurrent is not None and max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.threads = threads
+        self.cores = sorted(set(cores)) if cores else None
+        self.max_concurrent = max_concurrent or 1
+
+    def to_dict(self) -> dict:
+        return {"threads": self.threads, "cores": self.cores, "max_concurrent": self.max_concurrent}
+
+
+class ResourceGovernor:
+    """
+    Splits the CPU between the guardrails instead of letting every model call
+    use every core.
+
+    A guardrail with a budget gets its own pool of `max_concurrent` threads.
+    Each thread is pinned to the budget's cores and sets its own torch thread
+    count, which torch keeps per thread once initialised, so the OpenMP team
+    of one model does not spill over the cores of another. Guardrails without
+    a budget keep using the shared executor.
+
+    Budgets come from `configure`, or from GUARDRAILS_THREAD_BUDGETS,
+    GUARDRAILS_CORE_AFFINITY and GUARDRAILS_MAX_CONCURRENT, e.g.
+    "toxicity=4,prompt_injection=2,pii=2" and "toxicity=0-3,prompt_injection=4,5".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._budgets: Optional[Dict[str, Budget]] = None
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+
+    def configure(self, budgets: Optional[Dict[str, Any]] = None) -> Dict[str, Budget]:
+        """
+        Replace the budgets; None reads the env vars again and {} removes
+        them all. Values may be Budget objects or dicts of its arguments.
+        Running calls finish on the old pools.
+        """
+        if budgets is None:
+            budgets = budgets_from_env()
+        parsed = {}
+        for guardrail, budget in budgets.items():
+            if guardrail not in GUARDRAILS:
+                raise ValueError(f"Unknown guardrail '{guardrail}', expected one of {GUARDRAILS}")
+            parsed[guardrail] = budget if isinstance(budget, Budget) else Budget(**budget)
+            cores = parsed[guardrail].cores
+            if cores and hasattr(os, "sched_getaffinity"):
+                unavailable = set(cores) - os.sched_getaffinity(0)
+                if unavailable:
+                    raise ValueError(
+                        f"Cores {sorted(unavailable)} of {guardrail} are not available to this process")
+        with self._lock:
+            previous, self._pools = self._pools, {}
+            self._budgets = parsed
+        for pool in previous.values():
+            pool.shutdown(wait=False)
+        return parsed
+
+    def budgets(self) -> Dict[str, Budget]:
+        if self._budgets is None:
+            self.configure()
+        return self._budgets
+
+    def budget(self, guardrail: str) -> Optional[Budget]:
+        return self.budgets().get(guardrail)
+
+    def executor_for(self, guardrail: str) -> Optional[ThreadPoolExecutor]:
+        """The guardrail's own pool, or None when it has no budget."""
+        pool = self._pools.get(guardrail)
+        if pool is not None:
+            return pool
+        budget = self.budget(guardrail)
+        if budget is None:
+            return None
+        with self._lock:
+            if guardrail not in self._pools:
+                self._pools[guardrail] = _start_pool(guardrail, budget)
+            return self._pools[guardrail]
+
+    def call(self, guardrail: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `func` within the guardrail's budget and wait for it."""
+        pool = self.executor_for(guardrail)
+        if pool is None:
+            return func(*args, **kwargs)
+        return pool.submit(func, *args, **kwargs).result()
+
+    def report(self) -> Dict[str, dict]:
+        return {guardrail: budget.to_dict() for guardrail, budget in self.budgets().items()}
+
+    def shutdown(self):
+        with self._lock:
+            previous, self._pools = self._pools, {}
+        for pool in previous.values():
+            pool.shutdown(wait=False)
+
+
+def _apply_budget(budget: Budget):
+    # Pin first: the OpenMP threads torch starts from here inherit the mask
+    if budget.cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, budget.cores)
+    if budget.threads:
+        import torch
+        # torch adopts the process-wide count on a thread's first use; do
+        # that now so the count set next stays with this thread
+        torch.get_num_threads()
+        torch.set_num_threads(budget.threads)
+
+
+def _start_pool(guardrail: str, budget: Budget) -> ThreadPoolExecutor:
+    default_threads = None
+    if budget.threads:
+        import torch
+        default_threads = torch.get_num_threads()
+    pool = ThreadPoolExecutor(
+        max_workers=budget.max_concurrent,
+        thread_name_prefix=f"guardrails-{guardrail}",
+        initializer=_apply_budget,
+        initargs=(budget,))
+    # Start every thread now, while the process default can be put back:
+    # torch.set_num_threads also changes the count threads started later adopt
+    barrier = threading.Barrier(budget.max_concurrent + 1)
+    futures = [pool.submit(barrier.wait) for _ in range(budget.max_concurrent)]
+    for future in futures:
+        # A failing initializer breaks the pool instead of reaching the barrier
+        future.add_done_callback(lambda f: f.exception() and barrier.abort())
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        pool.shutdown(wait=False)
+        raise next(
+            (f.exception() for f in futures if f.done() and f.exception()),
+            RuntimeError(f"Could not start the {guardrail} pool"))
+    if default_threads is not None:
+        import torch
+        torch.set_num_threads(default_threads)
+    logger.info(f"[Governor] {guardrail}: {budget.to_dict()}")
+    return pool
+
+
+def _parse(value: str, parse_value: Callable[[List[str]], Any]) -> Dict[str, Any]:
+    # "name=a,b,other=c": a part with "=" starts the next guardrail
+    parsed: Dict[str, List[str]] = {}
+    current = None
+    for part in (p.strip() for p in value.split(",")):
+        if not part:
+            continue
+        if "=" in part:
+            current, part = (s.strip() for s in part.split("=", 1))
+            parsed[current] = []
+        if current is None:
+            raise ValueError(f"Expected guardrail=value, got '{value}'")
+        parsed[current].append(part)
+    return {name: parse_value(parts) for name, parts in parsed.items()}
+
+
+def parse_cores(parts: List[str]) -> List[int]:
+    """CPU ids from items such as "0-3" and "6"."""
+    cores = []
+    for part in parts:
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return cores
+
+
+def budgets_from_env() -> Dict[str, Budget]:
+    threads = _parse(os.getenv("GUARDRAILS_THREAD_BUDGETS", ""), lambda parts: int(parts[0]))
+    cores = _parse(os.getenv("GUARDRAILS_CORE_AFFINITY", ""), parse_cores)
+    concurrent = _parse(os.getenv("GUARDRAILS_MAX_CONCURRENT", ""), lambda parts: int(parts[0]))
+    return {
+        guardrail: Budget(threads.get(guardrail), cores.get(guardrail), concurrent.get(guardrail))
+        for guardrail in (*threads, *cores, *concurrent)}
+
+
+def format_env(budgets: Dict[str, Budget]) -> Dict[str, str]:
+    """The env var settings that reproduce `budgets`."""
+    def ranges(cores):
+        spans, start = [], None
+        for i, core in enumerate(cores):
+            if start is None:
+                start = core
+            if i + 1 == len(cores) or cores[i + 1] != core + 1:
+                spans.append(str(start) if start == core else f"{start}-{core}")
+                start = None
+        return ",".join(spans)
+
+    env = {
+        "GUARDRAILS_THREAD_BUDGETS": ",".join(
+            f"{g}={b.threads}" for g, b in budgets.items() if b.threads),
+        "GUARDRAILS_CORE_AFFINITY": ",".join(
+            f"{g}={ranges(b.cores)}" for g, b in budgets.items() if b.cores),
+        "GUARDRAILS_MAX_CONCURRENT": ",".join(
+            f"{g}={b.max_concurrent}" for g, b in budgets.items()),
+    }
+    return {name: value for name, value in env.items() if value}
+
+
+governor = ResourceGovernor()
@@ -0,0 +1,397 @@
+"""
+Inference server: hosts the guardrail models in a small fixed pool of
+processes so that API workers (e.g. `uvicorn --workers 8`) do not each load
+their own copy.
+
+Start the server, then run the API with GUARDRAILS_EXECUTOR=remote. Both
+sides read the same GUARDRAILS_INFERENCE_* settings. API workers tokenize and
+pad locally and send the tensors over a Unix socket. Only the forward passes
+and the Presidio/spaCy analysis run in the server.
+
+Calls and replies are pickled, so both ends authenticate each other with a
+shared key: GUARDRAILS_INFERENCE_AUTHKEY, or else a random key the server
+keeps in a private file next to the socket.
+
+Usage:
+    python -m guardrails_sdk.runtime.inference --processes 2
+    GUARDRAILS_EXECUTOR=remote uvicorn app:app --workers 8
+"""
+import os
+import sys
+import stat
+import pickle
+import signal
+import logging
+import secrets
+import argparse
+import tempfile
+import functools
+import importlib
+import threading
+import multiprocessing
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional
+
+from .executor import get_executor
+
+logger = logging.getLogger("guardrails.inference")
+
+
+# "guardrails_sdk." in the SDK, "" in the API tree
+_ROOT = (__package__ or "").rsplit("runtime", 1)[0]
+# Importing these registers the models the server can load
+GUARDRAIL_MODULES = (
+    "toxicity.toxic_bert", "prompt_secure.prompt_break", "prompt_secure.attack_index", "pii.pii")
+# Whose CPU budget (see governor.py) the calls of each module run within
+_GUARDRAIL_OF = dict(zip(
+    GUARDRAIL_MODULES, ("toxicity", "prompt_injection", "prompt_injection", "pii")))
+
+_client: Optional["InferenceClient"] = None
+
+
+def inference(func: Callable) -> Callable:
+    """
+    Mark a module-level function as model work. When the remote executor is
+    configured, calls are sent to the inference server and run there;
+    otherwise the function runs in place. Arguments and results must be
+    picklable.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _client is None:
+            return func(*args, **kwargs)
+        return _client.call(func.__module__, func.__qualname__, args, kwargs)
+
+    wrapper.local = func
+    return wrapper
+
+
+def default_socket() -> str:
+    """A socket in a directory only this user can enter."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "guardrails", "inference.sock")
+    return os.path.join(tempfile.gettempdir(), f"guardrails-{os.getuid()}", "inference.sock")
+
+
+def _base_socket(socket_path: Optional[str] = None) -> str:
+    return socket_path or os.getenv("GUARDRAILS_INFERENCE_SOCKET") or default_socket()
+
+
+def addresses(socket_path: Optional[str] = None, processes: Optional[int] = None) -> List[str]:
+    """Socket paths of the server processes, from GUARDRAILS_INFERENCE_SOCKET/_PROCESSES."""
+    base = _base_socket(socket_path)
+    processes = processes or int(os.getenv("GUARDRAILS_INFERENCE_PROCESSES", "1"))
+    if processes == 1:
+        return [base]
+    return [f"{base}.{i}" for i in range(processes)]
+
+
+def _key_path(base: str) -> str:
+    return base + ".key"
+
+
+def _authkey(base: str, create: bool = False) -> bytes:
+    """
+    GUARDRAILS_INFERENCE_AUTHKEY, else the key stored next to the socket.
+    The server (`create=True`) generates that key on its first start.
+    """
+    key = os.getenv("GUARDRAILS_INFERENCE_AUTHKEY")
+    if key:
+        return key.encode()
+    path = _key_path(base)
+    if create and not os.path.exists(path):
+        _private_dir(os.path.dirname(os.path.abspath(path)))
+        # Written aside and linked into place, so no reader sees it half
+        # written and an existing key is never replaced
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    _check_owner(path)
+    with open(path) as f:
+        return f.read().strip().encode()
+
+
+def _check_owner(path: str, private: bool = True):
+    # Refuse files another user could have planted or can read
+    info = os.lstat(path)
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by another user")
+    if private and info.st_mode & 0o077:
+        raise PermissionError(f"{path} is accessible to other users, expected mode 0600")
+
+
+def _private_dir(path: str):
+    # Created 0700 when missing. An existing one must belong to us or root
+    # and must not let other users replace our files (not writable by them,
+    # or sticky like /tmp)
+    if not os.path.isdir(path):
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid not in (os.getuid(), 0):
+        raise PermissionError(f"{path} is owned by another user")
+    if info.st_mode & 0o022 and not info.st_mode & stat.S_ISVTX:
+        raise PermissionError(f"{path} is writable by other users")
+
+
+class InferenceClient:
+    """
+    Sends calls to the inference server processes. Each call checks out an
+    idle connection (opening one if needed) to the process with the fewest
+    calls in flight, so concurrent batches spread over the pool.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, processes: Optional[int] = None):
+        self.base = _base_socket(socket_path)
+        self.addresses = addresses(self.base, processes)
+        # Read on first connect: the server may not have created it yet
+        self.authkey: Optional[bytes] = None
+        self._lock = threading.Lock()
+        self._idle: Dict[str, list] = {address: [] for address in self.addresses}
+        self._inflight: Dict[str, int] = {address: 0 for address in self.addresses}
+
+    def call(self, module: str, qualname: str, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            address = min(self.addresses, key=self._inflight.__getitem__)
+            self._inflight[address] += 1
+        try:
+            return self._request(address, ("call", module, qualname, args, kwargs))
+        finally:
+            with self._lock:
+                self._inflight[address] -= 1
+
+    def broadcast(self, *message) -> list:
+        """Send a control message to every server process."""
+        return [self._request(address, message) for address in self.addresses]
+
+    def warmup(self, names: Optional[List[str]] = None) -> dict:
+        return _merge_status(self.broadcast("warmup", names))
+
+    def status(self, names: Optional[List[str]] = None) -> dict:
+        try:
+            return _merge_status(self.broadcast("status", names))
+        except (OSError, EOFError) as e:
+            # Not started yet: report nothing as ready
+            logger.warning(f"[Inference] Server unreachable: {e}")
+            return {}
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+                idle.clear()
+
+    def _request(self, address: str, message: tuple) -> Any:
+        payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        # A pooled connection may have died with a restarted server; retry
+        # once on a fresh one
+        for attempt in range(2):
+            conn = self._checkout(address, fresh=attempt > 0)
+            try:
+                conn.send_bytes(payload)
+                status, value = pickle.loads(conn.recv_bytes())
+            except (OSError, EOFError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            with self._lock:
+                self._idle[address].append(conn)
+            if status == "error":
+                raise value
+            return value
+
+    def _checkout(self, address: str, fresh: bool):
+        if not fresh:
+            with self._lock:
+                if self._idle[address]:
+                    return self._idle[address].pop()
+        if self.authkey is None:
+            self.authkey = _authkey(self.base)
+        # Both ends prove they know the key, so a socket planted by another
+        # user cannot feed us replies
+        return Client(address, family="AF_UNIX", authkey=self.authkey)
+
+
+def configure_remote(socket_path: Optional[str] = None, processes: Optional[int] = None):
+    """Send calls of @inference functions to the inference server."""
+    global _client
+    previous, _client = _client, InferenceClient(socket_path, processes)
+    if previous is not None:
+        previous.close()
+
+
+def disable_remote():
+    """Run @inference functions in place again."""
+    global _client
+    previous, _client = _client, None
+    if previous is not None:
+        previous.close()
+
+
+def remote_client() -> Optional[InferenceClient]:
+    # The executor reads GUARDRAILS_EXECUTOR on first use, which may
+    # configure the client
+    get_executor()
+    return _client
+
+
+# === Server ===
+
+def _merge_status(statuses: List[dict]) -> dict:
+    # A model is only as ready as its least ready copy
+    order = {"failed": 0, "loading": 1, "not_loaded": 2, "ready": 3}
+    merged: dict = {}
+    for status in statuses:
+        for name, entry in status.items():
+            if name not in merged or order[entry["state"]] < order[merged[name]["state"]]:
+                merged[name] = entry
+    return merged
+
+
+def _handle(conn):
+    from .governor import governor
+    from .registry import registry
+
+    try:
+        while True:
+            try:
+                message = pickle.loads(conn.recv_bytes())
+            except EOFError:
+                return
+            try:
+                kind = message[0]
+                if kind == "call":
+                    _, module, qualname, args, kwargs = message
+                    func = getattr(importlib.import_module(module), qualname)
+                    if not hasattr(func, "local"):
+                        raise ValueError(f"{module}.{qualname} is not an @inference function")
+                    guardrail = _GUARDRAIL_OF.get(module[len(_ROOT):])
+                    if guardrail:
+                        reply = ("ok", governor.call(guardrail, func.local, *args, **kwargs))
+                    else:
+                        reply = ("ok", func.local(*args, **kwargs))
+                elif kind == "warmup":
+                    reply = ("ok", registry.warmup(message[1]))
+                elif kind == "status":
+                    reply = ("ok", registry.status(message[1]))
+                else:
+                    raise ValueError(f"Unknown message '{kind}'")
+            except Exception as e:
+                reply = ("error", e)
+            try:
+                payload = pickle.dumps(reply, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                payload = pickle.dumps(("error", RuntimeError(f"Unpicklable reply: {e}")))
+            conn.send_bytes(payload)
+    finally:
+        conn.close()
+
+
+def serve(address: str, warmup: Optional[List[str]] = None, torch_threads: Optional[int] = None,
+          authkey: Optional[bytes] = None):
+    """
+    Serve @inference calls on a Unix socket, one thread per connection.
+    `authkey` defaults to the key of `address`, see `_authkey`.
+    """
+    from .executor import configure_executor
+    from .registry import registry
+
+    authkey = authkey or _authkey(address, create=True)
+
+    # Never forward calls from the server itself
+    configure_executor("thread")
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    for module in GUARDRAIL_MODULES:
+        importlib.import_module(_ROOT + module)
+    if warmup is None or warmup:
+        registry.warmup(warmup)
+
+    listener = _listen(address, authkey)
+    print(f"[inference] pid {os.getpid()} serving on {address}", flush=True)
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                # e.g. a client without the key
+                logger.warning(f"[Inference] Rejected a connection: {e!r}")
+                continue
+            threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+    finally:
+        listener.close()
+
+
+def _listen(address: str, authkey: bytes) -> Listener:
+    _private_dir(os.path.dirname(os.path.abspath(address)))
+    if os.path.lexists(address):
+        # A stale socket of ours is replaced; anything else is not ours to remove
+        _check_owner(address, private=False)
+        if not stat.S_ISSOCK(os.lstat(address).st_mode):
+            raise FileExistsError(f"{address} exists and is not a socket")
+        os.remove(address)
+    # Calls are unpickled, so only the owner may connect: the socket is
+    # created 0600 instead of being chmod-ed after it is already listening
+    umask = os.umask(0o077)
+    try:
+        return Listener(address, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(umask)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--socket", default=None,
+                        help="Socket path (default: GUARDRAILS_INFERENCE_SOCKET, then "
+                             "$XDG_RUNTIME_DIR/guardrails/inference.sock or /tmp/guardrails-<uid>/inference.sock)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Server processes, each with one copy of the models "
+                             "(default: GUARDRAILS_INFERENCE_PROCESSES, then 1)")
+    parser.add_argument("--warmup", default=None,
+                        help="Models to load at startup, comma separated (default: all, 'none' to skip)")
+    args = parser.parse_args(argv)
+
+    warmup = None
+    if args.warmup is not None:
+        warmup = [name for name in args.warmup.split(",") if name and name != "none"]
+    base = _base_socket(args.socket)
+    paths = addresses(base, args.processes)
+    # One key for every process, so clients need only the base path
+    authkey = _authkey(base, create=True)
+    # Split the cores between the processes instead of oversubscribing them
+    torch_threads = max(1, (os.cpu_count() or 1) // len(paths))
+
+    if len(paths) == 1:
+        serve(paths[0], warmup, torch_threads, authkey)
+        return 0
+
+    # fork() after torch has started its thread pools can deadlock
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=serve, args=(path, warmup, torch_threads, authkey), daemon=True)
+        for path in paths]
+    for worker in workers:
+        worker.start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            worker.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("guardrails.metrics")
+
+# Seconds, from sub-millisecond regex scans to multi-second long documents
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Help text and histogram buckets of the metrics recorded by the guardrails
+DESCRIPTIONS = {
+    "guardrails_guardrail_seconds": "Latency of one guardrail call, cache hits included",
+    "guardrails_stage_seconds": "Time spent in one stage of a guardrail",
+    "guardrails_batch_size": "Items per model call of a micro-batcher",
+    "guardrails_cascade_decisions_total": "Prompt injection decisions by the stage that made them",
+    "guardrails_pii_analysis_total": "PII analyses by path (regex or nlp)",
+    "guardrails_cache_lookups_total": "Result cache lookups by outcome",
+    "guardrails_cache_entries": "Entries held by the result cache",
+    "guardrails_log_write_seconds": "Time to insert one batch of anomaly rows",
+    "guardrails_log_rows_total": "Anomaly rows by outcome",
+    "guardrails_log_queue_depth": "Anomaly rows waiting for the writer thread",
+    "guardrails_http_request_seconds": "HTTP request latency by route",
+}
+BUCKETS = {
+    "guardrails_batch_size": SIZE_BUCKETS,
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, type, value, labels) of a gauge or counter read at scrape time
+Sample = Tuple[str, str, float, Dict[str, str]]
+
+
+class MetricsHook:
+    """
+    Receives every metric update as it happens, e.g. to forward it to
+    StatsD, OpenTelemetry or an app's own Prometheus registry. Override the
+    methods you need; the defaults ignore the update.
+
+    Hooks run inline on the hot path (sometimes on worker threads), so they
+    should hand the value off quickly. Exceptions are logged and swallowed.
+    """
+
+    def observe(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        """A histogram observation (durations in seconds, batch sizes)."""
+
+    def increment(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        """A counter increase."""
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide counters and histograms for the guardrails' hot paths,
+    rendered in the Prometheus text format by `render_prometheus`.
+
+    Values recorded through `observe`/`increment` are also pushed to every
+    registered MetricsHook. Gauges that are cheap to read on demand (queue
+    depths, cache size) come from collectors called at scrape time.
+
+    Recording is on by default; GUARDRAILS_METRICS=0 turns it into a no-op.
+    With the process executor, stages that run inside worker processes are
+    recorded there and do not show up in the parent.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("GUARDRAILS_METRICS", "1") != "0"
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._hooks: List[MetricsHook] = []
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+        for hook in self._hooks:
+            self._call(hook.observe, name, value, labels)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+        for hook in self._hooks:
+            self._call(hook.increment, name, value, labels)
+
+    @contextmanager
+    def time(self, name: str, **labels: str) -> Iterator[None]:
+        """Observe the duration of the `with` block in seconds."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def stage(self, guardrail: str, stage: str):
+        """Time one stage (tokenize, infer, analyze, ...) of a guardrail."""
+        return self.time("guardrails_stage_seconds", guardrail=guardrail, stage=stage)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def add_hook(self, hook: MetricsHook) -> None:
+        # Copy on write so recording never iterates a list being changed
+        self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook: MetricsHook) -> None:
+        self._hooks = [h for h in self._hooks if h is not hook]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Current values as plain data: {"histograms": {name: [{"labels",
+        "count", "sum", "buckets"}]}, "counters": {name: [{"labels",
+        "value"}]}, "gauges": {name: [{"labels", "value"}]}}.
+        """
+        with self._lock:
+            histograms = {
+                name: [
+                    {"labels": dict(key), "count": h.count, "sum": h.sum,
+                     "buckets": dict(zip(h.buckets, _cumulative(h.counts)))}
+                    for key, h in series.items()]
+                for name, series in self._histograms.items()}
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()}
+        gauges: Dict[str, list] = {}
+        for name, kind, value, labels in self._collect():
+            target = counters if kind == "counter" else gauges
+            target.setdefault(name, []).append({"labels": labels, "value": value})
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, series in sorted(snapshot["histograms"].items()):
+            _header(lines, name, "histogram")
+            for s in series:
+                for bound, count in s["buckets"].items():
+                    lines.append(f"{name}_bucket{_labels(s['labels'], le=_number(bound))} {count}")
+                lines.append(f"{name}_bucket{_labels(s['labels'], le='+Inf')} {s['count']}")
+                lines.append(f"{name}_sum{_labels(s['labels'])} {_number(s['sum'])}")
+                lines.append(f"{name}_count{_labels(s['labels'])} {s['count']}")
+        for kind in ("counters", "gauges"):
+            for name, series in sorted(snapshot[kind].items()):
+                _header(lines, name, "counter" if kind == "counters" else "gauge")
+                for s in series:
+                    lines.append(f"{name}{_labels(s['labels'])} {_number(s['value'])}")
+        return "\n".join(lines) + "\n"
+
+    def _collect(self) -> List[Sample]:
+        samples = []
+        for collector in list(self._collectors):
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                logger.error(f"[Metrics] Collector failed: {e}")
+        return samples
+
+    @staticmethod
+    def _call(method, name, value, labels):
+        try:
+            method(name, value, labels)
+        except Exception as e:
+            logger.error(f"[Metrics] Hook failed on {name}: {e}")
+
+
+def _cumulative(counts: List[int]) -> List[int]:
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+def _header(lines: List[str], name: str, kind: str):
+    lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _labels(labels: Dict[str, str], **extra: str) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        f'{key}="{_escape(value)}"' for key, value in sorted(pairs.items())) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
@@ -0,0 +1,116 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("guardrails.registry")
+
+
+class _Entry:
+    def __init__(self, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]]):
+        self.loader = loader
+        self.warmup = warmup
+        self.lock = threading.Lock()
+        self.value: Any = None
+        self.state = "not_loaded"
+        self.load_seconds: Optional[float] = None
+        self.warmup_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class ModelRegistry:
+    """
+    Loads guardrail models on first use instead of at import time.
+
+    Each guardrail module registers a loader (and optionally a warmup function
+    that runs a dummy inference) under its guardrail name. `get` loads the model
+    once per process, thread-safely; `warmup` preloads ahead of traffic; `status`
+    reports per-model state for readiness checks.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self._entries[name] = _Entry(loader, warmup)
+
+    def unregister(self, name: str):
+        self._entries.pop(name, None)
+
+    def names(self) -> list:
+        return list(self._entries)
+
+    def _entry(self, name: str) -> _Entry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise ValueError(
+                f"Unknown guardrail model '{name}', expected one of {self.names()}")
+
+    def get(self, name: str) -> Any:
+        entry = self._entry(name)
+        if entry.state == "ready":
+            return entry.value
+        with entry.lock:
+            if entry.state != "ready":
+                entry.state = "loading"
+                start = time.perf_counter()
+                try:
+                    entry.value = entry.loader()
+                except Exception as e:
+                    entry.state = "failed"
+                    entry.error = str(e)
+                    logger.error(f"[ModelRegistry] Failed to load {name}: {e}")
+                    raise
+                entry.load_seconds = time.perf_counter() - start
+                entry.error = None
+                entry.state = "ready"
+                logger.info(
+                    f"[ModelRegistry] Loaded {name} in {entry.load_seconds:.2f}s")
+        return entry.value
+
+    def warmup(self, names: Optional[Iterable[str]] = None) -> dict:
+        """Load the given models (all by default) and run their dummy inference."""
+        remote = _remote_client()
+        if remote is not None:
+            return remote.warmup(list(names) if names is not None else None)
+        names = list(names) if names is not None else self.names()
+        for name in names:
+            entry = self._entry(name)
+            value = self.get(name)
+            if entry.warmup is not None:
+                start = time.perf_counter()
+                entry.warmup(value)
+                entry.warmup_ms = (time.perf_counter() - start) * 1000
+        return self.status(names)
+
+    def status(self, names: Optional[Iterable[str]] = None) -> dict:
+        remote = _remote_client()
+        if remote is not None:
+            return remote.status(list(names) if names is not None else None)
+        names = list(names) if names is not None else self.names()
+        return {
+            name: {
+                "state": self._entries[name].state,
+                "load_seconds": self._entries[name].load_seconds,
+                "warmup_ms": self._entries[name].warmup_ms,
+                "error": self._entries[name].error
+            }
+            for name in names if name in self._entries
+        }
+
+    def is_ready(self, names: Optional[Iterable[str]] = None) -> bool:
+        names = list(names) if names is not None else None
+        status = self.status(names)
+        if names is None:
+            names = list(status)
+        return all(name in status and status[name]["state"] == "ready" for name in names)
+
+
+def _remote_client():
+    # With the remote executor the models live in the inference server
+    from .inference import remote_client
+    return remote_client()
+
+
+registry = ModelRegistry()
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+CONFIG = {"toxicity": False, "block_words": ["secret"]}
+
+
+@pytest.fixture
+def client():
+    return TestClient(app_module.app)
+
+
+def _post(client, lines):
+    body = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+    response = client.post("/api/v1/stream", content=body.encode())
+    assert response.status_code == 200
+    return [json.loads(chunk[len("data: "):])
+            for chunk in response.text.split("\n\n") if chunk.startswith("data: ")]
+
+
+def test_stream_is_guarded(client):
+    events = _post(client, [CONFIG, {"delta": "the secret "}, {"delta": "is out"}])
+    assert events[-1]["done"]
+    text = "".join(event["text"] for event in events)
+    assert "secret" not in text and text.endswith("is out")
+
+
+@pytest.mark.parametrize("line", [{"text": "no delta key"}, '"just a string"', "{not json"])
+def test_invalid_line_ends_the_stream_with_an_error_event(client, line):
+    events = _post(client, [CONFIG, {"delta": "hello "}, line, {"delta": "never read"}])
+    assert events[-1]["error"].startswith("Invalid line")
+    assert "never read" not in json.dumps(events)
+
+
+def test_overlong_line_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_LINE_BYTES", 64)
+    events = _post(client, [CONFIG, {"delta": "x" * 100}])
+    assert "longer than 64 bytes" in events[-1]["error"]
+
+
+def test_overlong_config_line_is_a_bad_request(client, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_LINE_BYTES", 16)
+    response = client.post("/api/v1/stream", content=json.dumps(CONFIG).encode())
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _expect_rejection(ws):
+    event = ws.receive_json()
+    with pytest.raises(WebSocketDisconnect) as close:
+        ws.receive_json()
+    assert close.value.code == 1003
+    return event
+
+
+def test_invalid_config_is_rejected(client):
+    with client.websocket_connect("/api/v1/stream/ws") as ws:
+        ws.send_json({"guardrails": ["EMAIL_ADDRESS"], "treshold": "high"})
+        event = _expect_rejection(ws)
+    assert event["error"].startswith("Invalid stream config")
+
+
+def test_config_that_is_not_an_object_is_rejected(client):
+    with client.websocket_connect("/api/v1/stream/ws") as ws:
+        ws.send_json(["EMAIL_ADDRESS"])
+        assert "error" in _expect_rejection(ws)
+
+
+@pytest.mark.parametrize("message", [{"text": "no delta key"}, "just a string"])
+def test_invalid_delta_message_is_rejected(client, message):
+    with client.websocket_connect("/api/v1/stream/ws") as ws:
+        ws.send_json({"guardrails": ["EMAIL_ADDRESS"]})
+        ws.send_json(message)
+        event = _expect_rejection(ws)
+    assert event["error"].startswith("Invalid message")
+
+
+def _stream(ws, config, deltas):
+    ws.send_json(config)
+    for delta in deltas:
+        ws.send_json({"delta": delta})
+    ws.send_json({"done": True})
+    events = []
+    while not events or not events[-1].get("done"):
+        events.append(ws.receive_json())
+    return "".join(event["text"] for event in events)
+
+
+def test_word_lists_come_with_the_config(client, tmp_path):
+    words = tmp_path / "words.txt"
+    words.write_text("secret\n")
+    with client.websocket_connect("/api/v1/stream/ws") as ws:
+        text = _stream(ws, {"toxicity": False, "block_words": ["secret"]}, ["the secret ", "is out"])
+    assert "secret" not in text and text.endswith("is out")
+    with client.websocket_connect("/api/v1/stream/ws") as ws:
+        text = _stream(ws, {"toxicity": False, "block_loc": str(words)}, ["the secret ", "is out"])
+    assert text == "the secret is out"
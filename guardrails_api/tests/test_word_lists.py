@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+
+WORDS_ONLY = {"tiers": [["banned_words"]], "block_on": ["banned_words"]}
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_pipeline_uses_in_memory_word_lists(client):
+    response = client.post("/api/v1/run_pipeline", json={
+        "content": "ask AcmeCorp about it", "guardrails": [], "action": "mask",
+        "compitator_words": ["AcmeCorp"], "policy": WORDS_ONLY})
+    assert response.status_code == 200
+    assert "AcmeCorp" not in response.json()["moderate_result"]["cleaned_text"]
+
+
+def test_pipeline_never_opens_client_paths(client, tmp_path):
+    words = tmp_path / "words.txt"
+    words.write_text("secret\n")
+    response = client.post("/api/v1/run_pipeline", json={
+        "content": "the secret is out", "guardrails": [], "action": "block",
+        "block_loc": str(words), "policy": WORDS_ONLY})
+    assert response.status_code == 200
+    assert response.json()["moderate_result"] is None
+    assert not response.json()["blocked"]
+
+
+def test_batch_items_take_word_lists_in_memory(client, tmp_path):
+    words = tmp_path / "words.txt"
+    words.write_text("secret\n")
+    response = client.post("/api/v1/batch", json={"items": [
+        {"content": "the secret is out", "checks": ["banned_words"], "action": "mask",
+         "block_words": ["secret"]},
+        {"content": "the secret is out", "checks": ["banned_words"], "action": "mask",
+         "block_loc": str(words)},
+    ]})
+    assert response.status_code == 200
+    masked, ignored = [item["results"]["moderate_result"] for item in response.json()["results"]]
+    assert "secret" not in masked["cleaned_text"]
+    assert ignored["cleaned_text"] == "the secret is out"
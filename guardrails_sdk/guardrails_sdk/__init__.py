@@ -1 +1,5 @@
-from .guardrails import GuardrailsClient, ToxiRequest, Prompt, TransformRequest,Compitator
+from .guardrails import GuardrailsClient, ToxiRequest, Prompt, TransformRequest,Compitator, TransformManyRequest, PipelineRequest
+from .pipeline import PipelinePolicy
+from .streaming import StreamRequest
+from .batch import BatchItem, BatchRequest
+from .runtime.metrics import MetricsHook
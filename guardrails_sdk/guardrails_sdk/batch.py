@@ -0,0 +1,142 @@
+import os
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Literal, Optional, Union
+
+from pydantic import BaseModel
+
+from guardrails_sdk.pii.pii import analyze_text, mask_text
+from guardrails_sdk.toxicity.toxic_bert import detect_toxicity
+from guardrails_sdk.prompt_secure.prompt_break import classify_prompt_injection
+from guardrails_sdk.compitator_banned_words.block_words import moderate_text, UserInputError
+
+# Items processed at the same time. Model calls of concurrent items are
+# micro-batched, so this also bounds how full those batches can get.
+BATCH_CONCURRENCY = int(os.getenv("GUARDRAILS_BATCH_CONCURRENCY", "64"))
+# Largest `items` list accepted by one /api/v1/batch call
+MAX_BATCH_ITEMS = int(os.getenv("GUARDRAILS_MAX_BATCH_ITEMS", "1000"))
+
+Check = Literal["pii", "toxicity", "prompt_injection", "banned_words"]
+
+
+class BatchItem(BaseModel):
+    content: str
+    id: Optional[str] = None
+    checks: List[Check] = ["pii", "toxicity", "prompt_injection"]
+    guardrails: List[str] = []
+    treshold: float = 0.5
+    custom_entities: Optional[List[Dict]] = None
+    action: Optional[Literal["mask", "block"]] = None
+    # Word lists come with the item; a batch never opens files it names
+    compitator_words: Optional[List[str]] = None
+    block_words: Optional[List[str]] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+
+async def run_item(item: BatchItem) -> Dict[str, Any]:
+    """Run an item's checks concurrently; model calls join the shared micro-batches."""
+    checks = {}
+    if "pii" in item.checks:
+        checks["pii"] = _pii(item)
+    if "toxicity" in item.checks:
+        checks["toxicity"] = detect_toxicity(item.content, item.treshold)
+    if "prompt_injection" in item.checks:
+        checks["prompt_injection"] = classify_prompt_injection(item.content)
+    if "banned_words" in item.checks:
+        checks["moderate_result"] = _moderate(item)
+
+    results = await asyncio.gather(*checks.values())
+    return dict(zip(checks, results))
+
+
+async def _pii(item: BatchItem) -> dict:
+    results = await analyze_text(
+        item.content, item.guardrails, item.custom_entities, batched=True)
+    return mask_text(item.content, results, item.treshold)
+
+
+async def _moderate(item: BatchItem) -> dict:
+    try:
+        return await moderate_text(
+            item.content, item.block_words, item.compitator_words, item.action)
+    except UserInputError as e:
+        return {"status": "blocked", "cleaned_text": None, "error": e.message}
+
+
+async def iter_batch(
+    items: Union[Iterable[Union[BatchItem, dict]], AsyncIterable[Union[BatchItem, dict]]],
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run items with at most `concurrency` in flight and yield each result as
+    soon as it completes, so neither the input nor the output is ever held
+    in memory as a whole. Items may also be plain dicts; one that is not a
+    valid BatchItem gets an error result instead of ending the run.
+
+    Yields:
+        dict: {"index", "id", "results"} or, when the item failed,
+        {"index", "id", "error"}. Results arrive in completion order; use
+        "index" (position in the input) to reorder.
+    """
+    concurrency = concurrency or BATCH_CONCURRENCY
+    running = {}
+    done_queue: List[asyncio.Task] = []
+
+    async def run(index: int, item: Union[BatchItem, dict]) -> Dict[str, Any]:
+        item_id = item.get("id") if isinstance(item, dict) else item.id
+        try:
+            if isinstance(item, dict):
+                item = BatchItem(**item)
+            return {"index": index, "id": item_id, "results": await run_item(item)}
+        except Exception as e:
+            return {"index": index, "id": item_id, "error": str(e)}
+
+    async def drain():
+        # Wait for at least one running item to finish
+        nonlocal running
+        if not running:
+            return
+        done, pending = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        running = {task: None for task in pending}
+        done_queue.extend(done)
+
+    try:
+        index = 0
+        async for item in _aiter(items):
+            if len(running) >= concurrency:
+                await drain()
+            else:
+                # Hand out whatever finished while this item was arriving
+                done_queue.extend(task for task in running if task.done())
+                for task in done_queue:
+                    running.pop(task, None)
+            while done_queue:
+                yield done_queue.pop().result()
+            running[asyncio.ensure_future(run(index, item))] = None
+            index += 1
+        while running or done_queue:
+            await drain()
+            while done_queue:
+                yield done_queue.pop().result()
+    finally:
+        for task in running:
+            task.cancel()
+
+
+async def run_batch(items: List[BatchItem], concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run all items and return their results in input order."""
+    results = [None] * len(items)
+    async for result in iter_batch(items, concurrency):
+        results[result["index"]] = result
+    return results
+
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
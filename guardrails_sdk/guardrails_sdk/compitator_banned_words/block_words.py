@@ -1,5 +1,15 @@
-import re
-from typing import Literal
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Literal, Sequence, Union
+
+from guardrails_sdk.runtime.executor import run_model
+from guardrails_sdk.runtime.metrics import metrics
+from .matcher import build_matcher, mask_spans
+
+# A word list is either a path to a comma separated file or the words themselves
+WordSource = Union[str, Sequence[str], None]
 
 class UserInputError(Exception):
     """Exception raised for user-facing input errors."""
@@ -9,55 +19,148 @@ class UserInputError(Exception):
 
 async def moderate_text(
     text: str,
-    banned_words_file: str,
-    competitor_words_file: str,
+    banned_words_file: WordSource,
+    competitor_words_file: WordSource,
     action: Literal["mask", "block"] = "mask"
 ) -> dict:
-    banned_words = _load_words(banned_words_file)
-    competitor_words = _load_words(competitor_words_file)
+    """
+    Find, and mask or block, banned and competitor words in text.
+
+    Args:
+        text (str): The text to moderate.
+        banned_words_file: Path to a comma separated word file, or a list of words.
+        competitor_words_file: Path to a comma separated word file, or a list of words.
+        action (str): "mask" replaces matches with asterisks, "block" raises
+            UserInputError.
+    """
+    # Regex scans over large word lists are blocking work
+    with metrics.time("guardrails_guardrail_seconds", guardrail="banned_words"):
+        return await run_model(
+            "banned_words", _moderate_text, text, banned_words_file, competitor_words_file, action)
+
 
-    banned_pattern = _compile_pattern(banned_words)
-    competitor_pattern = _compile_pattern(competitor_words)
+def _moderate_text(
+    text: str,
+    banned_words_file: WordSource,
+    competitor_words_file: WordSource,
+    action: Literal["mask", "block"] = "mask"
+) -> dict:
+    matcher = get_matcher(banned_words_file, competitor_words_file)
 
     result = {
         "status": "allowed",
         "cleaned_text": text,
         "banned_words": [],
-        "competitors": []
+        "competitors": [],
+        "matches": []
     }
 
-    banned_matches = banned_pattern.findall(text)
-    competitor_matches = competitor_pattern.findall(text)
+    # One scan finds both categories along with their offsets
+    with metrics.stage("banned_words", "match"):
+        matches = matcher.find(text)
 
-    if banned_matches or competitor_matches:
-        result["banned_words"] = banned_matches
-        result["competitors"] = competitor_matches
+    if matches:
+        result["banned_words"] = [
+            text[start:end] for category, start, end in matches if category == "banned"]
+        result["competitors"] = [
+            text[start:end] for category, start, end in matches if category == "competitor"]
+        result["matches"] = [
+            {"category": category, "start": start, "end": end, "text": text[start:end]}
+            for category, start, end in matches]
 
         if action == "block":
             result["status"] = "blocked"
             result["cleaned_text"] = None
             raise UserInputError("Found blocked content")
         elif action == "mask":
-            def mask_word(match): return "*" * len(match.group(0))
-            text = banned_pattern.sub(mask_word, text)
-            text = competitor_pattern.sub(mask_word, text)
-            result["cleaned_text"] = text
+            with metrics.stage("banned_words", "mask"):
+                result["cleaned_text"] = mask_spans(text, matches)
 
     return result
 
 
-def _compile_pattern(words: tuple) -> re.Pattern:
-    if not words:
-        return re.compile(r"$^")  # Matches nothing
-    escaped = [re.escape(word) for word in words]
-    pattern = r"\b(" + "|".join(escaped) + r")\b"
-    return re.compile(pattern, flags=re.IGNORECASE)
+# Word lists per source. Files are re-read only when their mtime or size
+# changes; a matcher is built once per pair of list contents and kept in a
+# small LRU, so touching a file without changing it never recompiles
+MAX_MATCHERS = 128
+
+_file_words = {}
+_matchers = OrderedDict()
+_matcher_lock = threading.Lock()
+
+
+class _CachedWords:
+    def __init__(self, signature: tuple, digest: str, words: tuple):
+        self.signature = signature
+        self.digest = digest
+        self.words = words
+
+
+def get_matcher(banned_words: WordSource, competitor_words: WordSource):
+    """Return the matcher for a pair of word sources (file paths or word lists), building it at most once."""
+    banned, banned_digest = _get_words(banned_words)
+    competitors, competitor_digest = _get_words(competitor_words)
+    key = (banned_digest, competitor_digest)
+
+    with _matcher_lock:
+        matcher = _matchers.get(key)
+        if matcher is not None:
+            _matchers.move_to_end(key)
+            return matcher
+
+    with metrics.stage("banned_words", "build_matcher"):
+        matcher = build_matcher({"banned": banned, "competitor": competitors})
+    with _matcher_lock:
+        _matchers[key] = matcher
+        while len(_matchers) > MAX_MATCHERS:
+            _matchers.popitem(last=False)
+    return matcher
+
+
+def preload_matchers(banned_words: WordSource, competitor_words: WordSource) -> None:
+    """Load and compile a pair of word lists ahead of traffic, e.g. at server startup."""
+    get_matcher(banned_words, competitor_words)
+
+
+def _get_words(source: WordSource) -> tuple:
+    if source is None:
+        return (), ""
+    if isinstance(source, str):
+        return _file_words_for(source)
+    words = _normalize_words(source)
+    return words, _digest("\0".join(words))
+
+
+def _file_words_for(filepath: str) -> tuple:
+    try:
+        stat = os.stat(filepath)
+    except OSError as e:
+        raise ValueError(f"Error reading {filepath}: {e}")
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _matcher_lock:
+        cached = _file_words.get(filepath)
+    if cached is None or cached.signature != signature:
+        words, digest = _read_words(filepath)
+        cached = _CachedWords(signature, digest, words)
+        with _matcher_lock:
+            _file_words[filepath] = cached
+    return cached.words, cached.digest
+
+
+def _normalize_words(words: Iterable[str]) -> tuple:
+    return tuple(word.strip().lower() for word in words if word.strip())
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
 
 
-def _load_words(filepath: str) -> tuple:
+def _read_words(filepath: str) -> tuple:
     try:
         with open(filepath, 'r') as f:
             content = f.read()
-            return tuple(word.strip().lower() for word in content.split(",") if word.strip())
     except Exception as e:
-        raise ValueError(f"Error reading {filepath}: {e}")
\ No newline at end of file
+        raise ValueError(f"Error reading {filepath}: {e}")
+    words = _normalize_words(content.split(","))
+    return words, _digest("\0".join(words))
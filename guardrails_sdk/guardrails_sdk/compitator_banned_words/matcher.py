@@ -0,0 +1,179 @@
+import os
+import re
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Word list size (all categories together) from which the "auto" engine
+# switches from one regex alternation per category to the automaton
+AUTO_AUTOMATON_MIN_TERMS = int(os.getenv("GUARDRAILS_AUTOMATON_MIN_TERMS", "100"))
+
+# (category, start, end) of one matched term in the original text
+Match = Tuple[str, int, int]
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same definition as `\w` in a str pattern
+    return ch.isalnum() or ch == "_"
+
+
+def _is_boundary(text: str, pos: int) -> bool:
+    # Same definition as `\b`: a word character on exactly one side
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+def _fold(text: str) -> str:
+    # Lowercase without changing any offsets; a handful of characters
+    # lowercase to more than one character and are left as they are
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+def mask_spans(text: str, matches: List[Match]) -> str:
+    """Replace every matched span with asterisks of the same length."""
+    if not matches:
+        return text
+    chars = list(text)
+    for _, start, end in matches:
+        chars[start:end] = "*" * (end - start)
+    return "".join(chars)
+
+
+class RegexMatcher:
+    """
+    One `\\b(a|b|...)\\b` case-insensitive alternation per category. Fastest
+    for short word lists; cost grows with the number of terms.
+    """
+
+    engine = "regex"
+
+    def __init__(self, categories: Dict[str, Sequence[str]]):
+        self.patterns = {
+            category: self._compile(tuple(words)) for category, words in categories.items()
+        }
+
+    @staticmethod
+    def _compile(words: tuple) -> re.Pattern:
+        if not words:
+            return re.compile(r"(?!)")  # Matches nothing, not even ""
+        escaped = [re.escape(word) for word in words]
+        pattern = r"\b(" + "|".join(escaped) + r")\b"
+        return re.compile(pattern, flags=re.IGNORECASE)
+
+    def find(self, text: str) -> List[Match]:
+        matches = []
+        for category, pattern in self.patterns.items():
+            matches.extend(
+                (category, match.start(), match.end()) for match in pattern.finditer(text))
+        return sorted(matches, key=lambda match: match[1])
+
+
+class AhoCorasickMatcher:
+    """
+    Aho-Corasick automaton over the terms of every category, finding all of
+    them in a single linear pass over the text.
+
+    Matching follows the regex engine: case-insensitive, terms must sit on
+    `\\b` word boundaries, leftmost match first and, between terms starting at
+    the same position, the one listed first wins. Matches within a category
+    never overlap; matches of different categories may.
+    """
+
+    engine = "automaton"
+
+    def __init__(self, categories: Dict[str, Sequence[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        # Per node: (term length, position in its list, category) of every
+        # term ending there, including those reached through fail links
+        self._out: List[List[Tuple[int, int, str]]] = [[]]
+        self._fail: List[int] = [0]
+        self.categories = list(categories)
+
+        for category, words in categories.items():
+            for priority, word in enumerate(words):
+                if word:
+                    self._add(_fold(word), priority, category)
+        self._build_fail_links()
+
+    def _add(self, word: str, priority: int, category: str):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._out.append([])
+                self._fail.append(0)
+            node = nxt
+        self._out[node].append((len(word), priority, category))
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child].extend(self._out[self._fail[child]])
+
+    def find(self, text: str) -> List[Match]:
+        goto, fail, out = self._goto, self._fail, self._out
+        folded = _fold(text)
+
+        # category -> start -> (priority, end) of the best term starting there
+        candidates: Dict[str, Dict[int, Tuple[int, int]]] = {c: {} for c in self.categories}
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            end = i + 1
+            if not _is_boundary(text, end):
+                continue
+            for length, priority, category in out[node]:
+                start = end - length
+                if not _is_boundary(text, start):
+                    continue
+                best = candidates[category].get(start)
+                if best is None or priority < best[0]:
+                    candidates[category][start] = (priority, end)
+
+        matches = []
+        for category, starts in candidates.items():
+            last_end = 0
+            for start in sorted(starts):
+                if start < last_end:
+                    continue
+                last_end = starts[start][1]
+                matches.append((category, start, last_end))
+        return sorted(matches, key=lambda match: match[1])
+
+
+def build_matcher(categories: Dict[str, Sequence[str]], engine: Optional[str] = None):
+    """
+    Build a matcher over named word lists.
+
+    Args:
+        categories (dict): Category name -> terms, e.g. {"banned": (...), "competitor": (...)}.
+        engine (str): "regex", "automaton" or "auto" (automaton once the lists
+            hold AUTO_AUTOMATON_MIN_TERMS terms). Defaults to the
+            GUARDRAILS_WORD_MATCHER env var, then "auto".
+    """
+    engine = engine or os.getenv("GUARDRAILS_WORD_MATCHER", "auto")
+    if engine == "auto":
+        total = sum(len(words) for words in categories.values())
+        engine = "automaton" if total >= AUTO_AUTOMATON_MIN_TERMS else "regex"
+    if engine == "regex":
+        return RegexMatcher(categories)
+    if engine == "automaton":
+        return AhoCorasickMatcher(categories)
+    raise ValueError(f"Unknown word matcher '{engine}', expected regex, automaton or auto")
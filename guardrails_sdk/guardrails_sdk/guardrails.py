@@ -1,15 +1,25 @@
 import os
 import asyncio
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Literal
+from typing import AsyncIterable, AsyncIterator, List, Dict, Optional, Literal
 from uuid import uuid4
-import threading
+from datetime import datetime
 
-from guardrails_sdk.pii.pii import analyze_and_mask_text
+from guardrails_sdk.pii.pii import analyze_and_mask_text, analyze_and_mask_many
 from guardrails_sdk.toxicity.toxic_bert import detect_toxicity
 from guardrails_sdk.prompt_secure.prompt_break import classify_prompt_injection
-from guardrails_sdk.compitator_banned_words.block_words import moderate_text
+from guardrails_sdk.prompt_secure import attack_index
+from guardrails_sdk.compitator_banned_words.block_words import moderate_text, preload_matchers
 from guardrails_sdk.log_guardrails.log_anomaly import AnomalyStorage
+from guardrails_sdk.log_guardrails.writer import AnomalyWriter
+from guardrails_sdk.pipeline import PipelinePolicy, run_pipeline, is_blocking, RESULT_KEYS
+from guardrails_sdk.streaming import StreamRequest, guard_stream
+from guardrails_sdk.batch import BatchItem, BatchRequest, iter_batch, run_batch
+from guardrails_sdk.runtime.cache import result_cache
+from guardrails_sdk.runtime.executor import configure_executor, run_in_thread
+from guardrails_sdk.runtime.governor import governor
+from guardrails_sdk.runtime.metrics import MetricsHook, metrics
+from guardrails_sdk.runtime.registry import registry
 
 
 # === Request Models ===
@@ -31,6 +41,24 @@ class TransformRequest(BaseModel):
     action: Optional[Literal["mask", "block"]] = None
     compitator_loc: Optional[str] = None
     block_loc: Optional[str] = None
+    # In-memory alternatives to compitator_loc/block_loc
+    compitator_words: Optional[List[str]] = None
+    block_words: Optional[List[str]] = None
+
+
+class PipelineRequest(TransformRequest):
+    # Defaults to PipelinePolicy(): word lists, then PII, then the models
+    policy: Optional[PipelinePolicy] = None
+
+
+class TransformManyRequest(BaseModel):
+    contents: List[str]
+    guardrails: List[str]
+    treshold: float = 0.5
+    custom_entities: Optional[List[Dict]] = None
+    # spaCy pipe options
+    batch_size: int = 32
+    n_process: int = 1
 
 
 class Compitator(BaseModel):
@@ -38,38 +66,160 @@ class Compitator(BaseModel):
     action: Literal["mask", "block"]
     compitator_loc: Optional[str] = None
     block_loc: Optional[str] = None
+    # In-memory alternatives to compitator_loc/block_loc
+    compitator_words: Optional[List[str]] = None
+    block_words: Optional[List[str]] = None
+
+
+def _word_source(words: Optional[List[str]], path: Optional[str]):
+    return words if words is not None else path
 
 
 # === Guardrails Client ===
 
 class GuardrailsClient:
-    def __init__(self, enable_logging: bool = False, dsn: Optional[str] = None):
+    def __init__(
+        self,
+        enable_logging: bool = False,
+        dsn: Optional[str] = None,
+        executor: Optional[Literal["thread", "process", "remote"]] = None,
+        max_workers: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        log_backpressure: Optional[Literal["drop", "block", "spill"]] = None,
+        metrics_hooks: Optional[List[MetricsHook]] = None,
+        budgets: Optional[Dict[str, Dict]] = None
+    ):
         self.logger: Optional[AnomalyStorage] = (
             AnomalyStorage(dsn=dsn) if enable_logging else None
         )
+        # Anomalies are queued and written in batches by a background thread,
+        # so guardrail latency does not depend on the database
+        self.writer: Optional[AnomalyWriter] = (
+            AnomalyWriter(self.logger, backpressure=log_backpressure)
+            if self.logger else None
+        )
+        # Guardrails run their CPU work on a shared pool so run_all_guardrails
+        # overlaps them; only replace the pool when asked to
+        if executor or max_workers:
+            configure_executor(executor, max_workers)
+        # Per-guardrail threads, cores and concurrency, e.g.
+        # {"toxicity": {"threads": 4, "cores": [0, 1, 2, 3], "max_concurrent": 1}}
+        if budgets is not None:
+            governor.configure(budgets)
+        # Results are cached process-wide, keyed by content and guardrail
+        # config; cache_size=0 disables caching
+        if cache_size is not None or cache_ttl is not None:
+            result_cache.configure(cache_size, cache_ttl)
+        # Stage timings, batch sizes and cache/log counters are recorded
+        # process-wide; hooks get every update as it happens
+        for hook in metrics_hooks or []:
+            metrics.add_hook(hook)
 
     def init(self):
         if self.logger:
             self.logger.init()
 
+    async def warmup(self, guardrails: Optional[List[str]] = None) -> Dict:
+        """
+        Load guardrail models and run a dummy inference ahead of traffic.
+
+        Args:
+            guardrails: Any of "toxicity", "prompt_injection" and "pii".
+                Defaults to all of them.
+
+        Returns:
+            Dict: Per-model load state, load time and warmup latency.
+        """
+        return await run_in_thread(registry.warmup, guardrails)
+
+    def model_status(self) -> Dict:
+        """Per-model load state without loading anything."""
+        return registry.status()
+
+    def budgets(self) -> Dict:
+        """Threads, cores and concurrency cap of each guardrail with a CPU budget."""
+        return governor.report()
+
+    def preload_word_lists(self, block_loc=None, compitator_loc=None) -> None:
+        """Compile a banned/competitor word list pair (paths or lists) ahead of traffic."""
+        preload_matchers(block_loc, compitator_loc)
+
+    def log_stats(self) -> Dict:
+        """Queue depth and written/dropped/spilled/failed counters of the anomaly writer."""
+        return self.writer.stats() if self.writer else {}
+
+    def flush_logs(self) -> None:
+        """Block until every anomaly logged so far has been handled."""
+        if self.writer:
+            self.writer.flush()
+
+    def close(self) -> None:
+        """Write out queued anomalies and stop the writer; also runs at exit."""
+        if self.writer:
+            self.writer.close()
+
+    async def query_anomalies(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        anomaly_type: Optional[str] = None,
+        request_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """Page through logged anomalies, newest first; see AnomalyStorage.query_anomalies."""
+        return await run_in_thread(
+            self._storage().query_anomalies, start, end, anomaly_type, request_id,
+            limit, cursor)
+
+    async def aggregate_anomalies(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        anomaly_type: Optional[str] = None,
+        interval: Literal["minute", "hour", "day"] = "hour"
+    ) -> Dict:
+        """Anomaly counts per time bucket and type, from the rollup table."""
+        return await run_in_thread(
+            self._storage().aggregate_anomalies, start, end, anomaly_type, interval)
+
+    def _storage(self) -> AnomalyStorage:
+        if not self.logger:
+            raise ValueError("Anomaly logging is not enabled (enable_logging=True)")
+        return self.logger
+
+    def add_metrics_hook(self, hook: MetricsHook) -> None:
+        """Forward every metric update (histogram observations, counter increases) to `hook`."""
+        metrics.add_hook(hook)
+
+    def remove_metrics_hook(self, hook: MetricsHook) -> None:
+        metrics.remove_hook(hook)
+
+    def metrics(self) -> Dict:
+        """Current histograms, counters and gauges as plain data."""
+        return metrics.snapshot()
+
+    def metrics_text(self) -> str:
+        """Current metrics in the Prometheus text format, e.g. for an app's own /metrics route."""
+        return metrics.render_prometheus()
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters and size of the shared result cache."""
+        return result_cache.stats()
+
     def _generate_request_id(self, prefix: str) -> str:
         return f"{prefix}-{uuid4().hex[:8]}"
 
-    def _log_async(self, anomaly_type: str, details: Dict[str, any]):
-        if self.logger:
+    async def _log_async(self, anomaly_type: str, details: Dict[str, any]):
+        if self.writer:
             request_id = self._generate_request_id(anomaly_type)
-            threat = threading.Thread(
-                target=self.logger.store_anomaly,
-                args=(request_id, anomaly_type, details),
-                daemon=True
-            )
-            threat.start()
-            threat.join()  # Wait for the thread to finish
+            await self.writer.submit_async(request_id, anomaly_type, details)
 
     async def validate_content(self, request: ToxiRequest):
         result = await detect_toxicity(request.content, request.treshold)
         if result.get("toxic", False):
-            self._log_async("toxicity", result)
+            await self._log_async("toxicity", result)
         return result
 
     async def transform_content(self, request: TransformRequest):
@@ -80,24 +230,50 @@ class GuardrailsClient:
             request.treshold
         )
         if result.get("pii_found"):
-            self._log_async("pii", result)
+            await self._log_async("pii", result)
         return result
 
+    async def transform_many(self, request: TransformManyRequest) -> List[Dict]:
+        """PII masking over many texts at once, results in input order."""
+        results = await analyze_and_mask_many(
+            request.contents,
+            request.guardrails,
+            request.custom_entities,
+            request.treshold,
+            batch_size=request.batch_size,
+            n_process=request.n_process
+        )
+        for result in results:
+            if result.get("pii_found"):
+                await self._log_async("pii", result)
+        return results
+
     async def prompt_injection(self, request: Prompt):
         result = await classify_prompt_injection(request.content)
         if result.get("is_prompt_injection", False):
-            self._log_async("prompt_injection", result)
+            await self._log_async("prompt_injection", result)
         return result
 
+    async def add_known_attacks(self, texts: List[str], source: Optional[str] = None) -> Dict:
+        """
+        Append confirmed attacks to the index of known attacks
+        (GUARDRAILS_ATTACK_INDEX), so near-duplicates are flagged from now on.
+
+        Returns:
+            Dict: {"added": rows added, "total": rows in the index}.
+        """
+        return await attack_index.add_attacks(texts, source)
+
     async def compitator_banned(self, request: Compitator):
         result = await moderate_text(
             text=request.content,
-            banned_words_file=request.block_loc,
-            competitor_words_file=request.compitator_loc,
+            banned_words_file=_word_source(request.block_words, request.block_loc),
+            competitor_words_file=_word_source(
+                request.compitator_words, request.compitator_loc),
             action=request.action
         )
         if result.get("action_taken"):
-            self._log_async("banned_words", result)
+            await self._log_async("banned_words", result)
         return result
 
     async def run_all_guardrails(self, request: TransformRequest):
@@ -112,8 +288,8 @@ class GuardrailsClient:
             classify_prompt_injection(request.content),
             moderate_text(
                 request.content,
-                request.block_loc,
-                request.compitator_loc,
+                _word_source(request.block_words, request.block_loc),
+                _word_source(request.compitator_words, request.compitator_loc),
                 request.action
             )
         )
@@ -137,7 +313,7 @@ class GuardrailsClient:
             triggered.append("banned_words")
 
         if triggered:
-            self._log_async(
+            await self._log_async(
                 anomaly_type=",".join(triggered),  # or store as a JSON array
                 details={
                     "anomalies_detected": triggered,
@@ -146,3 +322,78 @@ class GuardrailsClient:
             )
 
         return result_summary
+
+    async def run_pipeline(self, request: PipelineRequest):
+        """
+        Like run_all_guardrails, but cheap checks run first and the model
+        guardrails are skipped or cancelled once a blocking verdict is known.
+        The response adds "blocked", "blocked_by" and per-guardrail
+        ran/skipped/cancelled lists and timings under "pipeline".
+        """
+        result = await run_pipeline(
+            request.content,
+            request.guardrails,
+            treshold=request.treshold,
+            custom_entities=request.custom_entities,
+            action=request.action,
+            banned_words=_word_source(request.block_words, request.block_loc),
+            competitor_words=_word_source(request.compitator_words, request.compitator_loc),
+            policy=request.policy
+        )
+
+        triggered = [
+            name for name in result["pipeline"]["ran"]
+            if is_blocking(name, result[RESULT_KEYS[name]])]
+        if triggered:
+            await self._log_async(
+                anomaly_type=",".join(triggered),
+                details={
+                    "anomalies_detected": triggered,
+                    "summary": result
+                }
+            )
+
+        return result
+
+    async def guard_stream(
+        self,
+        deltas: AsyncIterable[str],
+        request: Optional[StreamRequest] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Guard streamed text, e.g. LLM output tokens, as it arrives.
+
+        Yields events with the next piece of checked (masked) text under
+        "text" and the running verdicts; the last one has "done": True.
+        A short look-behind tail is held back so PII and listed words are
+        never emitted before they are complete.
+
+        Example:
+            async for event in client.guard_stream(llm_tokens(), StreamRequest(guardrails=["EMAIL_ADDRESS"])):
+                print(event["text"], end="")
+        """
+        event = {}
+        async for event in guard_stream(deltas, request):
+            yield event
+
+        triggered = [
+            name for name, hit in (
+                ("pii", event.get("pii_found")),
+                ("toxicity", event.get("is_toxic")),
+                ("banned_words", event.get("banned_words") or event.get("competitors")))
+            if hit]
+        if triggered:
+            await self._log_async(",".join(triggered), {"anomalies_detected": triggered, "summary": event})
+
+    async def run_batch(self, request: BatchRequest) -> List[Dict]:
+        """
+        Run many items, each with its own checks and config, in one call.
+        Model and PII calls of concurrent items are batched together.
+        Results are in input order: {"index", "id", "results"} or {"index", "id", "error"}.
+        """
+        return await run_batch(request.items)
+
+    async def iter_batch(self, items) -> AsyncIterator[Dict]:
+        """Like run_batch for an (async) iterable of BatchItem, yielding results as they complete."""
+        async for result in iter_batch(items):
+            yield result
@@ -1,3 +1,4 @@
 from .log_anomaly import AnomalyStorage
+from .writer import AnomalyWriter
 
-__all__ = ["AnomalyStorage"]
+__all__ = ["AnomalyStorage", "AnomalyWriter"]
@@ -1,10 +1,14 @@
 import os
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Literal, Optional
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Integer
+from sqlalchemy import (
+    create_engine, Column, String, Text, DateTime, Integer, Index, and_, or_,
+    select, update)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # === Logger Setup ===
@@ -28,7 +32,28 @@ class Anomaly(Base):
     anomaly_type = Column(String(64), nullable=False)
     details = Column(Text, nullable=True)
 
-# === Synchronous Anomaly Storage ===
+    __table_args__ = (
+        # Time range scans, with and without a type filter, and request lookups
+        Index("ix_anomalies_timestamp", "timestamp", "id"),
+        Index("ix_anomalies_type_timestamp", "anomaly_type", "timestamp"),
+        Index("ix_anomalies_request_id", "request_id"),
+    )
+
+
+class AnomalyRollup(Base):
+    """Anomaly count per minute and anomaly_type, kept up to date on write."""
+    __tablename__ = "anomaly_rollups"
+
+    bucket = Column(DateTime, primary_key=True)
+    anomaly_type = Column(String(64), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Bucket sizes the aggregate API can group the per-minute rollups into
+INTERVALS = {"minute": 60, "hour": 3600, "day": 86400}
+MAX_PAGE_SIZE = 1000
+
+# === Anomaly Storage (see writer.AnomalyWriter for the async pipeline) ===
 
 
 class AnomalyStorage:
@@ -38,12 +63,18 @@ class AnomalyStorage:
             raise ValueError(
                 f"DSN not provided and env var '{env_var}' not set.")
 
-        self.engine = create_engine(self.dsn, echo=False)
+        # Pooled connections, checked before use so a dropped connection is
+        # replaced instead of failing a batch
+        self.engine = create_engine(self.dsn, echo=False, pool_pre_ping=True)
         self.Session = sessionmaker(bind=self.engine)
 
     def init(self):
-        """Create table if it doesn't exist."""
+        """Create tables and indexes that don't exist yet."""
         Base.metadata.create_all(self.engine)
+        # create_all skips indexes of tables that already existed
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
         logger.info("[AnomalyLogger] Database initialized.")
 
     def store_anomaly(
@@ -54,21 +85,204 @@ class AnomalyStorage:
     ) -> None:
         logger.info(
             f"[AnomalyLogger] Preparing to store anomaly for {request_id}")
-        anomaly = Anomaly(
-            request_id=request_id,
-            anomaly_type=anomaly_type,
-            details=json.dumps(details, default=str),
-        )
-
-        session = self.Session()
         try:
-            session.add(anomaly)
-            session.commit()
+            self.store_anomalies([{
+                "request_id": request_id,
+                "anomaly_type": anomaly_type,
+                "details": json.dumps(details, default=str),
+            }])
 
         except Exception as e:
             logger.error(
                 f"[AnomalyLogger] Failed to store anomaly for {request_id}: {e}", exc_info=True)
-            session.rollback()
 
-        finally:
-            session.close()
+    def store_anomalies(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert many anomalies in one transaction with a single executemany.
+
+        Args:
+            rows: Dicts with request_id, anomaly_type, details (a JSON string)
+                and optionally timestamp.
+
+        Per-minute rollup counters are updated in the same transaction.
+
+        Raises on failure, so the caller can decide what to do with the rows.
+        """
+        if not rows:
+            return
+        now = datetime.utcnow()
+        rows = [row if row.get("timestamp") else dict(row, timestamp=now) for row in rows]
+        counts = Counter(
+            (_minute(row["timestamp"]), row["anomaly_type"]) for row in rows)
+
+        with self.engine.begin() as connection:
+            connection.execute(Anomaly.__table__.insert(), rows)
+            for (bucket, anomaly_type), count in counts.items():
+                _increment_rollup(connection, bucket, anomaly_type, count)
+
+    def query_anomalies(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        anomaly_type: Optional[str] = None,
+        request_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Page through anomalies, newest first.
+
+        Args:
+            start, end: UTC time range, start inclusive, end exclusive.
+            anomaly_type (str): Exact anomaly_type to match.
+            request_id (str): Exact request id to match.
+            limit (int): Page size, at most MAX_PAGE_SIZE.
+            cursor (str): `next_cursor` of the previous page.
+
+        Returns:
+            Dict: {"items": [...], "next_cursor": str or None}. Pages are
+            keyed on (timestamp, id) rather than offsets, so deep pages cost
+            the same as the first one.
+        """
+        table = Anomaly.__table__
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        conditions = _time_range(table.c.timestamp, _utc(start), _utc(end))
+        if anomaly_type is not None:
+            conditions.append(table.c.anomaly_type == anomaly_type)
+        if request_id is not None:
+            conditions.append(table.c.request_id == request_id)
+        if cursor:
+            cursor_time, cursor_id = _decode_cursor(cursor)
+            conditions.append(or_(
+                table.c.timestamp < cursor_time,
+                and_(table.c.timestamp == cursor_time, table.c.id < cursor_id)))
+
+        query = (select(table).where(*conditions)
+                 .order_by(table.c.timestamp.desc(), table.c.id.desc())
+                 .limit(limit + 1))
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1].timestamp.isoformat()}|{rows[-1].id}"
+        items = [{
+            "id": row.id,
+            "timestamp": row.timestamp.isoformat(),
+            "request_id": row.request_id,
+            "anomaly_type": row.anomaly_type,
+            "details": json.loads(row.details) if row.details else None,
+        } for row in rows]
+        return {"items": items, "next_cursor": next_cursor}
+
+    def aggregate_anomalies(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        anomaly_type: Optional[str] = None,
+        interval: Literal["minute", "hour", "day"] = "hour"
+    ) -> Dict[str, Any]:
+        """
+        Anomaly counts per time bucket and anomaly_type, read from the
+        per-minute rollups instead of the anomalies table.
+
+        Returns:
+            Dict: {"interval", "buckets": [{"bucket", "anomaly_type", "count"}],
+            "totals": {anomaly_type: count}}, buckets in time order.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {list(INTERVALS)}")
+        table = AnomalyRollup.__table__
+        start, end = _utc(start), _utc(end)
+        conditions = _time_range(
+            table.c.bucket, _minute(start) if start else None, end)
+        if anomaly_type is not None:
+            conditions.append(table.c.anomaly_type == anomaly_type)
+        query = select(table).where(*conditions).order_by(table.c.bucket)
+
+        counts = Counter()
+        with self.engine.connect() as connection:
+            for row in connection.execute(query):
+                counts[(_truncate(row.bucket, interval), row.anomaly_type)] += row.count
+
+        totals = Counter()
+        for (_, anomaly_type_), count in counts.items():
+            totals[anomaly_type_] += count
+        return {
+            "interval": interval,
+            "buckets": [
+                {"bucket": bucket.isoformat(), "anomaly_type": anomaly_type_, "count": count}
+                for (bucket, anomaly_type_), count in sorted(counts.items())],
+            "totals": dict(totals)
+        }
+
+    def rebuild_rollups(self) -> None:
+        """Recount the rollups from the anomalies table, e.g. for rows written
+        before rollups existed. Streams the table; run it off-peak."""
+        table = Anomaly.__table__
+        counts = Counter()
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(
+                select(table.c.timestamp, table.c.anomaly_type))
+            for row in result:
+                counts[(_minute(row.timestamp), row.anomaly_type)] += 1
+        with self.engine.begin() as connection:
+            connection.execute(AnomalyRollup.__table__.delete())
+            if counts:
+                connection.execute(AnomalyRollup.__table__.insert(), [
+                    {"bucket": bucket, "anomaly_type": anomaly_type, "count": count}
+                    for (bucket, anomaly_type), count in counts.items()])
+
+
+def _minute(timestamp: datetime) -> datetime:
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _truncate(timestamp: datetime, interval: str) -> datetime:
+    if interval == "minute":
+        return timestamp
+    if interval == "hour":
+        return timestamp.replace(minute=0)
+    return timestamp.replace(hour=0, minute=0)
+
+
+def _utc(timestamp: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC
+    if timestamp is not None and timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _time_range(column, start: Optional[datetime], end: Optional[datetime]) -> list:
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return conditions
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, row_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def _increment_rollup(connection, bucket: datetime, anomaly_type: str, count: int):
+    # Portable upsert: update the counter, insert it when missing, and fall
+    # back to the update if another writer inserted it first
+    table = AnomalyRollup.__table__
+    increment = (update(table)
+                 .where(table.c.bucket == bucket, table.c.anomaly_type == anomaly_type)
+                 .values(count=table.c.count + count))
+    if connection.execute(increment).rowcount:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(table.insert().values(
+                bucket=bucket, anomaly_type=anomaly_type, count=count))
+    except IntegrityError:
+        connection.execute(increment)
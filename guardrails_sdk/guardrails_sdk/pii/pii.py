@@ -12,18 +12,64 @@ Description:
     Custom recognizers added for SSN and street addresses.
 """
 
-from presidio_analyzer import AnalyzerEngine
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts
+from presidio_analyzer.predefined_recognizers import SpacyRecognizer
 from presidio_anonymizer import AnonymizerEngine
-from .custom_entity import add_custom_recognizers
+import os
+import re
+import json
+import atexit
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-# Initialize Presidio Analyzer and Anonymizer engines
-analyzer = AnalyzerEngine()
+from guardrails_sdk.runtime.batching import MicroBatcher
+from guardrails_sdk.runtime.cache import result_cache
+from guardrails_sdk.runtime.executor import run_in_thread, run_model
+from guardrails_sdk.runtime.inference import inference
+from guardrails_sdk.runtime.metrics import metrics
+from guardrails_sdk.runtime.registry import registry
+from .custom_entity import get_custom_recognizers
+
+# The Presidio Analyzer (and its spaCy pipeline) is loaded on first use
+# through the model registry; the Anonymizer engine is cheap to build
 anonymizer = AnonymizerEngine()
 
 
+def _warmup(analyzer):
+    analyzer.analyze(text="My name is John and my email is john@example.com", language="en")
+
+
+registry.register("pii", AnalyzerEngine, _warmup)
+
+
+def __getattr__(name):
+    # Keep `pii.analyzer` available without loading spaCy at import time
+    if name == "analyzer":
+        return registry.get("pii")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Define confidence score threshold for detected entities
 # CONFIDENCE_THRESHOLD = 0.5
 
+# When no requested entity needs an NLP-backed recognizer (e.g. only
+# EMAIL_ADDRESS, CREDIT_CARD and regex custom entities), skip the spaCy NER
+# and parser and run the pattern recognizers on the tokens and lemmas alone
+FAST_PATH = os.getenv("GUARDRAILS_PII_FAST_PATH", "1") != "0"
+
+# Documents longer than CHUNK_CHARS are split into overlapping chunks at
+# sentence or whitespace boundaries and analyzed in CHUNK_WORKERS processes
+# (1 or less: one chunk after the other in this process). 0 disables
+# chunking. Entities up to CHUNK_OVERLAP / 2 characters long are found as in
+# a single pass. Every worker holds its own analyzer and spaCy model (about
+# 1 GB resident for en_core_web_lg), so the pool is small by default
+CHUNK_CHARS = int(os.getenv("GUARDRAILS_PII_CHUNK_CHARS", "100000"))
+CHUNK_OVERLAP = int(os.getenv("GUARDRAILS_PII_CHUNK_OVERLAP", "400"))
+CHUNK_WORKERS = int(os.getenv("GUARDRAILS_PII_CHUNK_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 
 async def analyze_and_mask_text(text: str, entities: list, custom_entitie_list: list, CONFIDENCE_THRESHOLD: float) -> dict:
     """
@@ -35,33 +81,387 @@ async def analyze_and_mask_text(text: str, entities: list, custom_entitie_list:
 
     Returns:
         dict: Contains masked text, found entities, and metadata.
+        "analysis_path" is "regex" when only pattern recognizers ran and
+        "nlp" when the spaCy pipeline ran.
+    """
+    with metrics.time("guardrails_guardrail_seconds", guardrail="pii"):
+        path, results = await _analyze_text(text, entities, custom_entitie_list)
+        masked = mask_text(text, results, CONFIDENCE_THRESHOLD)
+        masked["analysis_path"] = path
+        return masked
+
+
+async def analyze_text(text: str, entities: list, custom_entitie_list: list, use_cache: bool = True,
+                       batched: bool = False) -> tuple:
     """
+    Find PII entities without masking them. Pass use_cache=False for
+    one-off fragments (e.g. stream windows) that would only evict useful
+    cache entries, and batched=True to share one spaCy `pipe` call with
+    other texts analyzed at the same moment (bulk jobs).
 
-    if len(custom_entitie_list) > 0:
-        # User defined/Custom recognizer
-        custom_entities = await add_custom_recognizers(analyzer, custom_entitie_list)
+    Returns:
+        tuple: (entity_type, start, end, score) per entity found, whatever its score.
+    """
+    _, results = await _analyze_text(text, entities, custom_entitie_list, use_cache, batched)
+    return results
 
-        # Get custom entities name
-        custom_entitie_names = list(
-            map(lambda rec: rec['entity_name'], custom_entitie_list))
 
-        list_of_entities = custom_entitie_names+entities
+async def _analyze_text(text: str, entities: list, custom_entitie_list: list, use_cache: bool = True,
+                        batched: bool = False) -> tuple:
+    # (analysis path, results)
+    custom_entitie_list = custom_entitie_list or []
+    if batched:
+        def compute(): return batcher.submit((text, list(entities), custom_entitie_list))
+    else:
+        def compute(): return run_model("pii", _analyze, text, entities, custom_entitie_list)
+    if not use_cache:
+        return await compute()
+
+    # Raw analyzer results are cached so the threshold can change without a
+    # miss. Presidio and spaCy are CPU bound, keep them off the event loop
+    key = result_cache.make_key(
+        "pii", text, entities=list(entities), custom_entities=custom_entitie_list)
+    return await result_cache.get_or_compute(key, compute)
+
+
+async def analyze_and_mask_many(
+    texts: list,
+    entities: list,
+    custom_entitie_list: list,
+    CONFIDENCE_THRESHOLD: float,
+    batch_size: int = 32,
+    n_process: int = 1
+) -> list:
+    """
+    Analyze and mask a list of texts, running the NLP pipeline over them in
+    batches (spaCy `pipe`) instead of once per text.
+
+    Args:
+        texts (list): The input texts.
+        entities (list): List of PII entity labels to look for.
+        custom_entitie_list (list): Custom recognizer definitions, applied to every text.
+        CONFIDENCE_THRESHOLD (float): Minimum score of a masked entity.
+        batch_size (int): Texts per spaCy batch.
+        n_process (int): spaCy worker processes; values above 1 only pay off
+            for large lists.
+
+    Returns:
+        list: One dict per text, in input order, shaped like the result of
+        `analyze_and_mask_text` (with "analysis_path").
+    """
+    custom_entitie_list = custom_entitie_list or []
+
+    # Texts already in the cache are not analyzed again, and duplicates
+    # within the list are analyzed once
+    keys = [
+        result_cache.make_key(
+            "pii", text, entities=list(entities), custom_entities=custom_entitie_list)
+        for text in texts]
+    results = {}
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key in results or key in pending:
+            continue
+        found, cached = result_cache.lookup(key)
+        if found:
+            results[key] = cached
+        else:
+            pending[key] = text
+
+    if pending:
+        analyzed = await run_model(
+            "pii", _analyze_many, list(pending.values()), entities, custom_entitie_list,
+            batch_size, n_process)
+        for key, text_results in zip(pending, analyzed):
+            result_cache.put(key, text_results)
+            results[key] = text_results
+
+    return await run_in_thread(
+        _mask_many, texts, [results[key] for key in keys], CONFIDENCE_THRESHOLD)
+
+
+def _needs_nlp(analyzer, entities: list) -> bool:
+    """Whether any recognizer of the requested entities (built-in and custom) reads spaCy's NER."""
+    if not FAST_PATH or not entities or not hasattr(analyzer.nlp_engine, "get_nlp"):
+        # No entities means every supported entity, PERSON and LOCATION included
+        return True
+    return _serves_with_nlp(analyzer, tuple(sorted(set(entities))))
+
+
+@functools.lru_cache(maxsize=256)
+def _serves_with_nlp(analyzer, entities: tuple) -> bool:
+    # Custom recognizers are all patterns, so only the registry's NER
+    # recognizer can serve an entity from the NLP artifacts
+    return any(
+        isinstance(recognizer, SpacyRecognizer)
+        and recognizer.supported_language == "en"
+        and set(recognizer.supported_entities).intersection(entities)
+        for recognizer in analyzer.registry.recognizers)
+
+
+# What the lemmas depend on; the rest of the pipeline (NER, parser) is skipped
+_LEMMA_COMPONENTS = (
+    "tok2vec", "transformer", "tagger", "morphologizer", "attribute_ruler",
+    "lemmatizer", "trainable_lemmatizer")
+
+
+@functools.lru_cache(maxsize=None)
+def _lemma_pipeline(analyzer) -> tuple:
+    # The analyzer's own model, so the context enhancer sees the same lemmas
+    # (and stop words) as on the NLP path and boosts the same scores
+    nlp = analyzer.nlp_engine.get_nlp("en")
+    return nlp, [name for name in nlp.pipe_names if name not in _LEMMA_COMPONENTS]
+
+
+def _light_artifacts(analyzer, doc) -> NlpArtifacts:
+    # As the spaCy engine builds them, without entities
+    return NlpArtifacts(
+        entities=[],
+        tokens=doc,
+        tokens_indices=[token.idx for token in doc],
+        lemmas=[token.lemma_ for token in doc],
+        nlp_engine=analyzer.nlp_engine,
+        language="en")
+
+
+def _entities_and_recognizers(entities: list, custom_entitie_list: list) -> tuple:
+    # User defined/Custom recognizers only apply to this request; they are
+    # compiled once and cached by definition, and the analyzer's registry is
+    # left untouched so patterns never leak between requests
+    custom_recognizers = get_custom_recognizers(custom_entitie_list)
+
+    # Get custom entities name
+    if custom_recognizers:
+        custom_entitie_names = [rec.supported_entities[0] for rec in custom_recognizers]
+        list_of_entities = custom_entitie_names + entities
     else:
         list_of_entities = entities
+
+    return list_of_entities, custom_recognizers or None
+
+
+@inference
+def _analyze(text: str, entities: list, custom_entitie_list: list) -> tuple:
+    if CHUNK_CHARS and len(text) > CHUNK_CHARS:
+        with metrics.stage("pii", "analyze_chunked"):
+            path, results = _analyze_chunked(text, entities, custom_entitie_list)
+    else:
+        with metrics.stage("pii", "analyze"):
+            path, results = _find(text, entities, custom_entitie_list)
+    metrics.increment("guardrails_pii_analysis_total", path=path)
+    return path, results
+
+
+def _find(text: str, entities: list, custom_entitie_list: list) -> tuple:
+    analyzer = registry.get("pii")
+    list_of_entities, custom_recognizers = _entities_and_recognizers(
+        entities, custom_entitie_list)
+
+    path = "nlp" if _needs_nlp(analyzer, list_of_entities) else "regex"
+
     # Analyze text for specified PII entities
     results = analyzer.analyze(
         text=text,
         entities=list_of_entities,
-        language="en"
+        language="en",
+        ad_hoc_recognizers=custom_recognizers,
+        nlp_artifacts=_fast_artifacts(analyzer, text) if path == "regex" else None
     )
 
+    # Plain tuples: cheap to pickle from a process pool and safe to share
+    # from the cache
+    return path, tuple((res.entity_type, res.start, res.end, res.score) for res in results)
+
+
+def _fast_artifacts(analyzer, text: str) -> NlpArtifacts:
+    nlp, disable = _lemma_pipeline(analyzer)
+    return _light_artifacts(analyzer, nlp(text, disable=disable))
+
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def split_chunks(text: str, size: int, overlap: int) -> list:
+    """
+    Split `text` into chunks of at most `size` characters, each overlapping
+    the next by about `overlap` characters.
+
+    A chunk ends after the last sentence end (or else whitespace) in its
+    second half, and the next one starts at a word in the overlap.
+
+    Returns:
+        list: (offset in `text`, chunk) pairs, in order.
+    """
+    overlap = max(0, min(overlap, size // 4))
+    chunks, start = [], 0
+    while True:
+        end = _chunk_end(text, start, size)
+        chunks.append((start, text[start:end]))
+        if end >= len(text):
+            return chunks
+        next_start = end - overlap
+        word = _WHITESPACE.search(text, next_start, end)
+        start = word.end() if word and word.end() < end else next_start
+
+
+def _chunk_end(text: str, start: int, size: int) -> int:
+    end = start + size
+    if end >= len(text):
+        return len(text)
+    for pattern in (_SENTENCE_END, _WHITESPACE):
+        last = None
+        for last in pattern.finditer(text, start + size // 2, end):
+            pass
+        if last:
+            return last.end()
+    return end
+
+
+def merge_chunk_results(chunks: list, chunk_results: list) -> tuple:
+    """
+    Entities of every chunk, as offsets in the whole text.
+
+    Neighbouring chunks split their overlap in the middle, and an entity is
+    kept only from the chunk whose share it starts in. Entities cut off at a
+    chunk edge start in the neighbour's share, which sees them whole.
+    """
+    merged = set()
+    for i, ((offset, chunk), results) in enumerate(zip(chunks, chunk_results)):
+        own_start = 0 if i == 0 else (offset + chunks[i - 1][0] + len(chunks[i - 1][1])) // 2
+        if i + 1 < len(chunks):
+            own_end = (chunks[i + 1][0] + offset + len(chunk)) // 2
+        else:
+            own_end = offset + len(chunk)
+        for entity_type, start, end, score in results:
+            if own_start <= offset + start < own_end:
+                merged.add((entity_type, offset + start, offset + end, score))
+    return tuple(sorted(merged, key=lambda res: (res[1], res[2], res[0])))
+
+
+_chunk_pool = None
+_chunk_pool_lock = threading.Lock()
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            # fork() after torch has started its thread pools can deadlock
+            _chunk_pool = ProcessPoolExecutor(
+                max_workers=CHUNK_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker)
+        return _chunk_pool
+
+
+def _init_chunk_worker():
+    # Load and warm the analyzer before the worker takes its first chunk
+    registry.warmup(["pii"])
+
+
+def _shutdown_chunk_pool():
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is not None:
+            _chunk_pool.shutdown(wait=False)
+            _chunk_pool = None
+
+
+atexit.register(_shutdown_chunk_pool)
+
+
+def _analyze_chunked(text: str, entities: list, custom_entitie_list: list) -> tuple:
+    chunks = split_chunks(text, CHUNK_CHARS, CHUNK_OVERLAP)
+    if CHUNK_WORKERS <= 1:
+        analyzed = [_find(chunk, entities, custom_entitie_list) for _, chunk in chunks]
+    else:
+        pool = _get_chunk_pool()
+        futures = [
+            pool.submit(_find, chunk, entities, custom_entitie_list) for _, chunk in chunks]
+        analyzed = [future.result() for future in futures]
+    path = "nlp" if any(path == "nlp" for path, _ in analyzed) else "regex"
+    return path, merge_chunk_results(chunks, [results for _, results in analyzed])
+
+
+@inference
+def _analyze_many(texts: list, entities: list, custom_entitie_list: list,
+                  batch_size: int, n_process: int) -> list:
+    analyzer = registry.get("pii")
+    list_of_entities, custom_recognizers = _entities_and_recognizers(
+        entities, custom_entitie_list)
+
+    path = "nlp" if _needs_nlp(analyzer, list_of_entities) else "regex"
+    metrics.increment("guardrails_pii_analysis_total", len(texts), path=path)
+    if path == "regex":
+        nlp, disable = _lemma_pipeline(analyzer)
+        batch_results = (
+            analyzer.analyze(
+                text=doc.text,
+                entities=list_of_entities,
+                language="en",
+                ad_hoc_recognizers=custom_recognizers,
+                nlp_artifacts=_light_artifacts(analyzer, doc))
+            for doc in nlp.pipe(texts, batch_size=batch_size, disable=disable))
+    else:
+        batch_analyzer = BatchAnalyzerEngine(analyzer_engine=analyzer)
+        batch_results = batch_analyzer.analyze_iterator(
+            texts,
+            language="en",
+            batch_size=batch_size,
+            n_process=n_process,
+            entities=list_of_entities,
+            ad_hoc_recognizers=custom_recognizers
+        )
+    # Both are lazy, the analysis runs while this consumes them
+    with metrics.stage("pii", "analyze_batch"):
+        return [
+            (path, tuple((res.entity_type, res.start, res.end, res.score) for res in results))
+            for results in batch_results]
+
+
+def _analyze_batch(items: list) -> list:
+    # Items are (text, entities, custom_entitie_list); texts sharing a config
+    # go through the batch analyzer together
+    groups = {}
+    for index, (text, entities, custom_entitie_list) in enumerate(items):
+        config = json.dumps([entities, custom_entitie_list], sort_keys=True, default=str)
+        groups.setdefault(config, []).append(index)
+
+    results = [None] * len(items)
+    for indexes in groups.values():
+        _, entities, custom_entitie_list = items[indexes[0]]
+        texts = [items[index][0] for index in indexes]
+        for index, text_results in zip(indexes, _analyze_many(
+                texts, entities, custom_entitie_list, len(texts), 1)):
+            results[index] = text_results
+    return results
+
+
+# Collects PII analyses of concurrent bulk calls (analyze_text(batched=True))
+batcher = MicroBatcher(_analyze_batch, name="pii", guardrail="pii")
+
+
+def _mask_many(texts: list, results: list, CONFIDENCE_THRESHOLD: float) -> list:
+    masked = []
+    for text, (path, text_results) in zip(texts, results):
+        masked.append(mask_text(text, text_results, CONFIDENCE_THRESHOLD))
+        masked[-1]["analysis_path"] = path
+    return masked
+
+
+def mask_text(text: str, results: tuple, CONFIDENCE_THRESHOLD: float) -> dict:
+    """Mask the entities of `analyze_text` results scoring at least CONFIDENCE_THRESHOLD."""
     # Filter results based on confidence score
     filtered_results = [
-        res for res in results if res.score >= CONFIDENCE_THRESHOLD]
+        RecognizerResult(entity_type, start, end, score)
+        for entity_type, start, end, score in results
+        if score >= CONFIDENCE_THRESHOLD]
 
     # Anonymize the text using the filtered results
-    masked_result = anonymizer.anonymize(
-        text=text, analyzer_results=filtered_results)
+    with metrics.stage("pii", "anonymize"):
+        masked_result = anonymizer.anonymize(
+            text=text, analyzer_results=filtered_results)
 
     return {
         "pii_found": True if filtered_results else False,
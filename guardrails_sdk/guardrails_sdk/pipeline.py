@@ -0,0 +1,164 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from guardrails_sdk.pii.pii import analyze_and_mask_text
+from guardrails_sdk.toxicity.toxic_bert import detect_toxicity
+from guardrails_sdk.prompt_secure.prompt_break import classify_prompt_injection
+from guardrails_sdk.compitator_banned_words.block_words import moderate_text, UserInputError
+
+GUARDRAILS = ("banned_words", "pii", "prompt_injection", "toxicity")
+
+# Key of each guardrail's result in the response, as in run_all_guardrails
+RESULT_KEYS = {
+    "banned_words": "moderate_result",
+    "pii": "pii",
+    "prompt_injection": "prompt_injection",
+    "toxicity": "toxicity",
+}
+
+
+class PipelinePolicy(BaseModel):
+    """
+    How the guardrail pipeline orders and stops its checks.
+
+    Attributes:
+        tiers: Guardrail names grouped into tiers, cheapest first. The
+            guardrails of a tier run concurrently; the next tier starts once
+            the current one finished without a blocking verdict. Guardrails
+            left out of every tier are skipped.
+        block_on: Guardrails whose positive verdict blocks the request.
+        short_circuit: Stop at the first blocking verdict, cancelling the
+            rest of its tier and skipping later tiers.
+        eager: Start every guardrail at once (lowest latency when nothing
+            blocks) and cancel whatever is still running on a block.
+    """
+    tiers: List[List[str]] = [["banned_words"], ["pii"], ["prompt_injection", "toxicity"]]
+    block_on: List[str] = ["banned_words", "prompt_injection", "toxicity"]
+    short_circuit: bool = True
+    eager: bool = False
+
+
+def is_blocking(guardrail: str, result: Optional[dict]) -> bool:
+    """Whether a guardrail's result is a positive verdict."""
+    if not result:
+        return False
+    if guardrail == "banned_words":
+        return result.get("status") == "blocked"
+    if guardrail == "pii":
+        return bool(result.get("pii_found"))
+    if guardrail == "prompt_injection":
+        return bool(result.get("is_prompt_injection"))
+    if guardrail == "toxicity":
+        return bool(result.get("is_toxic"))
+    return False
+
+
+async def _moderate(text, banned_words, competitor_words, action) -> dict:
+    try:
+        return await moderate_text(text, banned_words, competitor_words, action)
+    except UserInputError as e:
+        # A block is this guardrail's verdict, not a pipeline failure
+        return {"status": "blocked", "cleaned_text": None, "error": e.message}
+
+
+async def run_pipeline(
+    content: str,
+    guardrails: List[str],
+    treshold: float = 0.5,
+    custom_entities: Optional[List[Dict]] = None,
+    action: Optional[str] = None,
+    banned_words=None,
+    competitor_words=None,
+    policy: Optional[PipelinePolicy] = None
+) -> dict:
+    """
+    Run the guardrails cheapest first and stop once one of them blocks.
+
+    Args:
+        content (str): The text to check.
+        guardrails (list): PII entity labels, as for analyze_and_mask_text.
+        treshold (float): Threshold for PII and toxicity.
+        custom_entities (list): Custom PII recognizer definitions.
+        action (str): Word list action, "mask" or "block".
+        banned_words, competitor_words: Word list paths or lists. The word
+            list check is skipped when neither is given.
+        policy (PipelinePolicy): Ordering and short-circuit rules.
+
+    Returns:
+        dict: The results under the same keys as run_all_guardrails (None
+        when a guardrail did not finish), plus "blocked", "blocked_by" and
+        "pipeline": {"ran", "skipped", "cancelled", "timings_ms"}.
+
+    A cancelled guardrail stops waiting at once and model calls that were
+    still queued for a batch are dropped, but work already handed to a
+    worker thread finishes in the background.
+    """
+    policy = policy or PipelinePolicy()
+    for name in (name for tier in policy.tiers for name in tier):
+        if name not in GUARDRAILS:
+            raise ValueError(f"Unknown guardrail '{name}' in policy, expected one of {GUARDRAILS}")
+
+    stages: Dict[str, Callable[[], Awaitable[dict]]] = {
+        "pii": lambda: analyze_and_mask_text(content, guardrails, custom_entities, treshold),
+        "toxicity": lambda: detect_toxicity(content, treshold),
+        "prompt_injection": lambda: classify_prompt_injection(content),
+    }
+    if banned_words is not None or competitor_words is not None:
+        stages["banned_words"] = lambda: _moderate(
+            content, banned_words, competitor_words, action)
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    ran: List[str] = []
+    cancelled: List[str] = []
+    blocked_by: Optional[str] = None
+
+    async def timed(name: str) -> dict:
+        start = time.perf_counter()
+        try:
+            return await stages[name]()
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    tiers = [[name for tier in policy.tiers for name in tier]] if policy.eager else policy.tiers
+    for tier in tiers:
+        tier = [name for name in tier if name in stages]
+        if not tier or (blocked_by and policy.short_circuit):
+            continue
+        tasks = {asyncio.ensure_future(timed(name)): name for name in tier}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks[task]
+                    results[name] = task.result()
+                    ran.append(name)
+                    if blocked_by is None and name in policy.block_on \
+                            and is_blocking(name, results[name]):
+                        blocked_by = name
+                if blocked_by and policy.short_circuit:
+                    break
+        finally:
+            # Also reached when a guardrail raised or the caller was cancelled
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                cancelled.extend(tasks[task] for task in pending)
+
+    finished = set(ran) | set(cancelled)
+    return {
+        **{RESULT_KEYS[name]: results.get(name) for name in GUARDRAILS},
+        "blocked": blocked_by is not None,
+        "blocked_by": blocked_by,
+        "pipeline": {
+            "ran": ran,
+            "skipped": [name for name in GUARDRAILS if name not in finished],
+            "cancelled": cancelled,
+            "timings_ms": timings
+        }
+    }
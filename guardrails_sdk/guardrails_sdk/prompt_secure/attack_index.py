@@ -0,0 +1,300 @@
+"""
+Nearest-neighbour index of known prompt injection and jailbreak prompts.
+
+Known attacks are embedded with a sentence-transformers model and kept as
+unit-length float32 rows on disk, memory-mapped at load. A prompt whose
+cosine similarity to a known attack reaches GUARDRAILS_ATTACK_INDEX_THRESHOLD
+is flagged before the classifier runs. New attacks are appended in place.
+
+The index is used when GUARDRAILS_ATTACK_INDEX points at its directory.
+Build it, or add attacks, from a JSONL or CSV file:
+
+Usage:
+    python -m guardrails_sdk.prompt_secure.attack_index attacks.jsonl --index /var/lib/guardrails/attacks
+    python -m guardrails_sdk.prompt_secure.attack_index confirmed.csv --index /var/lib/guardrails/attacks --text-field prompt --source review
+"""
+import os
+import csv
+import sys
+import json
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialized
+    fcntl = None
+
+from guardrails_sdk.runtime.batching import MicroBatcher
+from guardrails_sdk.runtime.executor import run_model
+from guardrails_sdk.runtime.inference import inference
+from guardrails_sdk.runtime.metrics import metrics
+from guardrails_sdk.runtime.registry import registry
+
+INDEX_PATH = os.getenv("GUARDRAILS_ATTACK_INDEX")
+# Used when an index is created; an existing index keeps the model it was built with
+model_name = os.getenv("GUARDRAILS_ATTACK_INDEX_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+THRESHOLD = float(os.getenv("GUARDRAILS_ATTACK_INDEX_THRESHOLD", "0.9"))
+
+
+class AttackIndex:
+    """
+    Embeddings of known attacks in a memory-mapped float32 matrix, with
+    exact top-k cosine search.
+
+    The index directory holds:
+        meta.json: model, dim, count and the valid byte length of the other files
+        vectors.f32: count x dim unit-length float32 rows
+        texts.jsonl: {"text", "source"} per row
+
+    `append` writes the new rows and lines past the valid lengths, then
+    replaces meta.json, so a crash mid-append leaves the index as it was.
+    Other processes sharing the directory pick up new rows on their next
+    search.
+    """
+
+    def __init__(self, path: str, model: Optional[str] = None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._meta = {"model": model, "dim": None, "count": 0, "vectors_bytes": 0, "texts_bytes": 0}
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._texts: List[dict] = []
+        self._known = set()
+        self._refresh()
+
+    @property
+    def model(self) -> Optional[str]:
+        return self._meta["model"]
+
+    def __len__(self) -> int:
+        return self._meta["count"]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self._file("meta.json"))
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp == self._stamp:
+            return
+        with open(self._file("meta.json")) as f:
+            meta = json.load(f)
+        if meta["count"]:
+            matrix = np.memmap(
+                self._file("vectors.f32"), dtype=np.float32, mode="r",
+                shape=(meta["count"], meta["dim"]))
+        else:
+            matrix = np.empty((0, meta["dim"] or 0), dtype=np.float32)
+        # Only the lines appended since the last refresh are read
+        with open(self._file("texts.jsonl"), "rb") as f:
+            f.seek(self._meta["texts_bytes"])
+            added = f.read(meta["texts_bytes"] - self._meta["texts_bytes"])
+        for line in added.splitlines():
+            row = json.loads(line)
+            self._texts.append(row)
+            self._known.add(row["text"])
+        self._meta, self._matrix, self._stamp = meta, matrix, stamp
+
+    def search(self, vectors: np.ndarray, k: int = 1) -> List[List[tuple]]:
+        """(similarity, row) of the `k` nearest known attacks of each unit-length vector."""
+        with self._lock:
+            self._refresh()
+            matrix = self._matrix
+        if not len(matrix):
+            return [[] for _ in range(len(vectors))]
+        scores = vectors @ matrix.T
+        k = min(k, len(matrix))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row_scores, rows in zip(scores, top):
+            rows = rows[np.argsort(-row_scores[rows])]
+            results.append([(float(row_scores[row]), int(row)) for row in rows])
+        return results
+
+    def entry(self, row: int) -> dict:
+        return self._texts[row]
+
+    def append(self, vectors: np.ndarray, texts: List[str], source: Optional[str] = None) -> int:
+        """Add attacks not in the index yet. Returns the number of rows added."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            meta = dict(self._meta)
+            if meta["dim"] is not None and vectors.shape[1] != meta["dim"]:
+                raise ValueError(
+                    f"Vectors have {vectors.shape[1]} dimensions, the index has {meta['dim']}")
+            keep, seen = [], set(self._known)
+            for i, text in enumerate(texts):
+                if text not in seen:
+                    seen.add(text)
+                    keep.append(i)
+            if not keep:
+                return 0
+            rows = np.ascontiguousarray(vectors[keep], dtype=np.float32)
+            lines = b"".join(
+                (json.dumps({"text": texts[i], "source": source}) + "\n").encode("utf-8")
+                for i in keep)
+
+            meta["vectors_bytes"] = _write_after(self._file("vectors.f32"), meta["vectors_bytes"], rows.tobytes())
+            meta["texts_bytes"] = _write_after(self._file("texts.jsonl"), meta["texts_bytes"], lines)
+            meta["dim"] = rows.shape[1]
+            meta["count"] += len(keep)
+            tmp = self._file("meta.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self._file("meta.json"))
+            self._refresh()
+            return len(keep)
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._file("lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_after(path: str, valid_bytes: int, data: bytes) -> int:
+    # Drop whatever an interrupted append left past the valid length
+    with open(path, "ab") as f:
+        f.truncate(valid_bytes)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return valid_bytes + len(data)
+
+
+def _load_index():
+    from sentence_transformers import SentenceTransformer
+
+    index = AttackIndex(INDEX_PATH, model_name)
+    return SentenceTransformer(index.model, device="cpu"), index
+
+
+def _warmup(_):
+    _search(["warmup"])
+
+
+def configure_index(path: Optional[str], model: Optional[str] = None):
+    """Use the index at `path` (created on the first append), or none."""
+    global INDEX_PATH, model_name
+    INDEX_PATH = path
+    if model:
+        model_name = model
+    if path:
+        registry.register("attack_index", _load_index, _warmup)
+    else:
+        registry.unregister("attack_index")
+
+
+def enabled() -> bool:
+    return INDEX_PATH is not None
+
+
+def _embed(embedder, texts: list) -> np.ndarray:
+    with metrics.stage("prompt_injection", "embed"):
+        return embedder.encode(
+            texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+@inference
+def _search(texts: list, k: int = 1) -> list:
+    embedder, index = registry.get("attack_index")
+    vectors = _embed(embedder, texts)
+    with metrics.stage("prompt_injection", "index_search"):
+        hits = index.search(vectors, k)
+    return [
+        # Float rounding can put an exact match a hair above 1
+        [{"row": row, "similarity": min(similarity, 1.0), **index.entry(row)}
+         for similarity, row in row_hits]
+        for row_hits in hits]
+
+
+@inference
+def _append(texts: list, source: Optional[str] = None) -> dict:
+    embedder, index = registry.get("attack_index")
+    added = index.append(_embed(embedder, texts), texts, source)
+    return {"added": added, "total": len(index)}
+
+
+# Concurrent lookups share one embedding call
+batcher = MicroBatcher(_search, name="attack_index", guardrail="prompt_injection")
+
+
+async def nearest_attacks(text: str, k: int = 1) -> list:
+    """
+    The `k` known attacks most similar to `text`.
+
+    Returns:
+        list: {"row", "similarity", "text", "source"} per attack, most similar first.
+    """
+    if k == 1:
+        return await batcher.submit(text)
+    return (await run_model("prompt_injection", _search, [text], k))[0]
+
+
+async def add_attacks(texts: List[str], source: Optional[str] = None) -> dict:
+    """
+    Append confirmed attacks to the index; prompts already in it are skipped.
+
+    Returns:
+        dict: {"added": rows added, "total": rows in the index}.
+    """
+    return await run_model("prompt_injection", _append, list(texts), source)
+
+
+if INDEX_PATH:
+    configure_index(INDEX_PATH)
+
+
+def _read_prompts(path: str, text_field: str, fmt: Optional[str] = None):
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        rows = csv.DictReader(f) if fmt == "csv" else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if row.get(text_field):
+                yield row[text_field]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSONL or CSV file of attack prompts")
+    parser.add_argument("--index", default=INDEX_PATH, required=INDEX_PATH is None,
+                        help="Index directory (default: GUARDRAILS_ATTACK_INDEX)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--source", default=None, help="Recorded with every added prompt")
+    parser.add_argument("--model", default=None,
+                        help=f"Embedding model of a new index (default: {model_name})")
+    parser.add_argument("--batch-size", type=int, default=256, help="Prompts embedded at once")
+    args = parser.parse_args(argv)
+
+    configure_index(args.index, args.model)
+    added, total, batch = 0, 0, []
+    for text in _read_prompts(args.input, args.text_field, args.format):
+        batch.append(text)
+        if len(batch) >= args.batch_size:
+            result = _append(batch, args.source)
+            added, total, batch = added + result["added"], result["total"], []
+    if batch:
+        result = _append(batch, args.source)
+        added, total = added + result["added"], result["total"]
+    print(json.dumps({"index": args.index, "added": added, "total": total}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
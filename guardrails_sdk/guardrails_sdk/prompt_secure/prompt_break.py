@@ -1,28 +1,287 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import os
+import copy
+import asyncio
+import functools
+from typing import Optional
+
+from transformers import AutoTokenizer
 import torch
 
-# Load tokenizer and model (adjust this to your actual model if hosted on Hugging Face Hub or local path)
+from guardrails_sdk.prompt_secure import attack_index
+from guardrails_sdk.prompt_secure.heuristics import heuristic_score
+from guardrails_sdk.runtime.backends import load_backend
+from guardrails_sdk.runtime.batching import MicroBatcher
+from guardrails_sdk.runtime.cache import result_cache
+from guardrails_sdk.runtime.executor import run_in_thread
+from guardrails_sdk.runtime.inference import inference
+from guardrails_sdk.runtime.metrics import metrics
+from guardrails_sdk.runtime.registry import registry
+
+# Tokenizer and model are loaded on first use through the model registry
+# (adjust this to your actual model if hosted on Hugging Face Hub or local path)
 # replace with actual model path or name
 model_name = "protectai/deberta-v3-base-prompt-injection-v2"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
 
 
-async def classify_prompt_injection(text: str):
-    inputs = tokenizer(text, return_tensors="pt",
-                       truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        probs = torch.softmax(logits, dim=1).squeeze()
+@functools.lru_cache(maxsize=None)
+def _tokenizer():
+    # Loaded apart from the model: with the inference server, API workers
+    # tokenize locally and never load the model
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def _load_model():
+    # The backend (eager, quantized, compiled, torchscript or onnx) is picked
+    # with GUARDRAILS_PROMPT_INJECTION_BACKEND
+    tokenizer = _tokenizer()
+    return tokenizer, load_backend("prompt_injection", model_name, tokenizer)
+
+
+def _warmup(_):
+    _score_prompts(["warmup"])
+
+
+registry.register("prompt_injection", _load_model, _warmup)
+
+
+def __getattr__(name):
+    # Keep `prompt_break.tokenizer` and `prompt_break.model` (now the
+    # inference backend) available without loading them at import time
+    if name in ("tokenizer", "model"):
+        tokenizer, backend = registry.get("prompt_injection")
+        return tokenizer if name == "tokenizer" else backend
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Windowed mode scores the whole prompt instead of only the first
+# WINDOW_LENGTH tokens
+WINDOWED = os.getenv("GUARDRAILS_PROMPT_INJECTION_WINDOWED", "0") == "1"
+WINDOW_LENGTH = 512
+WINDOW_OVERLAP = int(os.getenv("GUARDRAILS_PROMPT_INJECTION_OVERLAP", "64"))
+
+# Cascade mode settles prompts whose heuristic score (see heuristics.py) is
+# below CASCADE_SAFE_BELOW or above CASCADE_ATTACK_ABOVE without the model
+CASCADE = os.getenv("GUARDRAILS_PROMPT_INJECTION_CASCADE", "0") == "1"
+CASCADE_SAFE_BELOW = float(os.getenv("GUARDRAILS_PROMPT_INJECTION_CASCADE_SAFE_BELOW", "0.05"))
+CASCADE_ATTACK_ABOVE = float(os.getenv("GUARDRAILS_PROMPT_INJECTION_CASCADE_ATTACK_ABOVE", "0.95"))
+
+
+def _score_prompts(texts: list) -> list:
+    with metrics.stage("prompt_injection", "tokenize"):
+        inputs = dict(_tokenizer()(texts, return_tensors="pt",
+                                   truncation=True, padding=True))
+    with metrics.stage("prompt_injection", "infer"):
+        logits = _forward(inputs)
+    with metrics.stage("prompt_injection", "postprocess"):
+        return list(torch.softmax(logits, dim=1))
+
+
+def _score_windows(windows: list) -> list:
+    with metrics.stage("prompt_injection", "pad"):
+        inputs = dict(_tokenizer().pad(windows, padding=True, return_tensors="pt"))
+    with metrics.stage("prompt_injection", "infer"):
+        logits = _forward(inputs)
+    with metrics.stage("prompt_injection", "postprocess"):
+        return list(torch.softmax(logits, dim=1))
+
+
+@inference
+def _forward(inputs: dict):
+    _, backend = registry.get("prompt_injection")
+    return backend(**inputs)
+
+
+# Prompts are bucketed by character length as a cheap proxy for token count
+batcher = MicroBatcher(
+    _score_prompts, length_of=len, bucket_width=256, name="prompt_injection",
+    guardrail="prompt_injection")
+window_batcher = MicroBatcher(
+    _score_windows, length_of=lambda window: len(window["input_ids"]),
+    name="prompt_injection_windows", guardrail="prompt_injection")
+
+
+def _window_starts(n_tokens: int, body: int, step: int) -> list:
+    starts = list(range(0, max(n_tokens - body, 0) + 1, step))
+    # Make sure the last window reaches the end of the prompt
+    if starts[-1] + body < n_tokens:
+        starts.append(n_tokens - body)
+    return starts
+
+
+def _windows(text: str, overlap: int) -> list:
+    tokenizer = _tokenizer()
+    with metrics.stage("prompt_injection", "tokenize"):
+        ids = tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"]
+    window_length = min(tokenizer.model_max_length, WINDOW_LENGTH)
+    body = window_length - tokenizer.num_special_tokens_to_add()
+    if not 0 <= overlap < body:
+        raise ValueError(f"overlap must be between 0 and {body - 1}")
+    windows = []
+    for start in _window_starts(len(ids), body, body - overlap):
+        input_ids = tokenizer.build_inputs_with_special_tokens(
+            ids[start: start + body])
+        windows.append(
+            {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)})
+    return windows
+
+
+async def _classify_windowed(text: str, threshold: float, tail_first: bool, overlap: int):
+    windows = await run_in_thread(_windows, text, overlap)
+    if tail_first:
+        # Injections are usually appended after benign content
+        windows.reverse()
+
+    # Score one window first, then grow the round size up to a full batch,
+    # so a hit in the first window costs a single forward pass
+    worst = None
+    scanned = 0
+    round_size = 1
+    while scanned < len(windows):
+        round_windows = windows[scanned: scanned + round_size]
+        scores = await asyncio.gather(
+            *(window_batcher.submit(w) for w in round_windows))
+        scanned += len(round_windows)
+        for probs in scores:
+            if worst is None or probs[1] > worst[1]:
+                worst = probs
+        if worst[1].item() >= threshold:
+            break
+        round_size = min(round_size * 2, window_batcher.max_batch_size)
+
+    return {
+        "is_prompt_injection": worst[1].item() >= threshold,
+        "confidence": worst[1].item(),
+        "probabilities": worst.tolist(),
+        "windows_scanned": scanned,
+        "windows_total": len(windows)
+    }
+
+
+async def _probabilities(text: str) -> tuple:
+    probs = await batcher.submit(text)
+    return tuple(probs.tolist())
+
+
+async def classify_prompt_injection(
+    text: str,
+    windowed: Optional[bool] = None,
+    threshold: float = 0.5,
+    tail_first: bool = True,
+    overlap: int = WINDOW_OVERLAP,
+    cascade: Optional[bool] = None,
+    safe_below: Optional[float] = None,
+    attack_above: Optional[float] = None,
+    use_index: Optional[bool] = None,
+    index_threshold: Optional[float] = None
+):
+    """
+    Classify a prompt as safe or injection.
+
+    Args:
+        text (str): The prompt.
+        windowed (bool): Score the whole prompt in overlapping windows and stop
+            at the first window whose injection probability reaches
+            `threshold`. Defaults to GUARDRAILS_PROMPT_INJECTION_WINDOWED.
+            Otherwise only the first WINDOW_LENGTH tokens are scored.
+        threshold (float): Injection probability that ends a windowed scan.
+        tail_first (bool): Scan windows from the end of the prompt.
+        overlap (int): Tokens shared by consecutive windows.
+        cascade (bool): Run the heuristic first stage and only send prompts
+            it is unsure about to the model. Defaults to
+            GUARDRAILS_PROMPT_INJECTION_CASCADE.
+        safe_below (float): Heuristic score under which a prompt is safe.
+            Defaults to GUARDRAILS_PROMPT_INJECTION_CASCADE_SAFE_BELOW.
+        attack_above (float): Heuristic score over which a prompt is an
+            injection. Defaults to GUARDRAILS_PROMPT_INJECTION_CASCADE_ATTACK_ABOVE.
+        use_index (bool): Look the prompt up in the index of known attacks
+            first (see attack_index.py). Defaults to on when
+            GUARDRAILS_ATTACK_INDEX is set.
+        index_threshold (float): Cosine similarity to a known attack that
+            flags the prompt. Defaults to GUARDRAILS_ATTACK_INDEX_THRESHOLD.
+
+    Returns:
+        dict: Also holds "stage", the stage that decided: "index",
+        "heuristic" or "model".
+    """
+    with metrics.time("guardrails_guardrail_seconds", guardrail="prompt_injection"):
+        if use_index is None:
+            use_index = attack_index.enabled()
+        if cascade is None:
+            cascade = CASCADE
+
+        result = None
+        if use_index:
+            result = await _match_known_attack(text, index_threshold)
+        if result is None and cascade:
+            result = await _cascade(
+                text, windowed, threshold, tail_first, overlap, safe_below, attack_above)
+        if result is None:
+            result = await _classify(text, windowed, threshold, tail_first, overlap)
+            result["stage"] = "model"
+        if use_index or cascade:
+            metrics.increment(
+                "guardrails_cascade_decisions_total", guardrail="prompt_injection",
+                stage=result["stage"])
+        return result
+
+
+async def _match_known_attack(text, index_threshold):
+    if index_threshold is None:
+        index_threshold = attack_index.THRESHOLD
+    hits = await attack_index.nearest_attacks(text)
+    if not hits or hits[0]["similarity"] < index_threshold:
+        return None
+    similarity = hits[0]["similarity"]
+    return {
+        "is_prompt_injection": True,
+        "confidence": similarity,
+        "probabilities": [1 - similarity, similarity],
+        "stage": "index",
+        "nearest_attack": hits[0]
+    }
+
+
+async def _cascade(text, windowed, threshold, tail_first, overlap, safe_below, attack_above):
+    with metrics.stage("prompt_injection", "heuristic"):
+        score, matched = heuristic_score(text)
+    safe_below = CASCADE_SAFE_BELOW if safe_below is None else safe_below
+    attack_above = CASCADE_ATTACK_ABOVE if attack_above is None else attack_above
+    if score < safe_below or score > attack_above:
+        result = {
+            "is_prompt_injection": score > attack_above,
+            "confidence": score,
+            "probabilities": [1 - score, score],
+            "stage": "heuristic"
+        }
+    else:
+        result = await _classify(text, windowed, threshold, tail_first, overlap)
+        result["stage"] = "model"
+    result["heuristic_score"] = score
+    result["heuristic_features"] = matched
+    return result
+
+
+async def _classify(text, windowed, threshold, tail_first, overlap):
+    if windowed is None:
+        windowed = WINDOWED
+    if windowed:
+        # Where a windowed scan stops depends on the threshold, so it is part
+        # of the key
+        key = result_cache.make_key(
+            "prompt_injection", text, model=model_name, windowed=True,
+            threshold=threshold, tail_first=tail_first, overlap=overlap)
+        result = await result_cache.get_or_compute(
+            key, lambda: _classify_windowed(text, threshold, tail_first, overlap))
+        return copy.deepcopy(result)
+
+    key = result_cache.make_key("prompt_injection", text, model=model_name)
+    probs = await result_cache.get_or_compute(key, lambda: _probabilities(text))
 
     # Assuming binary classification: [0] -> safe, [1] -> injection
-    is_injection = torch.argmax(probs).item() == 1
-    confidence = probs[1].item()
+    is_injection = probs[1] > probs[0]
+    confidence = probs[1]
     return {
         "is_prompt_injection": is_injection,
         "confidence": confidence,
-        "probabilities": probs.tolist()
+        "probabilities": list(probs)
     }
-
-
@@ -0,0 +1,23 @@
+from .batching import MicroBatcher
+from .cache import ResultCache, result_cache
+from .executor import configure_executor, run_blocking, run_model
+from .governor import Budget, ResourceGovernor, governor
+from .metrics import Metrics, MetricsHook, metrics
+from .registry import ModelRegistry, registry
+
+__all__ = [
+    "MicroBatcher",
+    "ResultCache",
+    "result_cache",
+    "configure_executor",
+    "run_blocking",
+    "run_model",
+    "Budget",
+    "ResourceGovernor",
+    "governor",
+    "Metrics",
+    "MetricsHook",
+    "metrics",
+    "ModelRegistry",
+    "registry",
+]
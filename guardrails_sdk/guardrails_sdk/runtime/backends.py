@@ -0,0 +1,153 @@
+import os
+from typing import Optional
+
+import torch
+from transformers import AutoModelForSequenceClassification
+
+BACKENDS = ("eager", "quantized", "compiled", "torchscript", "onnx")
+
+# Exported ONNX graphs live in <GUARDRAILS_ONNX_DIR>/<guardrail>/
+DEFAULT_ONNX_DIR = "onnx_models"
+
+
+class EagerBackend:
+    """Plain PyTorch execution; the reference every other backend is checked against."""
+
+    name = "eager"
+
+    def __init__(self, model):
+        self.model = model.eval()
+
+    def __call__(self, **inputs) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+
+class QuantizedBackend(EagerBackend):
+    """PyTorch with Linear layers dynamically quantized to int8."""
+
+    name = "quantized"
+
+    def __init__(self, model):
+        super().__init__(torch.ao.quantization.quantize_dynamic(
+            model.eval(), {torch.nn.Linear}, dtype=torch.qint8))
+
+
+class CompiledBackend(EagerBackend):
+    """PyTorch 2 `torch.compile` with dynamic shapes, so padding lengths can vary."""
+
+    name = "compiled"
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.model = torch.compile(self.model, dynamic=True)
+
+
+class TorchScriptBackend:
+    """TorchScript graph traced from the eager model."""
+
+    name = "torchscript"
+
+    def __init__(self, model, tokenizer):
+        example = tokenizer(["warmup text"], return_tensors="pt")
+        self.input_names = list(example.keys())
+        with torch.no_grad():
+            self.model = torch.jit.trace(
+                model.eval(), example_kwarg_inputs=dict(example), strict=False)
+
+    def __call__(self, **inputs) -> torch.Tensor:
+        # The traced graph needs exactly the inputs it was traced with
+        feed = {
+            name: inputs[name] if name in inputs else torch.zeros_like(inputs["input_ids"])
+            for name in self.input_names
+        }
+        with torch.no_grad():
+            return self.model(**feed)["logits"]
+
+
+class OnnxBackend:
+    """ONNX Runtime session over a graph produced by `runtime.export`."""
+
+    name = "onnx"
+
+    def __init__(self, path: str, intra_op_threads: Optional[int] = None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError(
+                "The onnx backend needs onnxruntime: pip install onnxruntime")
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"No ONNX graph at {path}. Export one first with the "
+                f"runtime.export module.")
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, **inputs) -> torch.Tensor:
+        feed = {}
+        for name in self.input_names:
+            value = inputs.get(name)
+            if value is None:
+                # e.g. token_type_ids when the tokenizer does not return them
+                value = torch.zeros_like(inputs["input_ids"])
+            feed[name] = value.cpu().numpy().astype("int64")
+        logits = self.session.run(["logits"], feed)[0]
+        return torch.from_numpy(logits)
+
+
+def onnx_path(guardrail: str, quantized: bool = True, onnx_dir: Optional[str] = None) -> str:
+    filename = "model.int8.onnx" if quantized else "model.onnx"
+    onnx_dir = onnx_dir or os.getenv("GUARDRAILS_ONNX_DIR", DEFAULT_ONNX_DIR)
+    return os.path.join(onnx_dir, guardrail, filename)
+
+
+def serving_onnx_path(guardrail: str, onnx_dir: Optional[str] = None) -> str:
+    """Graph the onnx backend loads: the int8 one if exported, else the fp32 one."""
+    quantized = onnx_path(guardrail, quantized=True, onnx_dir=onnx_dir)
+    full = onnx_path(guardrail, quantized=False, onnx_dir=onnx_dir)
+    return full if os.path.exists(full) and not os.path.exists(quantized) else quantized
+
+
+def backend_kind(guardrail: str) -> str:
+    """Backend chosen for a guardrail through GUARDRAILS_<GUARDRAIL>_BACKEND."""
+    kind = os.getenv(f"GUARDRAILS_{guardrail.upper()}_BACKEND", "eager")
+    if kind not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend '{kind}' for {guardrail}, expected one of {BACKENDS}")
+    return kind
+
+
+def load_backend(guardrail: str, model_name: str, tokenizer, kind: Optional[str] = None):
+    """
+    Build the inference backend for one guardrail model.
+
+    Args:
+        guardrail (str): Guardrail name, e.g. "toxicity".
+        model_name (str): HuggingFace model id or local path.
+        tokenizer: The model's tokenizer, used to trace example inputs.
+        kind (str): One of BACKENDS. Defaults to `backend_kind(guardrail)`.
+
+    Returns:
+        A callable taking tokenized tensors as keyword arguments and returning logits.
+    """
+    kind = kind or backend_kind(guardrail)
+    if kind == "onnx":
+        from .governor import governor
+        # ONNX Runtime has its own pool per session; size it to the budget
+        budget = governor.budget(guardrail)
+        return OnnxBackend(serving_onnx_path(guardrail), budget.threads if budget else None)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    if kind == "quantized":
+        return QuantizedBackend(model)
+    if kind == "compiled":
+        return CompiledBackend(model)
+    if kind == "torchscript":
+        return TorchScriptBackend(model, tokenizer)
+    return EagerBackend(model)
+
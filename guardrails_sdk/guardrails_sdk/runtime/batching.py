@@ -0,0 +1,134 @@
+import os
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .executor import run_blocking, run_model
+from .metrics import metrics
+
+
+class MicroBatcher:
+    """
+    Collects concurrent inference calls into a single model call.
+
+    Callers `await submit(item)`; a background task gathers items for at most
+    `max_wait_ms` (or until `max_batch_size` items are queued), groups them into
+    buckets of similar length, runs `process_batch` once per bucket on the
+    configured executor and hands every caller the result at its own position.
+    The next batch is collected while the previous one is still running.
+
+    Args:
+        process_batch: Function taking a list of items and returning a list of
+            results of the same length and order. Must be a module-level
+            function when the executor is a process pool.
+        max_batch_size (int): Upper bound on items per model call.
+        max_wait_ms (float): How long the first queued item waits for company.
+        length_of: Optional function returning an item's length (e.g. token
+            count). When set, items are bucketed by length so short inputs are
+            not padded up to the longest one in the window.
+        bucket_width (int): Width of a length bucket, in the units of `length_of`.
+        name (str): Label of this batcher's batch size metric.
+        guardrail (str): Guardrail whose CPU budget the batches run within
+            (see runtime/governor.py). None uses the shared executor.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        length_of: Optional[Callable[[Any], int]] = None,
+        bucket_width: int = 64,
+        name: str = "batch",
+        guardrail: Optional[str] = None,
+    ):
+        self.process_batch = process_batch
+        self.length_of = length_of
+        self.bucket_width = bucket_width
+        self.name = name
+        self.guardrail = guardrail
+        self.configure(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def configure(self, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        """Update batching limits; unset values fall back to env vars, then defaults."""
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv("GUARDRAILS_BATCH_MAX_SIZE", "16"))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv("GUARDRAILS_BATCH_MAX_WAIT_MS", "5"))
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        # Queues and tasks belong to one event loop; start fresh when a new
+        # loop (e.g. a second asyncio.run) starts submitting.
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Callers that gave up while waiting (e.g. a cancelled pipeline
+            # stage) cost no model time
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+            for group in self._bucket(batch):
+                task = loop.create_task(self._dispatch(group))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, group: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in group]
+        metrics.observe("guardrails_batch_size", len(items), batcher=self.name)
+        try:
+            if self.guardrail:
+                results = await run_model(self.guardrail, self.process_batch, items)
+            else:
+                results = await run_blocking(self.process_batch, items)
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _bucket(self, batch: List[Tuple[Any, asyncio.Future]]) -> List[List[Tuple[Any, asyncio.Future]]]:
+        if self.length_of is None:
+            return [batch]
+        buckets: Dict[int, List[Tuple[Any, asyncio.Future]]] = {}
+        for entry in batch:
+            buckets.setdefault(self.length_of(entry[0]) // self.bucket_width, []).append(entry)
+        return [buckets[key] for key in sorted(buckets)]
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import metrics
+
+_MISSING = object()
+
+
+class _Abandoned(Exception):
+    """Set on a shared computation whose leader was cancelled."""
+
+
+class ResultCache:
+    """
+    LRU + TTL cache for guardrail results, keyed by a hash of the content and
+    the guardrail config, with single-flight deduplication: concurrent calls
+    for the same key share one in-flight computation instead of each running
+    the model.
+
+    Guardrails cache their raw scores and apply thresholds afterwards, so
+    changing `treshold` still hits the cache.
+
+    Args:
+        max_entries (int): LRU capacity, 0 disables caching. Defaults to the
+            GUARDRAILS_CACHE_SIZE env var, then 4096.
+        ttl_seconds (float): Entry lifetime. Defaults to GUARDRAILS_CACHE_TTL,
+            then 600.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.configure(max_entries, ttl_seconds)
+
+    def configure(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        if max_entries is None:
+            max_entries = int(os.getenv("GUARDRAILS_CACHE_SIZE", "4096"))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("GUARDRAILS_CACHE_TTL", "600"))
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        with self._lock:
+            while len(self._entries) > max(self.max_entries, 0):
+                self._entries.popitem(last=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(guardrail: str, text: str, **config) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps([guardrail, config], sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def lookup(self, key: str) -> tuple:
+        """(found, value) for `key`, counted in the hit/miss stats. For callers
+        that batch their misses instead of using `get_or_compute`."""
+        if not self.enabled:
+            return False, None
+        value = self.get(key)
+        if value is _MISSING:
+            self.misses += 1
+            metrics.increment("guardrails_cache_lookups_total", result="miss")
+            return False, None
+        self.hits += 1
+        metrics.increment("guardrails_cache_lookups_total", result="hit")
+        return True, value
+
+    def put(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, or await `compute()` once and cache it.
+
+        Cached values are shared between callers and must not be mutated.
+        When the caller running `compute()` is cancelled, a caller waiting
+        for the same key runs it again instead of being cancelled too.
+        """
+        if not self.enabled:
+            return await compute()
+
+        while True:
+            value = self.get(key)
+            if value is not _MISSING:
+                self.hits += 1
+                metrics.increment("guardrails_cache_lookups_total", result="hit")
+                return value
+
+            loop = asyncio.get_running_loop()
+            inflight = self._inflight.get(key)
+            if inflight is None or inflight.get_loop() is not loop:
+                break
+            self.shared += 1
+            metrics.increment("guardrails_cache_lookups_total", result="shared")
+            try:
+                # shield: a cancelled follower must not cancel the shared work
+                return await asyncio.shield(inflight)
+            except _Abandoned:
+                # The leader was cancelled; take over (or join whoever did)
+                continue
+
+        self.misses += 1
+        metrics.increment("guardrails_cache_lookups_total", result="miss")
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            # Only this caller was cancelled, not the callers sharing its work
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(value)
+            self.put(key, value)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_inflight": self.shared,
+            "hit_rate": (self.hits + self.shared) / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+result_cache = ResultCache()
+metrics.add_collector(
+    lambda: [("guardrails_cache_entries", "gauge", result_cache.stats()["size"], {})])
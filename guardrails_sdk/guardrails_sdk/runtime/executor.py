@@ -0,0 +1,102 @@
+import os
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Literal, Optional
+
+_executor: Optional[Executor] = None
+_kind: Optional[str] = None
+
+
+def configure_executor(
+    kind: Optional[Literal["thread", "process", "remote"]] = None,
+    max_workers: Optional[int] = None
+) -> Executor:
+    """
+    Set the pool that guardrail CPU work (model calls, Presidio, word matching)
+    is dispatched to.
+
+    Args:
+        kind (str): "thread", "process" or "remote". Defaults to the
+            GUARDRAILS_EXECUTOR env var, then "thread". A process pool loads
+            its own copy of the models in every worker, so size it with
+            memory in mind. "remote" runs on threads but sends model calls to
+            the inference server (see runtime/inference.py), which holds the
+            only copy of the models.
+        max_workers (int): Pool size. Defaults to GUARDRAILS_EXECUTOR_WORKERS,
+            then the pool's own default.
+
+    Returns:
+        Executor: The new executor. Any previous one is shut down.
+    """
+    global _executor, _kind
+    kind = kind or os.getenv("GUARDRAILS_EXECUTOR", "thread")
+    if max_workers is None and os.getenv("GUARDRAILS_EXECUTOR_WORKERS"):
+        max_workers = int(os.getenv("GUARDRAILS_EXECUTOR_WORKERS"))
+
+    from .inference import configure_remote, disable_remote
+
+    if kind in ("thread", "remote"):
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="guardrails")
+    elif kind == "process":
+        # fork() after torch has started its thread pools can deadlock
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        raise ValueError(
+            f"Unknown executor kind '{kind}', expected 'thread', 'process' or 'remote'")
+    if kind == "remote":
+        configure_remote()
+    else:
+        disable_remote()
+
+    previous, _executor = _executor, executor
+    _kind = kind
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return executor
+
+
+def get_executor() -> Executor:
+    if _executor is None:
+        configure_executor()
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `func` on the configured executor without blocking the event loop.
+
+    With a process pool `func` and its arguments must be picklable, i.e. a
+    module-level function called with plain data.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def run_model(guardrail: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Like `run_blocking`, but within the guardrail's CPU budget when it has one.
+
+    Budgets (see runtime/governor.py) apply to the thread executor. With the
+    remote executor the inference server applies them to its own calls; a
+    process pool ignores them.
+    """
+    from .governor import governor
+
+    get_executor()
+    pool = governor.executor_for(guardrail) if _kind == "thread" else None
+    if pool is None:
+        return await run_blocking(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `func` on the event loop's default thread pool.
+
+    For blocking work that cannot leave the process, such as advancing a
+    generator.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
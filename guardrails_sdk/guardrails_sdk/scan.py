@@ -0,0 +1,351 @@
+"""
+Offline bulk scan of JSONL or CSV records (e.g. historical chat logs) across
+worker processes, each loading the models once.
+
+Results are appended to a JSONL file in input order and a checkpoint is
+written after every chunk, so an interrupted scan continues where it stopped
+with --resume.
+
+Usage:
+    guardrails-scan chats.jsonl --out results.jsonl --checks pii,toxicity --workers 4
+    guardrails-scan chats.csv --text-field message --id-field msg_id --out results.jsonl --resume
+"""
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CHECKS = ("pii", "toxicity", "prompt_injection", "banned_words")
+
+# Rough resident size of one worker with every model loaded
+WORKER_MEMORY_BYTES = 2 * 1024 ** 3
+
+# (line number, record id, text, error of a record that could not be read)
+Record = Tuple[int, Any, str, Optional[str]]
+
+
+def read_records(path: str, text_field: str, id_field: Optional[str],
+                 fmt: Optional[str] = None) -> Iterator[Record]:
+    """
+    Stream records from a JSONL or CSV file without loading it whole. A
+    record that cannot be parsed is yielded with an error instead of text,
+    so one bad line does not end the scan.
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "csv":
+            rows = _csv_rows(f)
+        else:
+            rows = (_json_row(line) for line in f if line.strip())
+        for line, row in enumerate(rows, start=1):
+            if isinstance(row, Exception):
+                yield line, None, "", f"Invalid record: {row}"
+            else:
+                yield line, row.get(id_field) if id_field else None, row.get(text_field) or "", None
+
+
+def _json_row(line: str):
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return e
+    return row if isinstance(row, dict) else TypeError("expected a JSON object")
+
+
+def _csv_rows(f):
+    reader = csv.DictReader(f)
+    while True:
+        try:
+            yield next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # The reader has moved past the bad row
+            yield e
+
+
+def default_workers() -> int:
+    """A few workers, no more than the machine's memory holds model copies for."""
+    workers = min(4, os.cpu_count() or 1)
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return workers
+    return max(1, min(workers, memory // WORKER_MEMORY_BYTES))
+
+
+# === Worker side ===
+
+_config: Dict[str, Any] = {}
+
+
+def _init_worker(config: Dict[str, Any]):
+    global _config
+    _config = config
+    if config.get("torch_threads"):
+        import torch
+        torch.set_num_threads(config["torch_threads"])
+
+    # Importing the check modules registers their models
+    import guardrails_sdk.pii.pii  # noqa: F401
+    import guardrails_sdk.toxicity.toxic_bert  # noqa: F401
+    import guardrails_sdk.prompt_secure.prompt_break  # noqa: F401
+    from guardrails_sdk.runtime.registry import registry
+    if config.get("torch_threads"):
+        # The workers already split the cores; a chunk pool in each of them
+        # would add more model copies on top
+        guardrails_sdk.pii.pii.CHUNK_WORKERS = 1
+    # Load every model this worker needs once, before the first chunk
+    registry.warmup([name for name in config["checks"] if name in registry.names()])
+
+
+def _scan_chunk(records: List[Record]) -> Tuple[List[dict], Dict[str, float]]:
+    return asyncio.run(_scan_records(records, _config))
+
+
+async def _scan_records(records: List[Record], config: Dict[str, Any]):
+    outputs, valid = [], []
+    for line, record_id, text, error in records:
+        output = {"line": line, "id": record_id, "results": {}}
+        if error:
+            output["error"] = error
+        else:
+            valid.append((output, text))
+        outputs.append(output)
+    texts = [text for _, text in valid]
+    timings = {}
+    for check in config["checks"]:
+        start = time.perf_counter()
+        results = await _run_check(check, texts, config) if texts else []
+        timings[check] = time.perf_counter() - start
+        for (output, _), result in zip(valid, results):
+            output["results"][check] = (
+                {"error": str(result)} if isinstance(result, Exception) else result)
+    return outputs, timings
+
+
+async def _run_check(check: str, texts: List[str], config: Dict[str, Any]) -> list:
+    threshold = config["threshold"]
+    if check == "pii":
+        from guardrails_sdk.pii.pii import analyze_and_mask_many, analyze_and_mask_text
+        try:
+            # One spaCy pipe over the whole chunk
+            return await analyze_and_mask_many(
+                texts, config["entities"], None, threshold, batch_size=len(texts) or 1)
+        except Exception:
+            # Some record broke the batch: analyze them one by one, so only
+            # the bad ones get an error
+            calls = [
+                analyze_and_mask_text(text, config["entities"], None, threshold)
+                for text in texts]
+    elif check == "toxicity":
+        from guardrails_sdk.toxicity.toxic_bert import detect_toxicity
+        calls = [detect_toxicity(text, threshold) for text in texts]
+    elif check == "prompt_injection":
+        from guardrails_sdk.prompt_secure.prompt_break import classify_prompt_injection
+        calls = [classify_prompt_injection(text) for text in texts]
+    else:
+        from guardrails_sdk.compitator_banned_words.block_words import moderate_text
+        calls = [
+            moderate_text(text, config["block_words"], config["competitor_words"], "mask")
+            for text in texts]
+    # Concurrent calls share the model micro-batches
+    return await asyncio.gather(*calls, return_exceptions=True)
+
+
+# === Coordinator side ===
+
+def _chunks(records: Iterator[Record], size: int) -> Iterator[List[Record]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _load_checkpoint(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    # Atomic replace: a crash never leaves a half-written checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def scan(
+    input_path: str,
+    output_path: str,
+    checks: List[str],
+    text_field: str = "content",
+    id_field: Optional[str] = None,
+    fmt: Optional[str] = None,
+    entities: Optional[List[str]] = None,
+    threshold: float = 0.5,
+    block_words: Optional[str] = None,
+    competitor_words: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = 64,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    log=print
+) -> Dict[str, Any]:
+    """
+    Scan every record of `input_path` and append one JSON line per record
+    to `output_path`.
+
+    Returns:
+        Dict: docs scanned, elapsed seconds, docs/sec and the seconds spent
+        in each guardrail (summed over workers).
+    """
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+    checkpoint = _load_checkpoint(checkpoint_path) if resume else {}
+    if checkpoint and checkpoint.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}")
+    done = checkpoint.get("records_done", 0)
+
+    # Drop anything written after the last checkpoint, it is scanned again
+    mode = "r+" if resume and os.path.exists(output_path) else "w"
+    out = open(output_path, mode, encoding="utf-8")
+    out.truncate(checkpoint.get("output_bytes", 0))
+    out.seek(0, os.SEEK_END)
+
+    config = {
+        "checks": checks,
+        "entities": entities or [],
+        "threshold": threshold,
+        "block_words": block_words,
+        "competitor_words": competitor_words,
+        # Split the cores between workers instead of oversubscribing them
+        "torch_threads": max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None,
+    }
+
+    records = read_records(input_path, text_field, id_field, fmt)
+    for _ in range(done):
+        next(records, None)
+    chunks = _chunks(records, chunk_size)
+
+    totals = {check: 0.0 for check in checks}
+    scanned = 0
+    start = time.perf_counter()
+
+    def write(outputs: List[dict], timings: Dict[str, float]):
+        nonlocal scanned, done
+        for output in outputs:
+            out.write(json.dumps(output, default=str) + "\n")
+        out.flush()
+        scanned += len(outputs)
+        done += len(outputs)
+        for check, seconds in timings.items():
+            totals[check] += seconds
+        _save_checkpoint(checkpoint_path, {
+            "input": os.path.abspath(input_path),
+            "records_done": done,
+            "output_bytes": out.tell()
+        })
+
+    try:
+        if workers <= 1:
+            _init_worker(config)
+            for chunk in chunks:
+                write(*_scan_chunk(chunk))
+        else:
+            # fork() after torch has started its thread pools can deadlock
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(workers, initializer=_init_worker, initargs=(config,)) as pool:
+                # A bounded window of chunks in flight keeps memory flat and
+                # results are written in input order, so the checkpoint is
+                # always a clean prefix of the input
+                window = deque()
+                for chunk in chunks:
+                    window.append(pool.apply_async(_scan_chunk, (chunk,)))
+                    if len(window) >= 2 * workers:
+                        write(*window.popleft().get())
+                while window:
+                    write(*window.popleft().get())
+    finally:
+        out.close()
+
+    elapsed = time.perf_counter() - start
+    report = {
+        "docs": scanned,
+        "total_docs": done,
+        "elapsed_seconds": round(elapsed, 3),
+        "docs_per_second": round(scanned / elapsed, 2) if elapsed else 0.0,
+        "guardrail_seconds": {check: round(seconds, 3) for check, seconds in totals.items()}
+    }
+    log(f"[scan] {scanned} docs in {elapsed:.1f}s ({report['docs_per_second']} docs/sec)")
+    busy = sum(totals.values()) or 1.0
+    for check, seconds in totals.items():
+        log(f"[scan]   {check}: {seconds:.1f}s ({seconds / busy:.0%} of guardrail time)")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSONL or CSV file")
+    parser.add_argument("--out", required=True, help="JSONL results file")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--text-field", default="content")
+    parser.add_argument("--id-field", default=None)
+    parser.add_argument("--checks", default="pii,toxicity",
+                        help=f"Comma separated, any of {','.join(CHECKS)}")
+    parser.add_argument("--entities", default="EMAIL_ADDRESS,PHONE_NUMBER,CREDIT_CARD,PERSON",
+                        help="PII entities, comma separated")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--block-words", default=None, help="Banned word file")
+    parser.add_argument("--competitor-words", default=None, help="Competitor word file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes, each loading every model "
+                             "(default: up to 4, fewer when memory is short)")
+    parser.add_argument("--chunk-size", type=int, default=64,
+                        help="Records per task handed to a worker")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file (default: <out>.checkpoint)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the checkpoint instead of starting over")
+    args = parser.parse_args(argv)
+
+    checks = [check.strip() for check in args.checks.split(",") if check.strip()]
+    unknown = [check for check in checks if check not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks {unknown}, expected any of {CHECKS}")
+    if "banned_words" in checks and not (args.block_words or args.competitor_words):
+        parser.error("the banned_words check needs --block-words and/or --competitor-words")
+
+    report = scan(
+        args.input, args.out, checks,
+        text_field=args.text_field,
+        id_field=args.id_field,
+        fmt=args.format,
+        entities=[e.strip() for e in args.entities.split(",") if e.strip()],
+        threshold=args.threshold,
+        block_words=args.block_words,
+        competitor_words=args.competitor_words,
+        workers=args.workers if args.workers is not None else default_workers(),
+        chunk_size=args.chunk_size,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        log=lambda message: print(message, file=sys.stderr)
+    )
+    print(json.dumps(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import os
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+from guardrails_sdk.pii.pii import analyze_text, mask_text
+from guardrails_sdk.toxicity.toxic_bert import detect_toxicity
+from guardrails_sdk.compitator_banned_words.block_words import get_matcher
+from guardrails_sdk.compitator_banned_words.matcher import mask_spans
+
+# Characters held back at the end of the stream so an entity or word that is
+# still being generated is never emitted half-checked. Must exceed the longest
+# PII value or listed word expected.
+LOOKBEHIND_CHARS = int(os.getenv("GUARDRAILS_STREAM_LOOKBEHIND", "64"))
+# New text collected before toxicity is scored again, and the already scored
+# text kept in front of it as context
+TOXICITY_STRIDE_CHARS = int(os.getenv("GUARDRAILS_STREAM_TOXICITY_STRIDE", "1024"))
+TOXICITY_CONTEXT_CHARS = int(os.getenv("GUARDRAILS_STREAM_TOXICITY_CONTEXT", "256"))
+
+
+class StreamRequest(BaseModel):
+    guardrails: List[str] = []
+    treshold: float = 0.5
+    custom_entities: Optional[List[Dict]] = None
+    action: Optional[Literal["mask", "block"]] = "mask"
+    # Word lists come with the request; a stream never opens files it names
+    compitator_words: Optional[List[str]] = None
+    block_words: Optional[List[str]] = None
+    toxicity: bool = True
+    # End the stream once toxicity crosses `treshold`
+    block_toxic: bool = False
+
+
+class StreamGuard:
+    """
+    Guards text that arrives in pieces, e.g. LLM output tokens.
+
+    `feed(delta)` appends to a pending buffer. Once the buffer is more than
+    twice LOOKBEHIND_CHARS long, everything up to the last whitespace before
+    the look-behind tail is checked for banned/competitor words and PII,
+    masked and released; the tail stays pending. Toxicity is scored on every
+    TOXICITY_STRIDE_CHARS of released text plus TOXICITY_CONTEXT_CHARS of the
+    text before it, through the same windowing as `detect_toxicity`.
+
+    Every check only sees a bounded window, so the total cost grows linearly
+    with the length of the stream. The released text is masked as in one
+    pass over the whole text, except that neighbouring PII entities of a type
+    released in different events keep a placeholder each, where one pass
+    merges them into one.
+    """
+
+    def __init__(self, request: Optional[StreamRequest] = None,
+                 lookbehind_chars: int = LOOKBEHIND_CHARS):
+        self.request = request or StreamRequest()
+        self.lookbehind_chars = lookbehind_chars
+        banned, competitors = self.request.block_words, self.request.compitator_words
+        self.matcher = (
+            get_matcher(banned, competitors)
+            if banned is not None or competitors is not None else None)
+
+        self.pending = ""
+        self.blocked = False
+        self.pii_found = False
+        self.banned_words: List[str] = []
+        self.competitors: List[str] = []
+        self.toxicity_scores: Dict[str, float] = {}
+        self.released_chars = 0
+        # Released raw text not scored for toxicity yet, and the scored text
+        # kept as context for the next window
+        self._unscored = ""
+        self._context = ""
+
+    async def feed(self, delta: str) -> Dict[str, Any]:
+        """Add a piece of text; returns the event for whatever could be released."""
+        if self.blocked:
+            raise RuntimeError("Stream was blocked")
+        self.pending += delta
+        release = self._release_point()
+        return await self._emit(release, final=False)
+
+    async def finish(self) -> Dict[str, Any]:
+        """Check and release everything still pending; the last event of the stream."""
+        if self.blocked:
+            return self._event("", None)
+        return await self._emit(len(self.pending), final=True)
+
+    def _release_point(self) -> int:
+        if len(self.pending) < 2 * self.lookbehind_chars:
+            return 0
+        limit = len(self.pending) - self.lookbehind_chars
+        cut = self.pending.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = max(self.pending.rfind(ch, 0, limit + 1) for ch in "\n\t")
+        if cut <= 0:
+            # No whitespace at all: cut anyway so the buffer stays bounded
+            cut = limit if len(self.pending) > 4 * self.lookbehind_chars else 0
+        return cut
+
+    async def _emit(self, release: int, final: bool) -> Dict[str, Any]:
+        if release <= 0 and not (final and self.pending):
+            return self._event("", await self._score_toxicity(final))
+
+        # Checks run over the whole pending buffer so a match crossing the
+        # release point is seen, and the release point moves in front of it
+        word_matches = self.matcher.find(self.pending) if self.matcher else []
+        pii_results = await self._analyze_pii(self.pending)
+        if not final:
+            spans = [(start, end) for _, start, end in word_matches] + [
+                (start, end) for _, start, end, score in pii_results
+                if score >= self.request.treshold]
+            for start, end in spans:
+                if start < release < end:
+                    release = start
+            if release <= 0:
+                return self._event("", await self._score_toxicity(final))
+
+        region = self.pending[:release]
+        region_words = [m for m in word_matches if m[2] <= release]
+        region_pii = tuple(r for r in pii_results if r[2] <= release)
+        self.pending = self.pending[release:]
+
+        for category, start, end in region_words:
+            found = self.banned_words if category == "banned" else self.competitors
+            found.append(region[start:end])
+        if region_words and self.request.action == "block":
+            self.blocked = True
+            return self._event("", None)
+
+        masked = region
+        if region_words and self.request.action == "mask":
+            masked = mask_spans(masked, region_words)
+        if region_pii:
+            pii = mask_text(masked, region_pii, self.request.treshold)
+            self.pii_found = self.pii_found or pii["pii_found"]
+            masked = pii["masked_text"]
+
+        self._unscored += region
+        self.released_chars += len(region)
+        toxicity = await self._score_toxicity(final)
+        if self.blocked:
+            return self._event("", toxicity)
+        return self._event(masked, toxicity)
+
+    async def _analyze_pii(self, text: str) -> tuple:
+        if not text or not (self.request.guardrails or self.request.custom_entities):
+            return ()
+        return await analyze_text(
+            text, self.request.guardrails, self.request.custom_entities, use_cache=False)
+
+    async def _score_toxicity(self, final: bool) -> Optional[Dict[str, Any]]:
+        if not self.request.toxicity or not self._unscored.strip():
+            return None
+        if len(self._unscored) < TOXICITY_STRIDE_CHARS and not final:
+            return None
+        window = self._context + self._unscored
+        self._context = window[-TOXICITY_CONTEXT_CHARS:] if TOXICITY_CONTEXT_CHARS else ""
+        self._unscored = ""
+
+        result = await detect_toxicity(window, self.request.treshold, use_cache=False)
+        for label, score in result["all_scores"].items():
+            self.toxicity_scores[label] = max(score, self.toxicity_scores.get(label, 0.0))
+        if result["is_toxic"] and self.request.block_toxic:
+            self.blocked = True
+        return result
+
+    def _event(self, text: str, toxicity: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        flagged = {
+            label: score for label, score in self.toxicity_scores.items()
+            if score >= self.request.treshold}
+        return {
+            "text": text,
+            "blocked": self.blocked,
+            "pii_found": self.pii_found,
+            "banned_words": list(self.banned_words),
+            "competitors": list(self.competitors),
+            "is_toxic": bool(flagged),
+            # Scores of the window evaluated by this event, if any
+            "toxicity": toxicity,
+            "released_chars": self.released_chars
+        }
+
+
+async def guard_stream(
+    deltas: AsyncIterable[str],
+    request: Optional[StreamRequest] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Guard an async stream of text deltas, yielding an event whenever text is
+    released or a verdict changes. The last event has "done": True. The stream
+    stops early once it is blocked.
+    """
+    guard = StreamGuard(request)
+    async for delta in deltas:
+        event = await guard.feed(delta)
+        if event["text"] or event["toxicity"] or event["blocked"]:
+            yield event
+        if guard.blocked:
+            break
+    event = await guard.finish()
+    event["done"] = True
+    yield event
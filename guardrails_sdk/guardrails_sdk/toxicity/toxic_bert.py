@@ -1,11 +1,51 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import os
+import time
+import asyncio
+import functools
+import itertools
+from transformers import AutoTokenizer
 import torch
 
-# Load tokenizer and model
+from guardrails_sdk.runtime.backends import load_backend
+from guardrails_sdk.runtime.batching import MicroBatcher
+from guardrails_sdk.runtime.cache import result_cache
+from guardrails_sdk.runtime.executor import run_in_thread
+from guardrails_sdk.runtime.inference import inference
+from guardrails_sdk.runtime.metrics import metrics
+from guardrails_sdk.runtime.registry import registry
+
+# Tokenizer and model are loaded on first use through the model registry
 model_name = "unitary/toxic-bert"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
-model.eval()
+
+
+@functools.lru_cache(maxsize=None)
+def _tokenizer():
+    # Loaded apart from the model: with the inference server, API workers
+    # tokenize locally and never load the model
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def _load_model():
+    # The backend (eager, quantized, compiled, torchscript or onnx) is picked
+    # with GUARDRAILS_TOXICITY_BACKEND
+    tokenizer = _tokenizer()
+    return tokenizer, load_backend("toxicity", model_name, tokenizer)
+
+
+def _warmup(_):
+    _score_chunks([_window([])])
+
+
+registry.register("toxicity", _load_model, _warmup)
+
+
+def __getattr__(name):
+    # Keep `toxic_bert.tokenizer` and `toxic_bert.model` (now the inference
+    # backend) available without loading them at import time
+    if name in ("tokenizer", "model"):
+        tokenizer, backend = registry.get("toxicity")
+        return tokenizer if name == "tokenizer" else backend
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Toxicity labels
 labels = [
@@ -17,50 +57,159 @@ labels = [
     "threat"
 ]
 
+# Overlap (in tokens) between consecutive windows of a long input; 0 scores
+# every token exactly once
+DEFAULT_OVERLAP = int(os.getenv("GUARDRAILS_TOXICITY_OVERLAP", "256"))
+
+# Long inputs are tokenized this many characters at a time so memory stays
+# bounded no matter how large the document is
+SEGMENT_CHARS = 16384
+
+
+def _iter_segments(text, size=SEGMENT_CHARS):
+    # Cut on whitespace so no word is split across two tokenizer calls
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = end
+            while cut > start and not text[cut].isspace():
+                cut -= 1
+            if cut > start:
+                end = cut
+        yield text[start:end]
+        start = end
+
+
+def _window(ids):
+    tokenizer = _tokenizer()
+    input_ids = tokenizer.build_inputs_with_special_tokens(ids)
+    return {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+
+
+def iter_chunks(text, max_length=512, overlap=DEFAULT_OVERLAP):
+    """
+    Lazily yield model-ready token windows covering the whole text.
+
+    Args:
+        text (str): The input text.
+        max_length (int): Window size including special tokens.
+        overlap (int): Tokens shared by consecutive windows, 0 for none.
+
+    Yields:
+        dict: `input_ids` and `attention_mask` lists for one window.
+    """
+    tokenizer = _tokenizer()
+    body = max_length - tokenizer.num_special_tokens_to_add()
+    if not 0 <= overlap < body:
+        raise ValueError(f"overlap must be between 0 and {body - 1}")
+    step = body - overlap
+
+    buffer = []
+    emitted = False
+    for segment in _iter_segments(text):
+        buffer.extend(tokenizer(
+            segment, add_special_tokens=False, verbose=False)["input_ids"])
+        while len(buffer) >= body:
+            yield _window(buffer[:body])
+            emitted = True
+            del buffer[:step]
+
+    # Whatever is left over only needs scoring if it holds unseen tokens
+    if not emitted or len(buffer) > overlap:
+        yield _window(buffer)
+
 # Function to split text into chunks of max 512 tokens
 
 
 async def chunk_text(text, max_length=512, stride=256):
-    inputs = tokenizer(
-        text,
-        return_tensors="pt",
-        truncation=False,
-        add_special_tokens=True
-    )
-
-    input_ids = inputs["input_ids"][0]
-    attention_mask = inputs["attention_mask"][0]
-
-    chunks = []
-    for i in range(0, len(input_ids), stride):
-        chunk_ids = input_ids[i: i + max_length]
-        chunk_mask = attention_mask[i: i + max_length]
-
-        # Ensure proper tensor shape: [1, seq_len]
-        chunks.append({
-            "input_ids": chunk_ids.unsqueeze(0),
-            "attention_mask": chunk_mask.unsqueeze(0)
-        })
-
-        if i + max_length >= len(input_ids):
-            break
-
-    return chunks
+    tokenizer = _tokenizer()
+    overlap = min(max_length - stride,
+                  max_length - tokenizer.num_special_tokens_to_add() - 1)
+    return [
+        {
+            # Ensure proper tensor shape: [1, seq_len]
+            "input_ids": torch.tensor([chunk["input_ids"]]),
+            "attention_mask": torch.tensor([chunk["attention_mask"]])
+        }
+        for chunk in iter_chunks(text, max_length, max(overlap, 0))
+    ]
+
+# Run one padded forward pass over chunks collected from concurrent requests
+
+
+def _score_chunks(chunks: list) -> list:
+    with metrics.stage("toxicity", "pad"):
+        batch = dict(_tokenizer().pad(chunks, padding=True, return_tensors="pt"))
+    with metrics.stage("toxicity", "infer"):
+        logits = _forward(batch)
+    with metrics.stage("toxicity", "postprocess"):
+        return list(torch.sigmoid(logits))
+
+
+@inference
+def _forward(batch: dict):
+    _, backend = registry.get("toxicity")
+    return backend(**batch)
+
+
+batcher = MicroBatcher(
+    _score_chunks, length_of=lambda chunk: len(chunk["input_ids"]), name="toxicity",
+    guardrail="toxicity")
+
+
+def _next_windows(windows_iter, n):
+    start = time.perf_counter()
+    windows = list(itertools.islice(windows_iter, n))
+    # The final call only finds the iterator exhausted
+    if windows:
+        metrics.observe(
+            "guardrails_stage_seconds", time.perf_counter() - start,
+            guardrail="toxicity", stage="tokenize")
+    return windows
 
 # Function to evaluate toxicity
 
 
-async def detect_toxicity(text, threshold=0.5):
-    chunks = await chunk_text(text)
+async def _update_max(windows, max_scores):
+    scores = await asyncio.gather(*(batcher.submit(w) for w in windows))
+    return torch.maximum(max_scores, torch.stack(scores).max(dim=0).values)
+
+
+async def _score_text(text, overlap):
     max_scores = torch.zeros(len(labels))
 
-    for chunk in chunks:
-        with torch.no_grad():
-            outputs = model(**chunk)
-            probs = torch.sigmoid(outputs.logits).squeeze()
-            max_scores = torch.maximum(max_scores, probs)
+    # Only one batch worth of windows is held in memory at a time; windows
+    # are tokenized off the event loop
+    windows_iter = iter_chunks(text, overlap=overlap)
+    while True:
+        windows = await run_in_thread(_next_windows, windows_iter, batcher.max_batch_size)
+        if not windows:
+            break
+        max_scores = await _update_max(windows, max_scores)
+
+    return {label: float(score) for label, score in zip(labels, max_scores)}
+
+
+async def detect_toxicity(text, threshold=0.5, overlap=None, use_cache=True):
+    with metrics.time("guardrails_guardrail_seconds", guardrail="toxicity"):
+        return await _detect_toxicity(text, threshold, overlap, use_cache)
+
+
+async def _detect_toxicity(text, threshold, overlap, use_cache):
+    if overlap is None:
+        overlap = DEFAULT_OVERLAP
+
+    if use_cache:
+        # Raw scores are cached so the threshold can change without a miss
+        key = result_cache.make_key(
+            "toxicity", text, model=model_name, overlap=overlap)
+        scores = await result_cache.get_or_compute(
+            key, lambda: _score_text(text, overlap))
+    else:
+        scores = await _score_text(text, overlap)
 
-    result = {label: float(score) for label, score in zip(labels, max_scores)}
+    result = dict(scores)
     flagged = {k: v for k, v in result.items() if v >= threshold}
 
     return {
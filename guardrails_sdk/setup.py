@@ -10,6 +10,12 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/tejadata/guardrails",
     packages=find_packages(),
+    entry_points={
+        "console_scripts": [
+            "guardrails-scan=guardrails_sdk.scan:main",
+            "guardrails-inference=guardrails_sdk.runtime.inference:main",
+        ],
+    },
     install_requires=[
         "httpx",
         "pydantic==2.9.2",
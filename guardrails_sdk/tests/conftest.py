@@ -0,0 +1,42 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Import the SDK package from this checkout
+sys.path.insert(0, ROOT)
+
+import pytest
+
+# Lemmas of the lookup lemmatizer in the test spaCy pipeline
+LEMMAS = {"calling": "call", "called": "call", "calls": "call", "phones": "phone", "emails": "email"}
+
+
+@pytest.fixture(scope="session")
+def pii_analyzer(tmp_path_factory):
+    """
+    Register an offline Presidio analyzer as the "pii" model: a blank spaCy
+    English pipeline (no NER, so only pattern recognizers fire) with a
+    lookup lemmatizer, so the context enhancer sees real lemmas.
+    """
+    spacy = pytest.importorskip("spacy")
+    from spacy.lookups import Lookups
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_analyzer.nlp_engine import SpacyNlpEngine
+    from guardrails_sdk.pii import pii
+    from guardrails_sdk.runtime.registry import registry
+
+    nlp = spacy.blank("en")
+    lookups = Lookups()
+    lookups.add_table("lemma_lookup", LEMMAS)
+    nlp.add_pipe("lemmatizer", config={"mode": "lookup"}).initialize(lookups=lookups)
+    path = str(tmp_path_factory.mktemp("spacy_en"))
+    nlp.to_disk(path)
+
+    previous = registry._entries.get("pii")
+    registry.register(
+        "pii",
+        lambda: AnalyzerEngine(nlp_engine=SpacyNlpEngine(
+            models=[{"lang_code": "en", "model_name": path}])),
+        pii._warmup)
+    yield registry.get("pii")
+    registry._entries["pii"] = previous
@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from guardrails_sdk.log_guardrails.log_anomaly import AnomalyStorage, AnomalyRollup
+
+BASE = datetime(2024, 5, 1, 10, 0, 0)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = AnomalyStorage(f"sqlite:///{tmp_path / 'anomalies.db'}")
+    storage.init()
+    return storage
+
+
+def _rows(count, anomaly_type="pii", step=timedelta(seconds=20), start=BASE):
+    return [{
+        "request_id": f"{anomaly_type}-{i}",
+        "anomaly_type": anomaly_type,
+        "details": json.dumps({"i": i}),
+        "timestamp": start + i * step,
+    } for i in range(count)]
+
+
+def _page_through(storage, **kwargs):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = storage.query_anomalies(cursor=cursor, **kwargs)
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def test_pages_cover_every_row_once_newest_first(storage):
+    storage.store_anomalies(_rows(25))
+    items, pages = _page_through(storage, limit=10)
+    assert pages == 3
+    assert [item["request_id"] for item in items] == [f"pii-{i}" for i in reversed(range(25))]
+    assert items[0]["details"] == {"i": 24}
+
+
+def test_rows_sharing_a_timestamp_are_split_across_pages_by_id(storage):
+    # The cursor falls inside a run of equal timestamps
+    storage.store_anomalies(_rows(7, step=timedelta(0)))
+    items, pages = _page_through(storage, limit=3)
+    assert pages == 3
+    ids = [item["id"] for item in items]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 7
+
+
+def test_filters_and_time_range(storage):
+    storage.store_anomalies(_rows(10, "pii") + _rows(5, "toxicity"))
+    page = storage.query_anomalies(anomaly_type="toxicity")
+    assert {item["anomaly_type"] for item in page["items"]} == {"toxicity"}
+    assert len(page["items"]) == 5
+
+    # start inclusive, end exclusive
+    page = storage.query_anomalies(
+        start=BASE + timedelta(seconds=40), end=BASE + timedelta(seconds=100), anomaly_type="pii")
+    assert [item["request_id"] for item in page["items"]] == ["pii-4", "pii-3", "pii-2"]
+
+    page = storage.query_anomalies(request_id="pii-7")
+    assert [item["request_id"] for item in page["items"]] == ["pii-7"]
+
+
+def test_aware_timestamps_are_compared_as_utc(storage):
+    storage.store_anomalies(_rows(10))
+    start = (BASE + timedelta(seconds=60)).replace(tzinfo=timezone.utc).astimezone(
+        timezone(timedelta(hours=2)))
+    page = storage.query_anomalies(start=start)
+    assert len(page["items"]) == 7
+
+
+def test_invalid_cursor(storage):
+    with pytest.raises(ValueError):
+        storage.query_anomalies(cursor="not-a-cursor")
+
+
+def test_aggregate_matches_the_stored_rows(storage):
+    # 20s apart: 3 rows per minute, spread over two hours
+    storage.store_anomalies(_rows(200, "pii"))
+    storage.store_anomalies(_rows(30, "toxicity", step=timedelta(minutes=5)))
+
+    result = storage.aggregate_anomalies(interval="hour")
+    assert result["totals"] == {"pii": 200, "toxicity": 30}
+    pii = {b["bucket"]: b["count"] for b in result["buckets"] if b["anomaly_type"] == "pii"}
+    assert pii == {"2024-05-01T10:00:00": 180, "2024-05-01T11:00:00": 20}
+
+    minutes = storage.aggregate_anomalies(anomaly_type="pii", interval="minute")
+    assert {b["count"] for b in minutes["buckets"]} - {3} <= {2}
+    assert len(minutes["buckets"]) == 67
+
+    day = storage.aggregate_anomalies(interval="day")
+    assert [(b["anomaly_type"], b["count"]) for b in day["buckets"]] == [("pii", 200), ("toxicity", 30)]
+
+
+def test_aggregate_time_range_uses_whole_minutes(storage):
+    storage.store_anomalies(_rows(9))
+    # Starts mid-minute: the whole first minute's bucket is counted
+    result = storage.aggregate_anomalies(
+        start=BASE + timedelta(seconds=30), end=BASE + timedelta(minutes=2), interval="minute")
+    assert result["totals"] == {"pii": 6}
+
+
+def test_aggregate_rejects_unknown_interval(storage):
+    with pytest.raises(ValueError):
+        storage.aggregate_anomalies(interval="week")
+
+
+def test_rollups_accumulate_across_batches(storage):
+    for i in range(4):
+        storage.store_anomalies(_rows(3, step=timedelta(seconds=1), start=BASE + timedelta(seconds=10 * i)))
+    storage.store_anomaly("single", "pii", {"at": "now"})
+    with storage.engine.connect() as connection:
+        counts = connection.execute(AnomalyRollup.__table__.select()).fetchall()
+    assert {(row.bucket, row.count) for row in counts if row.bucket == BASE} == {(BASE, 12)}
+    assert sum(row.count for row in counts) == 13
+
+
+def test_rebuild_rollups_recounts_from_the_table(storage):
+    storage.store_anomalies(_rows(50, "pii") + _rows(10, "toxicity", step=timedelta(minutes=7)))
+    before = storage.aggregate_anomalies(interval="minute")
+    with storage.engine.begin() as connection:
+        connection.execute(AnomalyRollup.__table__.delete())
+    assert storage.aggregate_anomalies()["totals"] == {}
+
+    storage.rebuild_rollups()
+    assert storage.aggregate_anomalies(interval="minute") == before
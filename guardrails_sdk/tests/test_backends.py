@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from guardrails_sdk.runtime.backends import onnx_path, serving_onnx_path
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+
+
+def test_serves_the_int8_graph_when_exported(tmp_path):
+    _touch(tmp_path / "toxicity" / "model.onnx")
+    _touch(tmp_path / "toxicity" / "model.int8.onnx")
+    assert serving_onnx_path("toxicity", str(tmp_path)) == onnx_path("toxicity", True, str(tmp_path))
+
+
+def test_serves_the_fp32_graph_without_an_int8_one(tmp_path):
+    _touch(tmp_path / "toxicity" / "model.onnx")
+    assert serving_onnx_path("toxicity", str(tmp_path)) == onnx_path("toxicity", False, str(tmp_path))
+
+
+def test_reports_the_int8_path_when_nothing_is_exported(tmp_path, monkeypatch):
+    monkeypatch.setenv("GUARDRAILS_ONNX_DIR", str(tmp_path))
+    assert serving_onnx_path("toxicity").endswith("model.int8.onnx")
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from guardrails_sdk.runtime.batching import MicroBatcher
+
+
+class Recorder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [item * 10 for item in items]
+
+
+def _submit_all(batcher, items):
+    async def main():
+        return await asyncio.gather(*(batcher.submit(item) for item in items))
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_share_a_batch_and_keep_their_results():
+    process = Recorder()
+    batcher = MicroBatcher(process, max_batch_size=16, max_wait_ms=20)
+    assert _submit_all(batcher, [1, 2, 3, 4]) == [10, 20, 30, 40]
+    assert process.batches == [[1, 2, 3, 4]]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    process = Recorder()
+    batcher = MicroBatcher(process, max_batch_size=3, max_wait_ms=20)
+    assert _submit_all(batcher, list(range(7))) == [i * 10 for i in range(7)]
+    assert [len(batch) for batch in process.batches] == [3, 3, 1]
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    batcher = MicroBatcher(Recorder(fail=True), max_batch_size=8, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+
+
+def test_items_are_bucketed_by_length():
+    process = Recorder()
+    batcher = MicroBatcher(process, max_batch_size=16, max_wait_ms=20,
+                           length_of=lambda item: item, bucket_width=10)
+    assert _submit_all(batcher, [1, 25, 3, 27]) == [10, 250, 30, 270]
+    assert process.batches == [[1, 3], [25, 27]]
+
+
+def test_cancelled_callers_are_dropped_from_the_batch():
+    process = Recorder()
+    batcher = MicroBatcher(process, max_batch_size=16, max_wait_ms=50)
+
+    async def main():
+        keep = asyncio.ensure_future(batcher.submit(1))
+        drop = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0.01)
+        drop.cancel()
+        return await keep
+
+    assert asyncio.run(main()) == 10
+    assert process.batches == [[1]]
+
+
+def test_a_new_event_loop_gets_a_new_worker():
+    batcher = MicroBatcher(Recorder(), max_batch_size=4, max_wait_ms=1)
+    assert _submit_all(batcher, [1]) == [10]
+    assert _submit_all(batcher, [2]) == [20]
+
+
+def test_configure_rejects_bad_limits():
+    batcher = MicroBatcher(Recorder())
+    with pytest.raises(ValueError):
+        batcher.configure(max_batch_size=0)
+    with pytest.raises(ValueError):
+        batcher.configure(max_wait_ms=-1)
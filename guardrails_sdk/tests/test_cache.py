@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from guardrails_sdk.runtime.cache import ResultCache
+
+
+def test_get_or_compute_caches():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "value"
+
+    async def main():
+        assert await cache.get_or_compute("k", compute) == "value"
+        assert await cache.get_or_compute("k", compute) == "value"
+
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_concurrent_calls_share_one_computation():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["shared_inflight"] == 4
+
+
+def test_cancelled_leader_does_not_cancel_follower():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+    # The follower ran the computation again
+    assert len(calls) == 2
+
+
+def test_cancelled_leader_hands_over_to_one_follower():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(cache.get_or_compute("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(main()) == ["value"] * 3
+    assert len(calls) == 2
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+
+    async def compute():
+        await asyncio.sleep(0.03)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == "value"
+
+
+def test_errors_reach_followers_and_are_not_cached():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_compute("k", compute) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, key)
+    assert cache.lookup("a") == (False, None)
+    assert cache.lookup("c") == (True, "c")
+
+    disabled = ResultCache(max_entries=0, ttl_seconds=60)
+    disabled.put("a", 1)
+    assert disabled.lookup("a") == (False, None)
@@ -0,0 +1,122 @@
+import os
+import threading
+
+import pytest
+
+from guardrails_sdk.runtime.governor import (
+    Budget, ResourceGovernor, budgets_from_env, format_env, parse_cores)
+
+ENV_VARS = ("GUARDRAILS_THREAD_BUDGETS", "GUARDRAILS_CORE_AFFINITY", "GUARDRAILS_MAX_CONCURRENT")
+
+
+@pytest.fixture
+def governor():
+    governor = ResourceGovernor()
+    yield governor
+    governor.shutdown()
+
+
+def test_parse_env_budgets(monkeypatch):
+    monkeypatch.setenv("GUARDRAILS_THREAD_BUDGETS", "toxicity=4, prompt_injection=2")
+    monkeypatch.setenv("GUARDRAILS_CORE_AFFINITY", "toxicity=0-3,6,prompt_injection=4,5")
+    monkeypatch.setenv("GUARDRAILS_MAX_CONCURRENT", "pii=3")
+    budgets = budgets_from_env()
+    assert {name: budget.to_dict() for name, budget in budgets.items()} == {
+        "toxicity": {"threads": 4, "cores": [0, 1, 2, 3, 6], "max_concurrent": 1},
+        "prompt_injection": {"threads": 2, "cores": [4, 5], "max_concurrent": 1},
+        "pii": {"threads": None, "cores": None, "max_concurrent": 3},
+    }
+
+
+def test_format_env_round_trips(monkeypatch):
+    budgets = {
+        "toxicity": Budget(threads=4, cores=[0, 1, 2, 3, 6]),
+        "pii": Budget(max_concurrent=2),
+    }
+    env = format_env(budgets)
+    assert env["GUARDRAILS_CORE_AFFINITY"] == "toxicity=0-3,6"
+    for name in ENV_VARS:
+        monkeypatch.setenv(name, env.get(name, ""))
+    assert ({name: b.to_dict() for name, b in budgets_from_env().items()}
+            == {name: b.to_dict() for name, b in budgets.items()})
+
+
+@pytest.mark.parametrize("value", ["4", "toxicity=x"])
+def test_malformed_env_values(monkeypatch, value):
+    monkeypatch.setenv("GUARDRAILS_THREAD_BUDGETS", value)
+    with pytest.raises(ValueError):
+        budgets_from_env()
+
+
+def test_parse_cores():
+    assert parse_cores(["0-2", "5"]) == [0, 1, 2, 5]
+
+
+def test_invalid_budgets(governor):
+    with pytest.raises(ValueError):
+        governor.configure({"ocr": {"threads": 1}})
+    with pytest.raises(ValueError):
+        Budget(threads=0)
+    with pytest.raises(ValueError):
+        Budget(max_concurrent=0)
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="needs sched_getaffinity")
+def test_unavailable_cores_are_rejected(governor):
+    missing = max(os.sched_getaffinity(0)) + 1
+    with pytest.raises(ValueError):
+        governor.configure({"pii": {"cores": [missing]}})
+
+
+def test_calls_without_a_budget_run_inline(governor):
+    governor.configure({})
+    assert governor.executor_for("pii") is None
+    assert governor.call("pii", threading.current_thread) is threading.current_thread()
+
+
+def test_calls_run_on_the_guardrail_pool(governor):
+    governor.configure({"pii": {"max_concurrent": 2}})
+    pool = governor.executor_for("pii")
+    assert governor.executor_for("pii") is pool
+    name = governor.call("pii", lambda: threading.current_thread().name)
+    assert name.startswith("guardrails-pii")
+    assert governor.executor_for("toxicity") is None
+
+
+def test_max_concurrent_bounds_parallel_calls(governor):
+    governor.configure({"pii": {"max_concurrent": 2}})
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.02)
+        with lock:
+            running -= 1
+
+    threads = [threading.Thread(target=governor.call, args=("pii", work)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="needs sched_getaffinity")
+def test_pool_threads_are_pinned(governor):
+    core = min(os.sched_getaffinity(0))
+    governor.configure({"pii": {"cores": [core]}})
+    assert governor.call("pii", os.sched_getaffinity, 0) == {core}
+    # The calling thread keeps its own mask
+    assert core in os.sched_getaffinity(0)
+
+
+def test_reconfigure_replaces_the_pools(governor):
+    governor.configure({"pii": {"max_concurrent": 1}})
+    pool = governor.executor_for("pii")
+    governor.configure({"pii": {"max_concurrent": 2}})
+    assert governor.executor_for("pii") is not pool
+    assert governor.report() == {"pii": {"threads": None, "cores": None, "max_concurrent": 2}}
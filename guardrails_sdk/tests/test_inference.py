@@ -0,0 +1,272 @@
+import os
+import stat
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from guardrails_sdk.runtime import inference
+from guardrails_sdk.runtime.inference import InferenceClient, _handle, _merge_status
+
+
+@inference.inference
+def add(a, b, scale=1):
+    return (a + b) * scale
+
+
+@inference.inference
+def fail(key):
+    raise KeyError(key)
+
+
+@inference.inference
+def unpicklable():
+    return lambda: None
+
+
+@inference.inference
+def served_by(delay):
+    time.sleep(delay)
+    return threading.current_thread().name
+
+
+def not_marked():
+    return "ran"
+
+
+CALLS = []
+
+
+@inference.inference
+def record(value):
+    CALLS.append(value)
+
+
+class Server:
+    """_handle behind a Unix socket in this process; no models are loaded."""
+
+    def __init__(self, path, base=None):
+        self.path = path
+        self.listener = inference._listen(path, inference._authkey(base or path, create=True))
+        self.thread = threading.Thread(target=self._accept, daemon=True)
+        self.thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                return
+            threading.Thread(target=_handle, args=(conn,), name=self.path, daemon=True).start()
+
+    def close(self):
+        self.listener.close()
+
+
+@pytest.fixture
+def socket_dir(monkeypatch):
+    monkeypatch.delenv("GUARDRAILS_INFERENCE_AUTHKEY", raising=False)
+    # Unix socket paths are limited to ~100 characters
+    path = tempfile.mkdtemp(prefix="gr-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def client(socket_dir):
+    path = os.path.join(socket_dir, "s")
+    server = Server(path)
+    client = InferenceClient(path, processes=1)
+    yield client
+    client.close()
+    server.close()
+
+
+def _call(client, func, *args, **kwargs):
+    return client.call(func.__module__, func.__qualname__, args, kwargs)
+
+
+def test_addresses():
+    assert inference.addresses("/tmp/x.sock", 1) == ["/tmp/x.sock"]
+    assert inference.addresses("/tmp/x.sock", 2) == ["/tmp/x.sock.0", "/tmp/x.sock.1"]
+
+
+def test_calls_run_in_place_without_a_client():
+    inference.disable_remote()
+    assert add(1, 2, scale=3) == 9
+
+
+def test_call_round_trip_reuses_the_connection(client):
+    assert _call(client, add, 1, 2, scale=3) == 9
+    assert _call(client, add, "a", "b") == "ab"
+    assert len(client._idle[client.addresses[0]]) == 1
+
+
+def test_remote_exceptions_are_raised_in_the_caller(client):
+    with pytest.raises(KeyError):
+        _call(client, fail, "missing")
+    # The connection stays usable after an error reply
+    assert _call(client, add, 1, 1) == 2
+
+
+def test_only_inference_functions_can_be_called(client):
+    with pytest.raises(ValueError):
+        _call(client, not_marked)
+
+
+def test_unknown_message(client):
+    with pytest.raises(ValueError):
+        client.broadcast("shutdown")
+
+
+def test_unpicklable_reply(client):
+    with pytest.raises(RuntimeError):
+        _call(client, unpicklable)
+    assert _call(client, add, 2, 2) == 4
+
+
+def test_dead_pooled_connection_is_replaced(client):
+    assert _call(client, add, 1, 2) == 3
+    # e.g. the server restarted since this connection was pooled
+    client._idle[client.addresses[0]][0].close()
+    assert _call(client, add, 3, 4) == 7
+
+
+def test_unreachable_server_reports_no_models(socket_dir):
+    client = InferenceClient(os.path.join(socket_dir, "missing"), processes=1)
+    assert client.status() == {}
+    with pytest.raises(OSError):
+        _call(client, add, 1, 2)
+
+
+def test_calls_spread_over_server_processes(socket_dir):
+    base = os.path.join(socket_dir, "s")
+    client = InferenceClient(base, processes=2)
+    servers = [Server(address, base) for address in client.addresses]
+    try:
+        with ThreadPoolExecutor(4) as pool:
+            names = list(pool.map(lambda _: _call(client, served_by, 0.1), range(4)))
+        assert sorted(names) == sorted(client.addresses * 2)
+    finally:
+        client.close()
+        for server in servers:
+            server.close()
+
+
+def test_remote_client_routes_decorated_functions(socket_dir):
+    path = os.path.join(socket_dir, "s")
+    server = Server(path)
+    try:
+        inference.configure_remote(path, processes=1)
+        assert add(2, 3) == 5
+        assert add.local(2, 3) == 5
+    finally:
+        inference.disable_remote()
+        server.close()
+
+
+def test_merge_status_keeps_the_least_ready_copy():
+    merged = _merge_status([
+        {"pii": {"state": "ready"}, "toxicity": {"state": "loading"}},
+        {"pii": {"state": "failed", "error": "oom"}, "toxicity": {"state": "ready"}},
+    ])
+    assert merged == {"pii": {"state": "failed", "error": "oom"}, "toxicity": {"state": "loading"}}
+
+
+def test_server_creates_a_private_key_and_socket(client):
+    assert _call(client, add, 1, 2) == 3
+    path = client.addresses[0]
+    assert stat.S_IMODE(os.stat(path).st_mode) & 0o077 == 0
+    key = inference._key_path(path)
+    assert stat.S_IMODE(os.stat(key).st_mode) == 0o600
+    # Restarts keep the key, so connected clients stay valid
+    assert inference._authkey(path, create=True) == client.authkey
+
+
+def test_clients_without_the_key_are_turned_away(client):
+    path = client.addresses[0]
+    with pytest.raises((AuthenticationError, EOFError, OSError)):
+        conn = Client(path, family="AF_UNIX", authkey=b"wrong key")
+        conn.send_bytes(b"anything")
+        conn.recv_bytes()
+
+    # A client that skips the handshake never gets a call run
+    conn = Client(path, family="AF_UNIX")
+    conn.send_bytes(inference.pickle.dumps(("call", __name__, "record", ("sneaky",), {})))
+    conn.close()
+    time.sleep(0.05)
+    assert "sneaky" not in CALLS
+    assert _call(client, record, "ok") is None and CALLS[-1] == "ok"
+
+
+def test_a_server_with_another_key_is_not_trusted(client, monkeypatch):
+    monkeypatch.setenv("GUARDRAILS_INFERENCE_AUTHKEY", "impostor")
+    impostor = InferenceClient(client.addresses[0], processes=1)
+    with pytest.raises(AuthenticationError):
+        _call(impostor, add, 1, 2)
+
+
+def test_an_existing_socket_of_another_user_is_refused(socket_dir):
+    path = os.path.join(socket_dir, "s")
+    planted = socket.socket(socket.AF_UNIX)
+    planted.bind(path)
+    try:
+        if os.getuid() == 0:
+            os.chown(path, 12345, -1)
+            with pytest.raises(PermissionError):
+                Server(path)
+        else:
+            # Our own stale socket is replaced
+            Server(path).close()
+    finally:
+        planted.close()
+
+
+def test_a_stale_socket_of_ours_is_replaced(socket_dir):
+    path = os.path.join(socket_dir, "s")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    server = Server(path)
+    client = InferenceClient(path, processes=1)
+    try:
+        assert _call(client, add, 2, 2) == 4
+    finally:
+        client.close()
+        server.close()
+
+
+def test_a_file_at_the_socket_path_is_left_alone(socket_dir):
+    path = os.path.join(socket_dir, "s")
+    with open(path, "w") as f:
+        f.write("data")
+    with pytest.raises(FileExistsError):
+        Server(path)
+    assert open(path).read() == "data"
+
+
+def test_shared_writable_directories_are_refused(socket_dir):
+    shared = os.path.join(socket_dir, "shared")
+    os.mkdir(shared)
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        Server(os.path.join(shared, "s"))
+    # Sticky directories such as /tmp are fine
+    os.chmod(shared, 0o1777)
+    Server(os.path.join(shared, "s")).close()
+
+
+def test_default_socket_is_in_a_private_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("GUARDRAILS_INFERENCE_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert inference.addresses() == [str(tmp_path / "guardrails" / "inference.sock")]
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert f"guardrails-{os.getuid()}" in inference.addresses()[0]
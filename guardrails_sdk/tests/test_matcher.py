@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from guardrails_sdk.compitator_banned_words.matcher import (
+    AhoCorasickMatcher, RegexMatcher, build_matcher, mask_spans)
+
+SYLLABLES = ["ac", "me", "co", "rp", "ab", "ba", "é", "x"]
+
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+
+
+def _term(rng):
+    term = " ".join(_word(rng) for _ in range(rng.choice([1, 1, 1, 2])))
+    if rng.random() < 0.1:
+        term += "+"
+    return term
+
+
+def _text(rng, terms):
+    parts = []
+    for _ in range(rng.randint(0, 40)):
+        piece = rng.choice(terms) if terms and rng.random() < 0.4 else _word(rng)
+        if rng.random() < 0.3:
+            piece = piece.upper()
+        parts.append(piece)
+        parts.append(rng.choice([" ", " ", ", ", ".", "-", "_", ""]))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_automaton_matches_like_the_regex(seed):
+    rng = random.Random(seed)
+    categories = {
+        "banned": [_term(rng) for _ in range(rng.randint(0, 8))],
+        "competitor": [_term(rng) for _ in range(rng.randint(0, 8))],
+    }
+    regex, automaton = RegexMatcher(categories), AhoCorasickMatcher(categories)
+    for _ in range(5):
+        text = _text(rng, categories["banned"] + categories["competitor"])
+        assert automaton.find(text) == regex.find(text), (categories, text)
+
+
+def test_word_boundaries_and_case():
+    matcher = AhoCorasickMatcher({"banned": ["acme corp", "acme"]})
+    text = "ACME Corp, acmes and xacme but acme."
+    assert matcher.find(text) == [("banned", 0, 9), ("banned", 31, 35)]
+
+
+def test_first_listed_term_wins_at_the_same_start():
+    for engine in (RegexMatcher, AhoCorasickMatcher):
+        assert engine({"banned": ["acme", "acme corp"]}).find("acme corp") == [("banned", 0, 4)]
+        assert engine({"banned": ["acme corp", "acme"]}).find("acme corp") == [("banned", 0, 9)]
+
+
+def test_mask_spans_keeps_length_and_other_text():
+    text = "call acme or globex now"
+    matches = [("competitor", 5, 9), ("competitor", 13, 19)]
+    assert mask_spans(text, matches) == "call **** or ****** now"
+    assert mask_spans(text, []) == text
+
+
+def test_build_matcher_engines(monkeypatch):
+    monkeypatch.setattr("guardrails_sdk.compitator_banned_words.matcher.AUTO_AUTOMATON_MIN_TERMS", 3)
+    assert build_matcher({"banned": ["a", "b"]}, "auto").engine == "regex"
+    assert build_matcher({"banned": ["a", "b", "c"]}, "auto").engine == "automaton"
+    assert build_matcher({"banned": ["a"]}, "regex").engine == "regex"
+    with pytest.raises(ValueError):
+        build_matcher({"banned": ["a"]}, "fuzzy")
@@ -0,0 +1,127 @@
+import re
+import random
+
+import pytest
+
+from guardrails_sdk.pii import pii
+from guardrails_sdk.pii.pii import merge_chunk_results, split_chunks
+
+# An entity with spaces inside, so chunk ends (at whitespace) can cut it
+ACCOUNT = re.compile(r"ACC \d{4} \d{4}")
+
+
+def _document(n_words=4000, seed=0, accounts=0.05, sentences=True):
+    rng = random.Random(seed)
+    words = "the contract states that payment is due within thirty days".split()
+    parts = []
+    for i in range(n_words):
+        if rng.random() < accounts:
+            parts.append(f"ACC {i:04d} {rng.randrange(10000):04d}")
+        elif rng.random() < 0.05:
+            parts.append(f"user{i}@example.com")
+        else:
+            parts.append(rng.choice(words) + ("." if sentences and rng.random() < 0.1 else ""))
+    return " ".join(parts)
+
+
+def _find_accounts(text):
+    return tuple(("ACCOUNT", m.start(), m.end(), 1.0) for m in ACCOUNT.finditer(text))
+
+
+def test_split_chunks_cover_the_text_with_overlap():
+    text = _document()
+    chunks = split_chunks(text, 500, 100)
+    assert chunks[0][0] == 0
+    assert chunks[-1][0] + len(chunks[-1][1]) == len(text)
+    for (offset, chunk), (next_offset, next_chunk) in zip(chunks, chunks[1:]):
+        assert text[offset:offset + len(chunk)] == chunk
+        assert len(chunk) <= 500
+        assert offset < next_offset < offset + len(chunk)
+        # Chunks end at whitespace and start at a word
+        assert chunk[-1].isspace()
+        assert not next_chunk[0].isspace()
+
+
+def test_split_chunks_without_whitespace():
+    text = "x" * 1234
+    chunks = split_chunks(text, 100, 20)
+    assert chunks[-1][0] + len(chunks[-1][1]) == len(text)
+    assert all(text[offset:offset + len(chunk)] == chunk for offset, chunk in chunks)
+
+
+def test_short_text_is_one_chunk():
+    assert split_chunks("short text", 100, 20) == [(0, "short text")]
+
+
+def test_merge_matches_a_single_pass_across_chunk_edges():
+    # No sentence ends: chunks end at the last space, often inside an account
+    text = _document(accounts=0.3, sentences=False)
+    chunks = split_chunks(text, 500, 100)
+    merged = merge_chunk_results(chunks, [_find_accounts(chunk) for _, chunk in chunks])
+
+    assert merged == tuple(sorted(_find_accounts(text), key=lambda r: (r[1], r[2], r[0])))
+    # Some accounts were cut by a chunk end and only found whole by the next chunk
+    straddling = [
+        (start, end) for _, start, end, _ in merged
+        for offset, chunk in chunks[:-1] if start < offset + len(chunk) < end]
+    assert straddling
+
+
+def test_chunked_analysis_matches_a_single_pass(pii_analyzer, monkeypatch):
+    text = _document(2000)
+    entities = ["EMAIL_ADDRESS"]
+    custom = [{"entity_name": "ACCOUNT", "regex": ACCOUNT.pattern, "score": 0.9}]
+
+    monkeypatch.setattr(pii, "CHUNK_CHARS", 0)
+    single = pii._analyze(text, entities, custom)
+    monkeypatch.setattr(pii, "CHUNK_CHARS", 1000)
+    monkeypatch.setattr(pii, "CHUNK_OVERLAP", 200)
+    monkeypatch.setattr(pii, "CHUNK_WORKERS", 1)
+    chunked = pii._analyze(text, entities, custom)
+
+    assert chunked[0] == single[0] == "regex"
+    assert set(chunked[1]) == set(single[1])
+    assert pii.mask_text(text, chunked[1], 0.5) == pii.mask_text(text, single[1], 0.5)
+
+
+@pytest.mark.parametrize("text", [
+    "Please call 212-555-0101 tomorrow",
+    "I was calling 212-555-0101 all day",
+    "My phone number: 212-555-0101",
+    "Nothing around 212-555-0101 here",
+    # "call" is a spaCy stop word, so neither path boosts it; "calling" is
+    # lemmatized to it on both
+    "He called 212-555-0101 twice",
+])
+def test_fast_path_applies_the_same_context_boosts(pii_analyzer, monkeypatch, text):
+    monkeypatch.setattr(pii, "CHUNK_CHARS", 0)
+    monkeypatch.setattr(pii, "_needs_nlp", lambda analyzer, entities: False)
+    fast = pii._find(text, ["PHONE_NUMBER"], [])
+    monkeypatch.setattr(pii, "_needs_nlp", lambda analyzer, entities: True)
+    full = pii._find(text, ["PHONE_NUMBER"], [])
+
+    assert (fast[0], full[0]) == ("regex", "nlp")
+    assert fast[1] == full[1]
+    assert len(full[1]) == 1
+
+
+def test_context_words_raise_the_score(pii_analyzer, monkeypatch):
+    monkeypatch.setattr(pii, "_needs_nlp", lambda analyzer, entities: False)
+    (_, _, _, boosted), = pii._find("My phone number: 212-555-0101", ["PHONE_NUMBER"], [])[1]
+    (_, _, _, plain), = pii._find("Nothing around 212-555-0101", ["PHONE_NUMBER"], [])[1]
+    assert boosted > plain
+
+
+def test_regex_only_entities_take_the_fast_path(pii_analyzer):
+    path, results = pii._find("mail john@example.com", ["EMAIL_ADDRESS"], [])
+    assert path == "regex"
+    assert [r[0] for r in results] == ["EMAIL_ADDRESS"]
+    assert pii._find("mail john@example.com", [], [])[0] == "nlp"
+
+
+def test_custom_only_entities_take_the_fast_path(pii_analyzer):
+    custom = [{"entity_name": "LOYALTY_CARD", "regex": r"LC-\d{6}", "score": 0.9}]
+    path, results = pii._find("card LC-123456", [], custom)
+    assert path == "regex"
+    assert [r[0] for r in results] == ["LOYALTY_CARD"]
+    assert pii._find("card LC-123456 for John Smith", ["PERSON"], custom)[0] == "nlp"
@@ -0,0 +1,54 @@
+import asyncio
+
+from guardrails_sdk import pipeline
+from guardrails_sdk.pipeline import PipelinePolicy, run_pipeline
+from guardrails_sdk.runtime.cache import result_cache
+from guardrails_sdk.toxicity import toxic_bert
+
+
+def _fake_guardrails(monkeypatch, calls):
+    async def score_text(text, overlap):
+        calls.append(text)
+        await asyncio.sleep(0.2)
+        return {"toxic": 0.9}
+
+    async def moderate(text, banned_words, competitor_words, action):
+        await asyncio.sleep(0.05)
+        return {"status": "blocked", "cleaned_text": None, "error": "banned"}
+
+    monkeypatch.setattr(toxic_bert, "_score_text", score_text)
+    monkeypatch.setattr(pipeline, "_moderate", moderate)
+    result_cache.clear()
+
+
+def test_short_circuit_cancels_the_rest_of_the_tier(monkeypatch):
+    _fake_guardrails(monkeypatch, [])
+    policy = PipelinePolicy(tiers=[["banned_words", "toxicity"], ["pii"]])
+
+    result = asyncio.run(run_pipeline(
+        "short circuit me", [], banned_words=["banned"], action="block", policy=policy))
+
+    assert result["blocked_by"] == "banned_words"
+    assert result["toxicity"] is None
+    assert result["pipeline"]["cancelled"] == ["toxicity"]
+    assert result["pipeline"]["skipped"] == ["pii", "prompt_injection"]
+
+
+def test_short_circuit_does_not_fail_an_identical_request(monkeypatch):
+    calls = []
+    _fake_guardrails(monkeypatch, calls)
+    text = "same text in both requests"
+    policy = PipelinePolicy(tiers=[["banned_words", "toxicity"]])
+
+    async def main():
+        blocked = asyncio.ensure_future(run_pipeline(
+            text, [], banned_words=["banned"], action="block", policy=policy))
+        await asyncio.sleep(0.01)
+        # Joins the pipeline's in-flight toxicity call through the cache
+        other = asyncio.ensure_future(toxic_bert.detect_toxicity(text))
+        return await blocked, await other
+
+    blocked, other = asyncio.run(main())
+    assert blocked["pipeline"]["cancelled"] == ["toxicity"]
+    assert other["is_toxic"] is True
+    assert calls == [text, text]
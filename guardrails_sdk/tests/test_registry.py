@@ -0,0 +1,37 @@
+import pytest
+
+from guardrails_sdk.runtime.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry()
+    registry.register("a", lambda: "model a")
+    registry.register("b", lambda: "model b")
+    return registry
+
+
+def test_is_ready_accepts_any_iterable(registry):
+    registry.get("a")
+    assert registry.is_ready(["a"])
+    assert not registry.is_ready(name for name in ["a", "b"])
+    assert not registry.is_ready(iter(["b"]))
+    assert not registry.is_ready()
+
+
+def test_unknown_names_are_not_ready(registry):
+    registry.get("a")
+    registry.get("b")
+    assert registry.is_ready()
+    assert not registry.is_ready(name for name in ["a", "c"])
+
+
+def test_failed_load_is_reported(registry):
+    def broken():
+        raise RuntimeError("no weights")
+
+    registry.register("c", broken)
+    with pytest.raises(RuntimeError):
+        registry.get("c")
+    assert registry.status(["c"])["c"]["state"] == "failed"
+    assert not registry.is_ready(iter(["c"]))
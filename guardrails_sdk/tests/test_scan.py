@@ -0,0 +1,94 @@
+import json
+import asyncio
+
+import pytest
+
+from guardrails_sdk import scan
+from guardrails_sdk.pii import pii
+
+
+def test_a_bad_record_does_not_fail_the_pii_chunk(monkeypatch):
+    async def analyze_many(texts, *args, **kwargs):
+        raise ValueError("bad record in the batch")
+
+    async def analyze_one(text, *args, **kwargs):
+        if text == "bad":
+            raise ValueError("bad record")
+        return {"pii_found": False, "masked_text": text}
+
+    monkeypatch.setattr(pii, "analyze_and_mask_many", analyze_many)
+    monkeypatch.setattr(pii, "analyze_and_mask_text", analyze_one)
+    records = [(1, "a", "good", None), (2, "b", "bad", None), (3, "c", "fine", None)]
+    config = {"checks": ["pii"], "threshold": 0.5, "entities": ["EMAIL_ADDRESS"]}
+
+    outputs, _ = asyncio.run(scan._scan_records(records, config))
+
+    assert outputs[0]["results"]["pii"]["masked_text"] == "good"
+    assert outputs[1]["results"]["pii"] == {"error": "bad record"}
+    assert outputs[2]["results"]["pii"]["masked_text"] == "fine"
+
+
+def test_banned_words_check_needs_word_lists(tmp_path, capsys):
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"content": "hello"}\n')
+    with pytest.raises(SystemExit) as exit_info:
+        scan.main([str(source), "--out", str(tmp_path / "out.jsonl"), "--checks", "banned_words"])
+    assert exit_info.value.code == 2
+    assert "--block-words" in capsys.readouterr().err
+
+
+def test_scan_with_word_lists(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"content": "buy from acme"}\n{"content": "hello"}\n')
+    words = tmp_path / "competitors.txt"
+    words.write_text("acme")
+    out = tmp_path / "out.jsonl"
+
+    assert scan.main([str(source), "--out", str(out), "--checks", "banned_words",
+                      "--competitor-words", str(words), "--workers", "1"]) == 0
+    results = [json.loads(line)["results"]["banned_words"] for line in out.read_text().splitlines()]
+    assert results[0]["cleaned_text"] == "buy from ****"
+    assert results[1]["competitors"] == []
+
+
+def test_malformed_lines_get_an_error_and_the_scan_goes_on(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"content": "buy from acme"}\n{not json\n["a list"]\n{"content": "acme again"}\n')
+    words = tmp_path / "competitors.txt"
+    words.write_text("acme")
+    out = tmp_path / "out.jsonl"
+    argv = [str(source), "--out", str(out), "--checks", "banned_words",
+            "--competitor-words", str(words), "--workers", "1", "--chunk-size", "2"]
+
+    assert scan.main(argv) == 0
+    outputs = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [output["line"] for output in outputs] == [1, 2, 3, 4]
+    assert outputs[1]["error"].startswith("Invalid record") and outputs[1]["results"] == {}
+    assert outputs[2]["error"] == "Invalid record: expected a JSON object"
+    assert outputs[3]["results"]["banned_words"]["cleaned_text"] == "**** again"
+
+    # The checkpoint counts the bad lines, so a resume does not trip on them again
+    assert scan.main(argv + ["--resume"]) == 0
+    assert [json.loads(line) for line in out.read_text().splitlines()] == outputs
+
+
+def test_bad_csv_rows_are_reported(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text('content\nhello\n"' + "x" * 200 + '"\nbye\n')
+    limit = scan.csv.field_size_limit(100)
+    try:
+        records = list(scan.read_records(str(source), "content", None))
+    finally:
+        scan.csv.field_size_limit(limit)
+    assert [(text, error is None) for _, _, text, error in records] == [
+        ("hello", True), ("", False), ("bye", True)]
+
+
+def test_default_workers_fit_in_memory(monkeypatch):
+    monkeypatch.setattr(scan.os, "cpu_count", lambda: 64)
+    assert scan.default_workers() <= 4
+    memory = {"SC_PAGE_SIZE": 4096, "SC_PHYS_PAGES": 3 * scan.WORKER_MEMORY_BYTES // 4096}
+    monkeypatch.setattr(scan.os, "sysconf", memory.__getitem__)
+    assert scan.default_workers() == 3
+    memory["SC_PHYS_PAGES"] = 1
+    assert scan.default_workers() == 1
@@ -0,0 +1,114 @@
+import re
+import random
+import asyncio
+
+import pytest
+
+from guardrails_sdk.pii import pii
+from guardrails_sdk.streaming import StreamGuard, StreamRequest, guard_stream
+
+WORDS = "the model answer is long enough to be streamed in many small pieces".split()
+
+
+def _stream_text(rng, n_words, special):
+    """A text mixing plain words with `special` (raw, masked) pairs, and its masked form."""
+    raw, masked = [], []
+    for _ in range(n_words):
+        if rng.random() < 0.15:
+            word, replacement = rng.choice(special)
+        else:
+            word = replacement = rng.choice(WORDS)
+        raw.append(word)
+        masked.append(replacement)
+    return " ".join(raw), " ".join(masked)
+
+
+def _split(rng, text):
+    pieces, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, 12)
+        pieces.append(text[i:i + step])
+        i += step
+    return pieces
+
+
+def _merge_placeholders(text):
+    return re.sub(r"<EMAIL_ADDRESS>(\s+<EMAIL_ADDRESS>)+", "<EMAIL_ADDRESS>", text)
+
+
+async def _run(guard, pieces):
+    released = []
+    for piece in pieces:
+        event = await guard.feed(piece)
+        released.append(event["text"])
+        # Only the look-behind tail and one unreleasable stretch stay pending
+        assert len(guard.pending) <= 4 * guard.lookbehind_chars + len(piece)
+    event = await guard.finish()
+    released.append(event["text"])
+    return "".join(released), event
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_released_text_is_masked_as_in_one_pass(seed):
+    rng = random.Random(seed)
+    text, expected = _stream_text(rng, 200, [("acme", "****"), ("globex corp", "******-****")])
+    expected = expected.replace("******-****", "*" * len("globex corp"))
+    request = StreamRequest(compitator_words=["acme", "globex corp"], toxicity=False)
+
+    released, last = asyncio.run(_run(StreamGuard(request, lookbehind_chars=16), _split(rng, text)))
+
+    assert released == expected
+    assert last["released_chars"] == len(text)
+    assert set(last["competitors"]) <= {"acme", "globex corp"}
+
+
+def test_a_word_split_across_deltas_is_not_released_early():
+    request = StreamRequest(compitator_words=["acme"], toxicity=False)
+    pieces = ["x " * 20 + "ac", "me", " y" * 20]
+
+    released, _ = asyncio.run(_run(StreamGuard(request, lookbehind_chars=8), pieces))
+
+    assert "ac" not in released.replace("x", "").replace("y", "")
+    assert "****" in released
+
+
+def test_text_without_whitespace_stays_bounded():
+    request = StreamRequest(toxicity=False)
+    pieces = ["a" * 7] * 100
+
+    released, _ = asyncio.run(_run(StreamGuard(request, lookbehind_chars=16), pieces))
+
+    assert released == "a" * 700
+
+
+def test_block_action_stops_the_stream():
+    request = StreamRequest(block_words=["forbidden"], action="block", toxicity=False)
+
+    async def deltas():
+        for word in ("fine " * 30 + "forbidden " + "more " * 30).split(" "):
+            yield word + " "
+
+    async def main():
+        return [event async for event in guard_stream(deltas(), request)]
+
+    events = asyncio.run(main())
+    assert events[-1]["done"] and events[-1]["blocked"]
+    assert "forbidden" not in "".join(event["text"] for event in events)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pii_is_masked_as_in_one_pass(pii_analyzer, seed):
+    rng = random.Random(seed)
+    emails = [(f"user{i}@example.com", "<EMAIL_ADDRESS>") for i in range(3)]
+    text, expected = _stream_text(rng, 120, emails)
+    request = StreamRequest(guardrails=["EMAIL_ADDRESS"], toxicity=False)
+
+    released, last = asyncio.run(_run(StreamGuard(request, lookbehind_chars=32), _split(rng, text)))
+
+    # The anonymizer merges entities of a type separated only by whitespace
+    # into one placeholder; the stream does so only within a release
+    results = asyncio.run(pii.analyze_text(text, ["EMAIL_ADDRESS"], [], use_cache=False))
+    one_pass = pii.mask_text(text, results, 0.5)["masked_text"]
+    assert _merge_placeholders(released) == _merge_placeholders(one_pass)
+    assert "@" not in released
+    assert last["pii_found"] == (expected != text)
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import time
+
+from guardrails_sdk.log_guardrails.writer import AnomalyWriter
+
+
+class FakeStorage:
+    def __init__(self, fail=False):
+        self.rows = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def store_anomalies(self, rows):
+        self.release.wait()
+        if self.fail:
+            raise RuntimeError("database down")
+        self.rows.extend(rows)
+
+
+def test_rows_are_written_in_batches():
+    storage = FakeStorage()
+    writer = AnomalyWriter(storage, batch_size=10, flush_interval=0.01)
+    for i in range(25):
+        writer.submit(f"r{i}", "pii", {"i": i})
+    writer.close()
+    assert [row["request_id"] for row in storage.rows] == [f"r{i}" for i in range(25)]
+    assert writer.stats()["written"] == 25
+
+
+def test_drop_when_the_queue_is_full():
+    storage = FakeStorage()
+    storage.release.clear()
+    writer = AnomalyWriter(storage, max_queue=1, batch_size=1, flush_interval=0.01, backpressure="drop")
+    for i in range(5):
+        writer.submit(f"r{i}", "pii", {})
+    storage.release.set()
+    writer.close()
+    assert writer.stats()["dropped"] >= 3
+    assert writer.stats()["written"] + writer.stats()["dropped"] == 5
+
+
+def test_blocking_submit_async_does_not_stall_the_event_loop():
+    storage = FakeStorage()
+    storage.release.clear()
+    writer = AnomalyWriter(storage, max_queue=1, batch_size=1, flush_interval=0.01, backpressure="block")
+
+    async def main():
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 5:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        # One row held by the stuck writer thread, one filling the queue,
+        # and the rest waiting for room
+        submits = asyncio.gather(*(writer.submit_async(f"r{i}", "pii", {}) for i in range(4)))
+        await ticker()
+        assert not submits.done()
+        storage.release.set()
+        await submits
+
+    asyncio.run(main())
+    writer.close()
+    assert len(storage.rows) == 4
+
+
+def test_spilled_rows_are_replayed(tmp_path):
+    storage = FakeStorage(fail=True)
+    spill_path = str(tmp_path / "spill.jsonl")
+    writer = AnomalyWriter(storage, batch_size=2, flush_interval=0.01, backpressure="spill",
+                           spill_path=spill_path)
+    for i in range(3):
+        writer.submit(f"r{i}", "pii", {})
+    writer.flush()
+    assert writer.stats()["spilled"] == 3
+
+    storage.fail = False
+    writer.submit("r3", "pii", {})
+    writer.close()
+    assert sorted(row["request_id"] for row in storage.rows) == ["r0", "r1", "r2", "r3"]
+
+
+class FlakyStorage(FakeStorage):
+    """Fails the calls whose numbers are in `failing`, counting from 1."""
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = set(failing)
+        self.calls = 0
+
+    def store_anomalies(self, rows):
+        self.calls += 1
+        if self.calls in self.failing:
+            raise RuntimeError("database down")
+        self.rows.extend(rows)
+
+
+def test_failed_replay_keeps_the_uncommitted_rows(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    # First write goes through, the replay commits one batch and fails on the next
+    storage = FlakyStorage(failing={3})
+    writer = AnomalyWriter(storage, batch_size=2, flush_interval=0.01, backpressure="spill",
+                           spill_path=str(spill_path))
+    writer._spill([writer._row(f"s{i}", "pii", {}) for i in range(5)])
+
+    writer.submit("r0", "pii", {})
+    writer.flush()
+    replaying = tmp_path / "spill.jsonl.replay"
+    left = [json.loads(line)["request_id"] for line in replaying.read_text().splitlines()]
+    assert left == ["s2", "s3", "s4"]
+
+    writer.submit("r1", "pii", {})
+    writer.close()
+    assert sorted(row["request_id"] for row in storage.rows) == ["r0", "r1", "s0", "s1", "s2", "s3", "s4"]
+    assert not replaying.exists() and not spill_path.exists()
+
+
+def test_close_gives_up_on_a_hung_database(tmp_path):
+    storage = FakeStorage()
+    storage.release.clear()
+    spill_path = tmp_path / "spill.jsonl"
+    writer = AnomalyWriter(storage, max_queue=2, batch_size=1, flush_interval=0.01,
+                           backpressure="spill", spill_path=str(spill_path))
+    for i in range(3):
+        writer.submit(f"r{i}", "pii", {})
+
+    start = time.monotonic()
+    writer.close(timeout=0.2)
+    assert time.monotonic() - start < 2
+    # The row the writer thread holds stays with it; the queued ones are kept on disk
+    spilled = sorted(json.loads(line)["request_id"] for line in spill_path.read_text().splitlines())
+    assert spilled == ["r1", "r2"]
+    storage.release.set()
+
+
+def test_close_drops_queued_rows_without_a_spill_file():
+    storage = FakeStorage()
+    storage.release.clear()
+    writer = AnomalyWriter(storage, max_queue=2, batch_size=1, flush_interval=0.01, backpressure="drop")
+    for i in range(3):
+        writer.submit(f"r{i}", "pii", {})
+    writer.close(timeout=0.1)
+    assert writer.stats()["dropped"] == 2
+    storage.release.set()